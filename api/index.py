@@ -16,8 +16,11 @@ sys.path.insert(0, src_dir)
 
 # Try to import Flask and create basic app
 try:
-    from flask import Flask, jsonify, request
+    from flask import Flask, abort, jsonify, request
     from flask_cors import CORS
+    from sqlalchemy.orm import undefer
+    from sqlalchemy.orm.exc import StaleDataError
+    from src.utils.compression import init_compression
     FLASK_AVAILABLE = True
 except ImportError as e:
     print(f"Flask import failed: {e}")
@@ -27,6 +30,7 @@ if FLASK_AVAILABLE:
     # Create Flask app
     app = Flask(__name__)
     CORS(app, origins=['*'])
+    init_compression(app)
     
     # Try to import database models and routes
     database_available = False
@@ -35,7 +39,22 @@ if FLASK_AVAILABLE:
     
     try:
         from src.models.user import db
-        from src.models.note import Note
+        from src.models.note import Note, NoteTombstone
+        from src.utils.batch import run_batch, validate_batch
+        from src.utils.changes import change_feed
+        from src.utils.export import export_response
+        from src.utils.pagination import paginate_notes, parse_limit
+        from src.utils.fuzzy import fuzzy_search
+        from src.utils.importer import import_response, upload_source
+        from src.utils.search import fulltext_search
+        from src.utils.response_cache import cache_key, response_cache
+        from src.utils.serialize import json_response, note_columns, note_page_json, notes_json, parse_fields
+        from src.utils.suggest import DEFAULT_SUGGESTIONS, suggest_titles
+        from src.utils.textpatch import apply_edits
+        from src.utils.writes import PreconditionFailed, delete_note_row, if_match_versions, update_note_row
+        from src.utils.versioning import collection_etag, collection_version, matching_etag, not_modified, note_etag, tag_response
+        from src.utils.migrations import migrate
+        from src.utils.pooling import engine_options, pool_stats
         models_available = True
         print("✅ Database models imported successfully")
         
@@ -46,13 +65,8 @@ if FLASK_AVAILABLE:
                 DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://')
             
             app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
-            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-                'pool_pre_ping': True,
-                'pool_recycle': 300,
-                'pool_size': 3,
-                'max_overflow': 5,
-                'connect_args': {'sslmode': 'require', 'connect_timeout': 15}
-            }
+            # Pooling mode (queue, null, transaction) comes from DB_POOL_MODE
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(DATABASE_URL)
         else:
             app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///notes.db'
         
@@ -63,7 +77,7 @@ if FLASK_AVAILABLE:
         db.init_app(app)
         
         with app.app_context():
-            db.create_all()
+            migrate(db.engine)
             print("✅ Database initialized successfully")
             database_available = True
             
@@ -74,7 +88,13 @@ if FLASK_AVAILABLE:
     ai_available = False
     try:
         from src.utils.llm import llm_client
-        ai_available = True
+        from src.utils.sse import sse_response, stream_tokens, wants_stream
+        from src.utils.translation_batch import run_translation_batch, validate_translation_batch
+        ai_available = llm_client.configured
+        if database_available:
+            # Keep AI results across cold starts and instances
+            with app.app_context():
+                llm_client.cache.bind(db.engine)
         print("✅ AI utilities imported successfully")
     except Exception as e:
         print(f"⚠️  AI utilities failed: {e}")
@@ -109,7 +129,10 @@ if FLASK_AVAILABLE:
                 'database_configured': bool(os.getenv('DATABASE_URL')),
                 'secrets_configured': bool(os.getenv('SECRET_KEY')),
                 'ai_configured': bool(os.getenv('GITHUB_AI_TOKEN'))
-            }
+            },
+            'pool': pool_stats.snapshot(db.engine.pool) if database_available else None,
+            'llm_cache': llm_client.cache.stats() if ai_available else None,
+            'llm_requests': llm_client.flights.stats() if ai_available else None
         })
     
     @app.route('/debug')
@@ -136,10 +159,23 @@ if FLASK_AVAILABLE:
         
         @app.route('/api/notes', methods=['GET'])
         def get_notes():
-            """Get all notes"""
+            """Get a page of notes (limit, cursor, updated_after, updated_before)"""
             try:
-                notes = Note.query.order_by(Note.updated_at.desc()).all()
-                return jsonify([note.to_dict() for note in notes])
+                etag = collection_etag(collection_version(db.session), request.args)
+                matched = matching_etag(request.if_none_match, etag)
+                if matched:
+                    return not_modified(matched)
+                
+                key = cache_key('list', etag)
+                body = response_cache.get(key)
+                if body is None:
+                    fields = parse_fields(request.args.get('fields'))
+                    rows, next_cursor = paginate_notes(Note.query.with_entities(*note_columns(Note, fields)), Note, request.args)
+                    body = note_page_json(rows, next_cursor, fields)
+                    response_cache.set(key, body)
+                return tag_response(json_response(body), etag)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             except Exception as e:
                 return jsonify({'error': f'Database error: {str(e)}'}), 500
         
@@ -154,66 +190,170 @@ if FLASK_AVAILABLE:
                 note = Note(title=data['title'], content=data['content'])
                 db.session.add(note)
                 db.session.commit()
-                return jsonify(note.to_dict()), 201
+                return tag_response(jsonify(note.to_dict()), note_etag(note.id, note.version)), 201
             except Exception as e:
                 db.session.rollback()
                 return jsonify({'error': f'Create failed: {str(e)}'}), 500
         
         @app.route('/api/notes/<int:note_id>', methods=['GET'])
         def get_note(note_id):
-            """Get a specific note"""
+            """Get a specific note, honoring If-None-Match"""
             try:
-                note = Note.query.get_or_404(note_id)
-                return jsonify(note.to_dict())
+                if request.if_none_match:
+                    version = db.session.query(Note.version).filter(Note.id == note_id).scalar()
+                    if version is None:
+                        abort(404)
+                    etag = note_etag(note_id, version)
+                    matched = matching_etag(request.if_none_match, etag)
+                    if matched:
+                        return not_modified(matched)
+                
+                note = Note.query.options(undefer(Note.content)).get_or_404(note_id)
+                return tag_response(jsonify(note.to_dict()), note_etag(note.id, note.version))
             except Exception as e:
                 return jsonify({'error': f'Note not found: {str(e)}'}), 404
         
         @app.route('/api/notes/<int:note_id>', methods=['PUT'])
         def update_note(note_id):
-            """Update a note"""
+            """Update a note in a single statement (If-Match makes it conditional)"""
             try:
-                note = Note.query.get_or_404(note_id)
                 data = request.json
                 
                 if not data:
                     return jsonify({'error': 'No data provided'}), 400
                 
-                note.title = data.get('title', note.title)
-                note.content = data.get('content', note.content)
-                db.session.commit()
-                return jsonify(note.to_dict())
+                row = update_note_row(db.session, Note, note_id, data, if_match_versions(request.if_match, note_id))
+            except PreconditionFailed:
+                return jsonify({'error': 'Note has changed'}), 412
             except Exception as e:
                 db.session.rollback()
                 return jsonify({'error': f'Update failed: {str(e)}'}), 500
+            
+            if row is None:
+                abort(404)
+            return tag_response(jsonify(Note(**row._mapping).to_dict()), note_etag(row.id, row.version))
+        
+        @app.route('/api/notes/<int:note_id>', methods=['PATCH'])
+        def patch_note(note_id):
+            """Apply a compact content diff against a base version"""
+            note = Note.query.options(undefer(Note.content)).get_or_404(note_id)
+            data = request.json
+            if not data or 'base_version' not in data:
+                return jsonify({'error': 'base_version is required'}), 400
+            if data['base_version'] != note.version:
+                return jsonify({'error': 'Note has changed since base_version', 'version': note.version}), 409
+            
+            try:
+                if 'content_edits' in data:
+                    note.content = apply_edits(note.content, data['content_edits'])
+                if 'title' in data:
+                    note.title = data['title']
+                db.session.commit()
+                return tag_response(jsonify(note.to_dict()), note_etag(note.id, note.version))
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), 400
+            except StaleDataError:
+                db.session.rollback()
+                return jsonify({'error': 'Note has changed since base_version'}), 409
+            except Exception as e:
+                db.session.rollback()
+                return jsonify({'error': f'Patch failed: {str(e)}'}), 500
         
         @app.route('/api/notes/<int:note_id>', methods=['DELETE'])
         def delete_note(note_id):
-            """Delete a note"""
+            """Delete a note in a single statement (If-Match makes it conditional)"""
             try:
-                note = Note.query.get_or_404(note_id)
-                db.session.delete(note)
-                db.session.commit()
-                return '', 204
+                found = delete_note_row(db.session, Note, NoteTombstone, note_id, if_match_versions(request.if_match, note_id))
+            except PreconditionFailed:
+                return jsonify({'error': 'Note has changed'}), 412
             except Exception as e:
                 db.session.rollback()
                 return jsonify({'error': f'Delete failed: {str(e)}'}), 500
+            
+            if not found:
+                abort(404)
+            return '', 204
         
         @app.route('/api/notes/search', methods=['GET'])
         def search_notes():
-            """Search notes"""
+            """Full-text search over titles and content, best match first"""
             try:
                 query = request.args.get('q', '')
                 if not query:
                     return jsonify([])
                 
-                notes = Note.query.filter(
-                    (Note.title.contains(query)) | (Note.content.contains(query))
-                ).order_by(Note.updated_at.desc()).all()
-                
-                return jsonify([note.to_dict() for note in notes])
+                limit = parse_limit(request.args.get('limit'))
+                fields = parse_fields(request.args.get('fields'))
+                key = cache_key('search', collection_etag(collection_version(db.session), request.args))
+                body = response_cache.get(key)
+                if body is None:
+                    if request.args.get('fuzzy') in ('1', 'true'):
+                        notes = fuzzy_search(Note, NoteTombstone, query, limit, columns=note_columns(Note, fields))
+                    else:
+                        notes = fulltext_search(Note, query, limit, columns=note_columns(Note, fields))
+                    body = notes_json(notes, fields)
+                    response_cache.set(key, body)
+                return json_response(body)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             except Exception as e:
                 return jsonify({'error': f'Search failed: {str(e)}'}), 500
     
+        @app.route('/api/notes/batch', methods=['POST'])
+        def batch_notes():
+            """Run many create/update/delete operations and a multi-get in one transaction"""
+            try:
+                operations, get_ids = validate_batch(request.json)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            try:
+                return jsonify(run_batch(db.session, Note, NoteTombstone, operations, get_ids))
+            except Exception as e:
+                db.session.rollback()
+                return jsonify({'error': f'Batch failed: {str(e)}'}), 500
+        
+        @app.route('/api/notes/export', methods=['GET'])
+        def export_notes():
+            """Download every note as NDJSON, gzip-compressed with ?gzip=1"""
+            compress = request.args.get('gzip', '').lower() in ('1', 'true')
+            return export_response(db.engine, Note, compress)
+        
+        @app.route('/api/notes/import', methods=['POST'])
+        def import_notes():
+            """Bulk import NDJSON or a zip of Markdown files, streaming progress"""
+            try:
+                source = upload_source(request)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return import_response(db.engine, Note, source)
+        
+        @app.route('/api/notes/changes', methods=['GET'])
+        def get_changes():
+            """Delta sync feed: notes created, updated or deleted since a cursor"""
+            try:
+                return jsonify(change_feed(Note, NoteTombstone, request.args))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            except Exception as e:
+                return jsonify({'error': f'Change feed failed: {str(e)}'}), 500
+        
+        @app.route('/api/notes/suggest', methods=['GET'])
+        def suggest_notes():
+            """Autocomplete note titles"""
+            try:
+                prefix = request.args.get('prefix', '')
+                if not prefix.strip():
+                    return jsonify([])
+                
+                limit = parse_limit(request.args.get('limit'), default=DEFAULT_SUGGESTIONS)
+                return jsonify(suggest_titles(Note, NoteTombstone, prefix, limit))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            except Exception as e:
+                return jsonify({'error': f'Suggest failed: {str(e)}'}), 500
+    
     else:
         # Fallback endpoints when database is not available
         @app.route('/api/notes', methods=['GET'])
@@ -236,7 +376,7 @@ if FLASK_AVAILABLE:
         
         @app.route('/api/translate', methods=['POST'])
         def translate_text():
-            """Translate text using AI"""
+            """Translate text using AI (streamed as SSE with "stream": true)"""
             try:
                 data = request.json
                 if not data or 'text' not in data:
@@ -246,21 +386,46 @@ if FLASK_AVAILABLE:
                 if not text_to_translate.strip():
                     return jsonify({'error': 'Text cannot be empty'}), 400
                 
+                def translation(translated_text):
+                    return {
+                        'original_text': text_to_translate,
+                        'translated_text': translated_text,
+                        'source_language': 'en',
+                        'target_language': 'zh'
+                    }
+                
+                if wants_stream(request, data):
+                    return sse_response(stream_tokens(
+                        llm_client.stream_translate_to_chinese(text_to_translate), translation, 'Translation failed'
+                    ))
+                
                 translated_text = llm_client.translate_to_chinese(text_to_translate)
                 
-                return jsonify({
-                    'original_text': text_to_translate,
-                    'translated_text': translated_text,
-                    'source_language': 'en',
-                    'target_language': 'zh'
-                }), 200
+                return jsonify(translation(translated_text)), 200
                 
             except Exception as e:
                 return jsonify({'error': f'Translation failed: {str(e)}'}), 500
         
+        @app.route('/api/translate/batch', methods=['POST'])
+        def translate_batch():
+            """Translate many texts and notes concurrently, results in request order"""
+            try:
+                texts, note_ids = validate_translation_batch(request.json)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            if note_ids and not (database_available and models_available):
+                return jsonify({'error': 'note_ids need the database - send texts instead'}), 400
+            
+            try:
+                notes_model = Note if note_ids else None
+                return jsonify(run_translation_batch(llm_client.translate_batch_to_chinese, notes_model, texts, note_ids)), 200
+            except Exception as e:
+                return jsonify({'error': f'Batch translation failed: {str(e)}'}), 500
+        
         @app.route('/api/complete', methods=['POST'])
         def complete_text():
-            """Auto-complete text using AI"""
+            """Auto-complete text using AI (streamed as SSE with "stream": true)"""
             try:
                 data = request.json
                 if not data or 'title' not in data or 'content' not in data:
@@ -272,15 +437,25 @@ if FLASK_AVAILABLE:
                 if not title and not content:
                     return jsonify({'error': 'Title or content must be provided'}), 400
                 
+                def completion(completion_result):
+                    return {
+                        'original': {'title': title, 'content': content},
+                        'suggestions': completion_result.get('suggestions', []),
+                        'improvements': completion_result.get('improvements', []),
+                        'additional_content': completion_result.get('additional_content', ''),
+                        'structure_tips': completion_result.get('structure_tips', [])
+                    }
+                
+                if wants_stream(request, data):
+                    return sse_response(stream_tokens(
+                        llm_client.stream_auto_complete_note(title, content),
+                        lambda reply: completion(llm_client.parse_completion(reply)),
+                        'Auto-completion failed'
+                    ))
+                
                 completion_result = llm_client.auto_complete_note(title, content)
                 
-                return jsonify({
-                    'original': {'title': title, 'content': content},
-                    'suggestions': completion_result.get('suggestions', []),
-                    'improvements': completion_result.get('improvements', []),
-                    'additional_content': completion_result.get('additional_content', ''),
-                    'structure_tips': completion_result.get('structure_tips', [])
-                }), 200
+                return jsonify(completion(completion_result)), 200
                 
             except Exception as e:
                 return jsonify({'error': f'Auto-completion failed: {str(e)}'}), 500
@@ -291,6 +466,10 @@ if FLASK_AVAILABLE:
         def translate_fallback():
             return jsonify({'error': 'AI translation not available - check GITHUB_AI_TOKEN'}), 503
         
+        @app.route('/api/translate/batch', methods=['POST'])
+        def translate_batch_fallback():
+            return jsonify({'error': 'AI translation not available - check GITHUB_AI_TOKEN'}), 503
+        
         @app.route('/api/complete', methods=['POST'])
         def complete_fallback():
             return jsonify({'error': 'AI completion not available - check GITHUB_AI_TOKEN'}), 503
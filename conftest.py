@@ -0,0 +1,88 @@
+"""
+Shared pytest fixtures: the notes API on a fresh in-memory SQLite database,
+and an LLM client whose model is a local fake
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from src.models.note import db
+from src.routes.note import note_bp
+from src.utils.fuzzy import trigram_index
+from src.utils.llm import LLMClient
+from src.utils.migrations import migrate
+from src.utils.response_cache import response_cache
+from src.utils.serialize import fragment_caches
+from src.utils.suggest import title_index
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    app.register_blueprint(note_bp, url_prefix='/api')
+    with app.app_context():
+        migrate(db.engine)
+        # Process-wide state would otherwise carry over from the last test's database
+        response_cache.clear()
+        title_index.clear()
+        trigram_index.clear()
+        for fragments in fragment_caches.values():
+            fragments.clear()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def create_note(client):
+    """POST a note and return its JSON"""
+    def create(title, content='content'):
+        response = client.post('/api/notes', json={'title': title, 'content': content})
+        assert response.status_code == 201
+        return response.get_json()
+    return create
+
+
+class FakeModel:
+    """
+    Stands in for AsyncOpenAI: replies with the prompt's text prefixed by
+    "zh:" (each item, for a JSON array) and records every prompt
+    """
+
+    def __init__(self):
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, stream=False, **kwargs):
+        prompt = messages[-1]['content'].split('\n\n', 1)[1]
+        self.prompts.append(prompt)
+        if prompt.startswith('['):
+            reply = json.dumps(['zh:' + text for text in json.loads(prompt)], ensure_ascii=False)
+        else:
+            reply = 'zh:' + prompt
+        if stream:
+            return self._chunks(reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+    async def _chunks(self, reply):
+        for piece in (reply[:3], reply[3:]):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+
+@pytest.fixture
+def llm(app):
+    """An LLMClient backed by FakeModel, caching in the test database"""
+    client = LLMClient()
+    client.token = 'test-token'
+    client._async_client = FakeModel()
+    client.cache.bind(db.engine)
+    return client
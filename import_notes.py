@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Bulk import notes from NDJSON or a zip of Markdown files
+
+Usage: python import_notes.py <file> [--batch-size N]
+"""
+import argparse
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add src to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.main import app
+from src.utils.importer import BATCH_SIZE, import_notes
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk import notes into the configured database')
+    parser.add_argument('file', help='NDJSON (.ndjson or .ndjson.gz) or a .zip of Markdown files')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='notes per transaction')
+    args = parser.parse_args()
+
+    with app.app_context():
+        from src.models.note import Note
+        from src.models.user import db
+
+        print("📥 Importing " + args.file + " into " + app.config['SQLALCHEMY_DATABASE_URI'])
+        started = time.time()
+        try:
+            with open(args.file, 'rb') as source:
+                for progress in import_notes(db.engine, Note, source, args.batch_size):
+                    print(f"   {progress['imported']} imported, {progress['skipped']} skipped "
+                          f"({time.time() - started:.1f}s)")
+        except Exception as e:
+            print(f"❌ Import failed: {e}")
+            sys.exit(1)
+
+        for error in progress['errors']:
+            print(f"⚠️  Skipped {error['source']}: {error['error']}")
+        print(f"✅ Imported {progress['imported']} notes in {time.time() - started:.1f}s")
@@ -21,8 +21,9 @@ if __name__ == '__main__':
     # Create database tables
     with app.app_context():
         from src.models.user import db
+        from src.utils.migrations import migrate
         try:
-            db.create_all()
+            migrate(db.engine)
             print("✅ Database tables created successfully")
         except Exception as e:
             print(f"❌ Database error: {e}")
@@ -4,6 +4,8 @@ Database configuration for different environments
 import os
 from urllib.parse import urlparse
 
+from src.utils.pooling import engine_options
+
 class Config:
     """Base configuration"""
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
@@ -34,16 +36,7 @@ class ProductionConfig(Config):
         raise ValueError("DATABASE_URL environment variable is required for production")
     
     # Additional production settings
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-        'pool_size': 10,
-        'max_overflow': 20,
-        'connect_args': {
-            'sslmode': 'require',
-            'connect_timeout': 30,
-        }
-    }
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(database_url, pool_size=10, max_overflow=20, connect_timeout=30)
 
 class TestConfig(Config):
     """Testing configuration"""
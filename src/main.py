@@ -14,6 +14,10 @@ try:
     from src.routes.user import user_bp  
     from src.routes.note import note_bp
     from src.models.note import Note
+    from src.utils.migrations import migrate
+    from src.utils.compression import init_compression
+    from src.utils.pooling import engine_options, pool_stats
+    from src.utils.llm import llm_client
 except ImportError as e:
     print(f"Import error: {e}")
     # Fallback imports for Vercel
@@ -37,16 +41,8 @@ if DATABASE_URL:
             DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://')
         
         app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-            'pool_pre_ping': True,
-            'pool_recycle': 300,
-            'pool_size': 3,  # Reduced for serverless
-            'max_overflow': 5,  # Reduced for serverless
-            'connect_args': {
-                'sslmode': 'require',
-                'connect_timeout': 15,  # Shorter timeout for serverless
-            }
-        }
+        # Pooling mode (queue, null, transaction) comes from DB_POOL_MODE
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(DATABASE_URL)
         database_connected = True
         print(f"✅ Database configured: {DATABASE_URL[:50]}...")
         
@@ -66,9 +62,14 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # Enable CORS
 CORS(app, 
      origins=['*'],
-     methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
+     methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'],
      allow_headers=['Content-Type', 'Authorization'])
 
+# Compress responses, and serve static files from copies compressed once on first request
+static_assets = None
+if 'init_compression' in locals():
+    static_assets = init_compression(app, app.static_folder)
+
 # Initialize database and routes with better error handling
 db_initialized = False
 routes_registered = False
@@ -100,8 +101,10 @@ except Exception as e:
 if db_initialized:
     try:
         with app.app_context():
-            db.create_all()
+            migrate(db.engine)
             print("✅ Database tables created")
+            # Keep AI results across restarts and instances
+            llm_client.cache.bind(db.engine)
     except Exception as e:
         print(f"❌ Database table creation error: {e}")
 
@@ -110,6 +113,8 @@ def index():
     """Serve the main application"""
     try:
         static_path = os.path.join(os.path.dirname(__file__), 'static', 'index.html')
+        if static_assets is not None:
+            return static_assets.send('index.html')
         if os.path.exists(static_path):
             return send_from_directory(os.path.join(os.path.dirname(__file__), 'static'), 'index.html')
         else:
@@ -155,6 +160,11 @@ def health_check():
             health_status['database_test'] = f'failed: {str(e)}'
             health_status['status'] = 'degraded'
     
+    if db_initialized:
+        health_status['pool'] = pool_stats.snapshot(db.engine.pool)
+    health_status['llm_cache'] = llm_client.cache.stats()
+    health_status['llm_requests'] = llm_client.flights.stats()
+    
     return jsonify(health_status)
 
 @app.errorhandler(404)
@@ -169,7 +179,7 @@ if __name__ == '__main__':
     # Create tables for local development
     with app.app_context():
         try:
-            db.create_all()
+            migrate(db.engine)
             print("Database tables created successfully")
         except Exception as e:
             print(f"Database error: {e}")
@@ -1,13 +1,30 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import event, inspect
 from src.models.user import db
+from src.utils.content import CompressedText
+from src.utils.summary import note_summary
+# Registers the SQLite functions that the note_fts triggers call
+import src.utils.search
 
 class Note(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    # Deferred: loaded only when accessed or undeferred, so title-only queries skip it
+    content = db.deferred(db.Column(CompressedText, nullable=False))
+    # Derived from content on every write so listings can skip content
+    preview = db.Column(db.String(200))
+    content_length = db.Column(db.Integer)
+    word_count = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Incremented by SQLAlchemy on every ORM update; the basis of the note's ETag
+    version = db.Column(db.Integer, nullable=False, server_default=db.text('1'))
+    # Set by database triggers in commit order (see src/utils/versioning.py)
+    change_seq = db.Column(db.BigInteger, nullable=False, server_default=db.text('0'))
+
+    # Indexes are created by src/utils/migrations.py
+    __mapper_args__ = {'version_id_col': version}
     
     def __repr__(self):
         return f'<Note {self.title}>'
@@ -17,7 +34,41 @@ class Note(db.Model):
             'id': self.id,
             'title': self.title,
             'content': self.content,
+            'preview': self.preview,
+            'content_length': self.content_length,
+            'word_count': self.word_count,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version
         }
 
+
+@event.listens_for(Note, 'before_insert')
+@event.listens_for(Note, 'before_update')
+def _summarize_content(mapper, connection, target):
+    """Recompute the summary fields whenever content is written"""
+    if inspect(target).attrs.content.history.has_changes():
+        for field, value in note_summary(target.content).items():
+            setattr(target, field, value)
+
+
+class NoteTombstone(db.Model):
+    """Deletion record left behind for sync clients when a note is deleted"""
+    __tablename__ = 'note_tombstone'
+    id = db.Column(db.Integer, primary_key=True)
+    note_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    change_seq = db.Column(db.BigInteger, nullable=False, server_default=db.text('0'))
+
+    def to_dict(self):
+        return {
+            'id': self.note_id,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
+        }
+
+
+@event.listens_for(Note, 'after_delete')
+def _leave_tombstone(mapper, connection, target):
+    connection.execute(NoteTombstone.__table__.insert().values(
+        note_id=target.id, deleted_at=datetime.utcnow()
+    ))
@@ -1,14 +1,56 @@
-from flask import Blueprint, jsonify, request
-from src.models.note import Note, db
+from flask import Blueprint, abort, jsonify, request
+from sqlalchemy.orm import undefer
+from sqlalchemy.orm.exc import StaleDataError
+from src.models.note import Note, NoteTombstone, db
+from src.utils.batch import run_batch, validate_batch
+from src.utils.changes import change_feed
+from src.utils.export import export_response
 from src.utils.llm import llm_client
+from src.utils.pagination import paginate_notes, parse_limit
+from src.utils.fuzzy import fuzzy_search
+from src.utils.importer import import_response, upload_source
+from src.utils.search import fulltext_search
+from src.utils.sse import sse_response, stream_fields, stream_tokens, wants_stream
+from src.utils.response_cache import cache_key, response_cache
+from src.utils.serialize import json_response, note_columns, note_page_json, notes_json, parse_fields
+from src.utils.suggest import DEFAULT_SUGGESTIONS, suggest_titles
+from src.utils.textpatch import apply_edits
+from src.utils.translation_batch import run_translation_batch, validate_translation_batch
+from src.utils.writes import PreconditionFailed, delete_note_row, if_match_versions, update_note_row
+from src.utils.versioning import collection_etag, collection_version, matching_etag, not_modified, note_etag, tag_response
 
 note_bp = Blueprint('note', __name__)
 
 @note_bp.route('/notes', methods=['GET'])
 def get_notes():
-    """Get all notes, ordered by most recently updated"""
-    notes = Note.query.order_by(Note.updated_at.desc()).all()
-    return jsonify([note.to_dict() for note in notes])
+    """
+    Get a page of notes, ordered by most recently updated
+
+    Query parameters: limit, cursor (the next_cursor of the previous page),
+    updated_after and updated_before (ISO 8601 timestamps), and
+    fields=summary to send preview, content_length and word_count instead
+    of content. Honors
+    If-None-Match against an ETag derived from the collection version, and
+    serves repeat requests from the response cache until the next write.
+    """
+    # Read the version before the rows so a concurrent write can only make the ETag older
+    etag = collection_etag(collection_version(db.session), request.args)
+    matched = matching_etag(request.if_none_match, etag)
+    if matched:
+        return not_modified(matched)
+
+    key = cache_key('list', etag)
+    body = response_cache.get(key)
+    if body is None:
+        try:
+            fields = parse_fields(request.args.get('fields'))
+            rows, next_cursor = paginate_notes(Note.query.with_entities(*note_columns(Note, fields)), Note, request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        body = note_page_json(rows, next_cursor, fields)
+        response_cache.set(key, body)
+
+    return tag_response(json_response(body), etag)
 
 @note_bp.route('/notes', methods=['POST'])
 def create_note():
@@ -21,63 +63,205 @@ def create_note():
         note = Note(title=data['title'], content=data['content'])
         db.session.add(note)
         db.session.commit()
-        return jsonify(note.to_dict()), 201
+        return tag_response(jsonify(note.to_dict()), note_etag(note.id, note.version)), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @note_bp.route('/notes/<int:note_id>', methods=['GET'])
 def get_note(note_id):
-    """Get a specific note by ID"""
-    note = Note.query.get_or_404(note_id)
-    return jsonify(note.to_dict())
+    """Get a specific note by ID, honoring If-None-Match against its version"""
+    if request.if_none_match:
+        # Answer revalidations from the version column alone
+        version = db.session.query(Note.version).filter(Note.id == note_id).scalar()
+        if version is None:
+            abort(404)
+        etag = note_etag(note_id, version)
+        matched = matching_etag(request.if_none_match, etag)
+        if matched:
+            return not_modified(matched)
+
+    note = Note.query.options(undefer(Note.content)).get_or_404(note_id)
+    return tag_response(jsonify(note.to_dict()), note_etag(note.id, note.version))
 
 @note_bp.route('/notes/<int:note_id>', methods=['PUT'])
 def update_note(note_id):
-    """Update a specific note"""
+    """
+    Update a specific note in a single statement
+
+    Send the note's ETag in If-Match to update it only if it is unchanged;
+    otherwise the response is 412.
+    """
     try:
-        note = Note.query.get_or_404(note_id)
         data = request.json
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        note.title = data.get('title', note.title)
-        note.content = data.get('content', note.content)
+        row = update_note_row(db.session, Note, note_id, data, if_match_versions(request.if_match, note_id))
+    except PreconditionFailed:
+        return jsonify({'error': 'Note has changed'}), 412
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+    if row is None:
+        abort(404)
+    return tag_response(jsonify(Note(**row._mapping).to_dict()), note_etag(row.id, row.version))
+
+@note_bp.route('/notes/<int:note_id>', methods=['PATCH'])
+def patch_note(note_id):
+    """
+    Apply a compact content diff against a base version (used by autosave)
+
+    Body: base_version, optional title, and optional content_edits splices
+    (see src/utils/textpatch.py). Returns 409 if the note has changed
+    since base_version.
+    """
+    note = Note.query.options(undefer(Note.content)).get_or_404(note_id)
+    data = request.json
+    if not data or 'base_version' not in data:
+        return jsonify({'error': 'base_version is required'}), 400
+    if data['base_version'] != note.version:
+        return jsonify({'error': 'Note has changed since base_version', 'version': note.version}), 409
+
+    try:
+        if 'content_edits' in data:
+            note.content = apply_edits(note.content, data['content_edits'])
+        if 'title' in data:
+            note.title = data['title']
         db.session.commit()
-        return jsonify(note.to_dict())
+        return tag_response(jsonify(note.to_dict()), note_etag(note.id, note.version))
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except StaleDataError:
+        # Another write landed between reading and updating the note
+        db.session.rollback()
+        return jsonify({'error': 'Note has changed since base_version'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @note_bp.route('/notes/<int:note_id>', methods=['DELETE'])
 def delete_note(note_id):
-    """Delete a specific note"""
+    """Delete a specific note in a single statement, honoring If-Match like PUT"""
     try:
-        note = Note.query.get_or_404(note_id)
-        db.session.delete(note)
-        db.session.commit()
-        return '', 204
+        found = delete_note_row(db.session, Note, NoteTombstone, note_id, if_match_versions(request.if_match, note_id))
+    except PreconditionFailed:
+        return jsonify({'error': 'Note has changed'}), 412
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+    if not found:
+        abort(404)
+    return '', 204
+
 @note_bp.route('/notes/search', methods=['GET'])
 def search_notes():
-    """Search notes by title or content"""
+    """
+    Full-text search over titles and content, best match first
+
+    Every term must match; wrap words in double quotes to match a phrase.
+    Pass fuzzy=1 to rank by trigram similarity instead, tolerating typos,
+    and fields=summary to leave out content.
+    """
     query = request.args.get('q', '')
     if not query:
         return jsonify([])
-    
-    notes = Note.query.filter(
-        (Note.title.contains(query)) | (Note.content.contains(query))
-    ).order_by(Note.updated_at.desc()).all()
-    
-    return jsonify([note.to_dict() for note in notes])
+
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    key = cache_key('search', collection_etag(collection_version(db.session), request.args))
+    body = response_cache.get(key)
+    if body is None:
+        if request.args.get('fuzzy') in ('1', 'true'):
+            notes = fuzzy_search(Note, NoteTombstone, query, limit, columns=note_columns(Note, fields))
+        else:
+            notes = fulltext_search(Note, query, limit, columns=note_columns(Note, fields))
+        body = notes_json(notes, fields)
+        response_cache.set(key, body)
+    return json_response(body)
+
+@note_bp.route('/notes/batch', methods=['POST'])
+def batch_notes():
+    """
+    Run many create/update/delete operations and a multi-get in one transaction
+
+    Body: {"operations": [{"op": "create", "title", "content"},
+    {"op": "update", "id", "title"?, "content"?}, {"op": "delete", "id"}],
+    "get": [ids]}. Returns a result per operation in request order.
+    """
+    try:
+        operations, get_ids = validate_batch(request.json)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        return jsonify(run_batch(db.session, Note, NoteTombstone, operations, get_ids))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@note_bp.route('/notes/export', methods=['GET'])
+def export_notes():
+    """Download every note as NDJSON, gzip-compressed with ?gzip=1"""
+    compress = request.args.get('gzip', '').lower() in ('1', 'true')
+    return export_response(db.engine, Note, compress)
+
+@note_bp.route('/notes/import', methods=['POST'])
+def import_notes():
+    """
+    Bulk import NDJSON (optionally gzipped) or a zip of Markdown files,
+    uploaded as the ``file`` form field or the raw body. Streams progress
+    back as NDJSON, one line per committed batch.
+    """
+    try:
+        source = upload_source(request)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return import_response(db.engine, Note, source)
+
+@note_bp.route('/notes/changes', methods=['GET'])
+def get_changes():
+    """
+    Delta sync feed: notes created, updated or deleted since a cursor
+
+    Pass the previous response's next_cursor as since; omit it for a full
+    initial sync. Deletions appear as tombstones.
+    """
+    try:
+        return jsonify(change_feed(Note, NoteTombstone, request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@note_bp.route('/notes/suggest', methods=['GET'])
+def suggest_notes():
+    """Autocomplete note titles for the search box, returning id/title pairs"""
+    prefix = request.args.get('prefix', '')
+    if not prefix.strip():
+        return jsonify([])
+
+    try:
+        limit = parse_limit(request.args.get('limit'), default=DEFAULT_SUGGESTIONS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(suggest_titles(Note, NoteTombstone, prefix, limit))
 
 @note_bp.route('/translate', methods=['POST'])
 def translate_text():
-    """Translate English text to Chinese using AI"""
+    """
+    Translate English text to Chinese using AI
+
+    Send "stream": true to receive the translation as server-sent events
+    while it is generated (see src/utils/sse.py).
+    """
     try:
         data = request.json
         if not data or 'text' not in data:
@@ -87,49 +271,100 @@ def translate_text():
         if not text_to_translate.strip():
             return jsonify({'error': 'Text cannot be empty'}), 400
         
+        def translation(translated_text):
+            return {
+                'original_text': text_to_translate,
+                'translated_text': translated_text,
+                'source_language': 'en',
+                'target_language': 'zh'
+            }
+        
+        if wants_stream(request, data):
+            return sse_response(stream_tokens(
+                llm_client.stream_translate_to_chinese(text_to_translate), translation, 'Translation failed'
+            ))
+        
         # Use the LLM client to translate
         translated_text = llm_client.translate_to_chinese(text_to_translate)
         
-        return jsonify({
-            'original_text': text_to_translate,
-            'translated_text': translated_text,
-            'source_language': 'en',
-            'target_language': 'zh'
-        }), 200
+        return jsonify(translation(translated_text)), 200
         
     except Exception as e:
         return jsonify({'error': f'Translation failed: {str(e)}'}), 500
 
 @note_bp.route('/notes/<int:note_id>/translate', methods=['POST'])
 def translate_note(note_id):
-    """Translate a specific note's content from English to Chinese"""
-    try:
-        note = Note.query.get_or_404(note_id)
-        
-        # Translate both title and content
-        translated_title = llm_client.translate_to_chinese(note.title)
-        translated_content = llm_client.translate_to_chinese(note.content)
-        
-        return jsonify({
-            'note_id': note_id,
-            'original': {
-                'title': note.title,
-                'content': note.content
-            },
-            'translated': {
-                'title': translated_title,
-                'content': translated_content
-            },
-            'source_language': 'en',
-            'target_language': 'zh'
-        }), 200
+    """Translate a specific note's content from English to Chinese, streamed as SSE with ?stream=1"""
+    try:
+        note = Note.query.options(undefer(Note.content)).get_or_404(note_id)
+        
+        def translation(translated):
+            return {
+                'note_id': note_id,
+                'original': {
+                    'title': note.title,
+                    'content': note.content
+                },
+                'translated': translated,
+                'source_language': 'en',
+                'target_language': 'zh'
+            }
+        
+        if wants_stream(request):
+            return sse_response(stream_fields([
+                ('title', llm_client.stream_translate_to_chinese(note.title)),
+                ('content', llm_client.stream_document_to_chinese(note.content))
+            ], translation, 'Note translation failed'))
+        
+        # Translate title and content in parallel
+        translated_title, translated_content = llm_client.translate_batch_to_chinese([note.title, note.content])
+        
+        return jsonify(translation({
+            'title': translated_title,
+            'content': translated_content
+        })), 200
         
     except Exception as e:
         return jsonify({'error': f'Note translation failed: {str(e)}'}), 500
 
+@note_bp.route('/translate/batch', methods=['POST'])
+def translate_batch():
+    """
+    Translate many texts and notes from English to Chinese in one request
+
+    Body: {"texts": [...], "note_ids": [...]}. Model calls run concurrently
+    and short paragraphs share prompts; results come back in request order.
+    """
+    try:
+        texts, note_ids = validate_translation_batch(request.json)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        return jsonify(run_translation_batch(llm_client.translate_batch_to_chinese, Note, texts, note_ids)), 200
+    except Exception as e:
+        return jsonify({'error': f'Batch translation failed: {str(e)}'}), 500
+
+def _completion(title, content, completion_result):
+    return {
+        'original': {
+            'title': title,
+            'content': content
+        },
+        'suggestions': completion_result.get('suggestions', []),
+        'improvements': completion_result.get('improvements', []),
+        'additional_content': completion_result.get('additional_content', ''),
+        'structure_tips': completion_result.get('structure_tips', [])
+    }
+
 @note_bp.route('/complete', methods=['POST'])
 def complete_text():
-    """Auto-complete and enhance text content using AI"""
+    """
+    Auto-complete and enhance text content using AI
+
+    Send "stream": true to receive the model's reply as server-sent events
+    while it is generated; the done event carries the parsed result.
+    """
     try:
         data = request.json
         if not data or 'title' not in data or 'content' not in data:
@@ -141,43 +376,41 @@ def complete_text():
         if not title and not content:
             return jsonify({'error': 'Title or content must be provided'}), 400
         
+        if wants_stream(request, data):
+            return sse_response(stream_tokens(
+                llm_client.stream_auto_complete_note(title, content),
+                lambda reply: _completion(title, content, llm_client.parse_completion(reply)),
+                'Auto-completion failed'
+            ))
+        
         # Use the LLM client to auto-complete
         completion_result = llm_client.auto_complete_note(title, content)
         
-        return jsonify({
-            'original': {
-                'title': title,
-                'content': content
-            },
-            'suggestions': completion_result.get('suggestions', []),
-            'improvements': completion_result.get('improvements', []),
-            'additional_content': completion_result.get('additional_content', ''),
-            'structure_tips': completion_result.get('structure_tips', [])
-        }), 200
+        return jsonify(_completion(title, content, completion_result)), 200
         
     except Exception as e:
         return jsonify({'error': f'Auto-completion failed: {str(e)}'}), 500
 
 @note_bp.route('/notes/<int:note_id>/complete', methods=['POST'])
 def complete_note(note_id):
-    """Auto-complete and enhance a specific note using AI"""
+    """Auto-complete and enhance a specific note using AI, streamed as SSE with ?stream=1"""
     try:
-        note = Note.query.get_or_404(note_id)
+        note = Note.query.options(undefer(Note.content)).get_or_404(note_id)
+        
+        def completion(completion_result):
+            return {'note_id': note_id, **_completion(note.title, note.content, completion_result)}
+        
+        if wants_stream(request):
+            return sse_response(stream_tokens(
+                llm_client.stream_auto_complete_note(note.title, note.content),
+                lambda reply: completion(llm_client.parse_completion(reply)),
+                'Note auto-completion failed'
+            ))
         
         # Use the LLM client to auto-complete
         completion_result = llm_client.auto_complete_note(note.title, note.content)
         
-        return jsonify({
-            'note_id': note_id,
-            'original': {
-                'title': note.title,
-                'content': note.content
-            },
-            'suggestions': completion_result.get('suggestions', []),
-            'improvements': completion_result.get('improvements', []),
-            'additional_content': completion_result.get('additional_content', ''),
-            'structure_tips': completion_result.get('structure_tips', [])
-        }), 200
+        return jsonify(completion(completion_result)), 200
         
     except Exception as e:
         return jsonify({'error': f'Note auto-completion failed: {str(e)}'}), 500
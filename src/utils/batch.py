@@ -0,0 +1,165 @@
+"""
+Bulk note operations in a single transaction
+
+Creates, updates and deletes are grouped and sent as multi-row INSERTs and
+executemany UPDATEs/DELETEs through SQLAlchemy Core instead of one ORM
+flush per note. Core statements bypass the ORM hooks, so this module bumps
+versions, writes tombstones and publishes note_events itself.
+"""
+from datetime import datetime
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import undefer
+
+from src.utils import note_events
+from src.utils.summary import note_summary
+
+MAX_OPERATIONS = 1000
+
+# Fields an update may set, in the order used to group updates
+_UPDATE_FIELDS = ('title', 'content')
+
+
+def validate_batch(data):
+    """
+    Check a batch request body before touching the database
+
+    Returns:
+        tuple: (operations, ids to fetch)
+
+    Raises:
+        ValueError: Describing the first invalid operation
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    operations = data.get('operations', [])
+    get_ids = data.get('get', [])
+    if not isinstance(operations, list) or not isinstance(get_ids, list):
+        raise ValueError('operations and get must be lists')
+    if len(operations) + len(get_ids) > MAX_OPERATIONS:
+        raise ValueError(f'A batch may contain at most {MAX_OPERATIONS} operations')
+    if not all(isinstance(note_id, int) for note_id in get_ids):
+        raise ValueError('get must be a list of note ids')
+
+    seen_ids = set()
+    for index, operation in enumerate(operations):
+        kind = operation.get('op') if isinstance(operation, dict) else None
+        if kind == 'create':
+            if not isinstance(operation.get('title'), str) or not isinstance(operation.get('content'), str):
+                raise ValueError(f'Operation {index}: create needs title and content')
+        elif kind in ('update', 'delete'):
+            note_id = operation.get('id')
+            if not isinstance(note_id, int):
+                raise ValueError(f'Operation {index}: {kind} needs an integer id')
+            if note_id in seen_ids:
+                raise ValueError(f'Operation {index}: note {note_id} appears more than once')
+            seen_ids.add(note_id)
+            if kind == 'update':
+                fields = [field for field in _UPDATE_FIELDS if field in operation]
+                if not fields or not all(isinstance(operation[field], str) for field in fields):
+                    raise ValueError(f'Operation {index}: update needs a title and/or content')
+        else:
+            raise ValueError(f'Operation {index}: op must be create, update or delete')
+
+    return operations, get_ids
+
+
+def run_batch(session, model, tombstone_model, operations, get_ids):
+    """
+    Execute validated operations in one transaction and commit
+
+    Returns:
+        dict: ``results`` with one entry per operation, in request order,
+        and ``notes`` for the requested ids (``missing`` lists the rest)
+    """
+    table = model.__table__
+    now = datetime.utcnow()
+    results = [None] * len(operations)
+    upserts = {}
+
+    creates = [(index, op) for index, op in enumerate(operations) if op['op'] == 'create']
+    updates = [(index, op) for index, op in enumerate(operations) if op['op'] == 'update']
+    deletes = [(index, op) for index, op in enumerate(operations) if op['op'] == 'delete']
+
+    if creates:
+        values = [{'title': op['title'], 'content': op['content'], **note_summary(op['content']),
+                   'created_at': now, 'updated_at': now, 'version': 1} for _index, op in creates]
+        if session.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+            rows = session.execute(table.insert().returning(*table.c, sort_by_parameter_order=True), values).all()
+        else:
+            # No RETURNING for multi-row INSERTs (e.g. MySQL): insert one at a time, then read them back
+            new_ids = [session.execute(table.insert().values(row)).inserted_primary_key[0] for row in values]
+            stored = {row.id: row for row in session.execute(select(table).where(table.c.id.in_(new_ids)))}
+            rows = [stored[note_id] for note_id in new_ids]
+        for (index, _op), row in zip(creates, rows):
+            note = model(**row._mapping)
+            results[index] = {'index': index, 'op': 'create', 'status': 201, 'note': note.to_dict()}
+            upserts[note.id] = (note.title, note.content)
+
+    # One SELECT tells which update/delete targets exist and gives the
+    # current text that the in-process indexes need
+    target_ids = [op['id'] for _index, op in updates + deletes]
+    existing = {}
+    if target_ids:
+        existing = {row.id: row for row in session.execute(
+            select(table).where(table.c.id.in_(target_ids))
+        )}
+
+    groups = {}
+    for index, op in updates:
+        if op['id'] not in existing:
+            results[index] = {'index': index, 'op': 'update', 'status': 404, 'error': 'Note not found'}
+            continue
+        changes = {field: op[field] for field in _UPDATE_FIELDS if field in op}
+        if 'content' in changes:
+            changes.update(note_summary(changes['content']))
+        groups.setdefault(tuple(changes), []).append((index, op['id'], changes))
+
+    for fields, group in groups.items():
+        # executemany needs the same parameters in every row
+        statement = table.update().where(table.c.id == bindparam('note_id')).values(
+            updated_at=now, version=table.c.version + 1,
+            **{field: bindparam(f'new_{field}') for field in fields}
+        )
+        session.execute(statement, [
+            {'note_id': note_id, **{f'new_{field}': value for field, value in changes.items()}}
+            for _index, note_id, changes in group
+        ])
+
+    # Read the updated rows back: the PostgreSQL trigger sets updated_at itself
+    updated = [(index, note_id) for group in groups.values() for index, note_id, _changes in group]
+    if updated:
+        stored = {row.id: row for row in session.execute(
+            select(table).where(table.c.id.in_([note_id for _index, note_id in updated]))
+        )}
+        for index, note_id in updated:
+            note = model(**stored[note_id]._mapping)
+            results[index] = {'index': index, 'op': 'update', 'status': 200, 'note': note.to_dict()}
+            upserts[note_id] = (note.title, note.content)
+
+    deleted_ids = []
+    for index, op in deletes:
+        if op['id'] not in existing:
+            results[index] = {'index': index, 'op': 'delete', 'status': 404, 'error': 'Note not found'}
+            continue
+        deleted_ids.append(op['id'])
+        results[index] = {'index': index, 'op': 'delete', 'status': 204}
+    if deleted_ids:
+        session.execute(table.delete().where(table.c.id.in_(deleted_ids)))
+        session.execute(tombstone_model.__table__.insert().values(
+            [{'note_id': note_id, 'deleted_at': now} for note_id in deleted_ids]
+        ))
+
+    notes, missing = [], []
+    if get_ids:
+        found = {note.id: note for note in model.query.options(undefer(model.content)).filter(model.id.in_(get_ids))}
+        for note_id in get_ids:
+            if note_id in found:
+                notes.append(found[note_id].to_dict())
+            else:
+                missing.append(note_id)
+
+    session.commit()
+    note_events.publish(upserts, deleted_ids)
+
+    return {'results': results, 'notes': notes, 'missing': missing}
@@ -0,0 +1,96 @@
+"""
+Delta sync feed over notes and their deletion tombstones
+
+Both streams are read in ascending ``change_seq`` order through their
+indexes and merged. change_seq is assigned in commit order (see
+versioning.py), so a write that was timestamped before a client's last
+sync but committed after it still sorts after the client's cursor, and a
+client that stores the returned cursor fetches exactly what changed since.
+"""
+import base64
+import json
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import undefer
+
+from src.utils.pagination import parse_limit
+
+# Within one transaction's change_seq, upserts sort before deletes
+UPSERT, DELETE = 0, 1
+
+
+def encode_change_cursor(change_seq, kind, row_id):
+    """Encode the position of the last change on a page into an opaque cursor"""
+    payload = json.dumps([change_seq, kind, row_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_change_cursor(cursor):
+    """
+    Decode a cursor produced by encode_change_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        change_seq, kind, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return int(change_seq), int(kind), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def _after(query, seq_column, id_column, kind, position, limit):
+    if position is not None:
+        change_seq, after_kind, after_id = position
+        if kind > after_kind:
+            query = query.filter(seq_column >= change_seq)
+        elif kind < after_kind:
+            query = query.filter(seq_column > change_seq)
+        else:
+            query = query.filter(tuple_(seq_column, id_column) > tuple_(change_seq, after_id))
+    return query.order_by(seq_column, id_column).limit(limit + 1).all()
+
+
+def change_feed(model, tombstone_model, args):
+    """
+    Notes created, updated or deleted after the ``since`` cursor
+
+    Args:
+        model: The note model class
+        tombstone_model: The note tombstone model class
+        args: Request query arguments (since, limit)
+
+    Returns:
+        dict: ``changes`` in commit order, ``next_cursor`` to pass as
+        ``since`` next time, and ``has_more`` if another page is waiting
+
+    Raises:
+        ValueError: If since or limit is invalid
+    """
+    limit = parse_limit(args.get('limit'))
+    since = args.get('since')
+    position = decode_change_cursor(since) if since else None
+
+    notes = _after(
+        model.query.options(undefer(model.content)), model.change_seq, model.id, UPSERT, position, limit
+    )
+    tombstones = _after(
+        tombstone_model.query, tombstone_model.change_seq, tombstone_model.id, DELETE, position, limit
+    )
+
+    changes = sorted(
+        [((note.change_seq, UPSERT, note.id), {'type': 'upsert', 'note': note.to_dict()}) for note in notes] +
+        [((tombstone.change_seq, DELETE, tombstone.id), {'type': 'delete', **tombstone.to_dict()})
+         for tombstone in tombstones],
+        key=lambda change: change[0]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    next_cursor = encode_change_cursor(*changes[-1][0]) if changes else since
+    return {
+        'changes': [change for _key, change in changes],
+        'next_cursor': next_cursor,
+        'has_more': has_more
+    }
@@ -0,0 +1,199 @@
+"""
+Negotiated gzip/brotli compression for Flask responses
+
+Dynamic responses above MIN_SIZE are compressed after the view runs.
+Streamed responses (export, import progress) are compressed chunk by chunk
+and flushed after each one, so clients still see data as it is produced.
+Static files are compressed once, on first request, at the highest levels and
+served from memory. Brotli is used when the ``brotli`` package is installed
+and the client accepts it; gzip otherwise.
+"""
+import hashlib
+import mimetypes
+import os
+import threading
+import zlib
+
+from flask import Response, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = 1024
+
+# Codings this module produces; each compressed representation gets its own
+# ETag, the uncompressed one's with "-<coding>" appended
+CONTENT_CODINGS = ('gzip', 'br')
+
+# Per-request compression favours speed; static assets are done once, so
+# they get the best ratio
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/x-ndjson', 'application/javascript', 'image/svg+xml'
+)
+
+
+def negotiate(accept_encodings):
+    """The best content coding the client accepts, or None"""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def encoded_etag(etag, encoding):
+    """The ETag of a representation in the given content coding (None for identity)"""
+    return f'{etag}-{encoding}' if encoding else etag
+
+
+def _compressible(mimetype):
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(data, encoding, static=False):
+    """Compress a whole body"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=STATIC_BROTLI_QUALITY if static else BROTLI_QUALITY)
+    compressor = zlib.compressobj(STATIC_GZIP_LEVEL if static else GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding):
+    """Compress a stream of byte chunks, flushing after every chunk"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _encoded_chunks(chunks):
+    for chunk in chunks:
+        yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+
+def compress_response(response):
+    """after_request hook that compresses eligible responses in place"""
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.direct_passthrough
+            or not _compressible(response.mimetype)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(_encoded_chunks(response.response), encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < MIN_SIZE:
+            return response
+        response.set_data(compress(data, encoding))
+
+    # A strong ETag names exactly one representation, so each coding gets
+    # its own; routes accept every coding's tag in If-None-Match
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+class StaticAssets:
+    """
+    Files from a directory, read and compressed once on first request
+
+    Compressing at brotli's highest level takes a noticeable fraction of a
+    second, so it is deferred from cold start to the first request for each
+    asset. Assets are served with an ETag and answer conditional requests.
+    Anything not found at startup (new files) falls back to
+    send_from_directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._assets = {}
+        self._lock = threading.Lock()
+        self._files = set()
+        if not os.path.isdir(directory):
+            return
+        for root, _dirs, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                self._files.add(os.path.relpath(path, directory).replace(os.sep, '/'))
+
+    def _load(self, filename):
+        with self._lock:
+            if filename not in self._assets:
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                with open(os.path.join(self.directory, filename), 'rb') as f:
+                    data = f.read()
+                variants = {None: data}
+                if _compressible(mimetype) and len(data) >= MIN_SIZE:
+                    variants['gzip'] = compress(data, 'gzip', static=True)
+                    if brotli is not None:
+                        variants['br'] = compress(data, 'br', static=True)
+                etag = hashlib.sha1(data).hexdigest()[:16]
+                self._assets[filename] = (mimetype, etag, variants)
+            return self._assets[filename]
+
+    def send(self, filename):
+        """A response for one asset, in the best encoding the client accepts"""
+        asset = self._assets.get(filename)
+        if asset is None:
+            if filename not in self._files:
+                return send_from_directory(self.directory, filename)
+            asset = self._load(filename)
+
+        mimetype, etag, variants = asset
+        encoding = negotiate(request.accept_encodings)
+        if encoding not in variants:
+            encoding = None
+
+        response = Response(variants[encoding], mimetype=mimetype)
+        if len(variants) > 1:
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(encoded_etag(etag, encoding))
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+
+def init_compression(app, static_directory=None):
+    """
+    Compress the app's dynamic responses, and serve ``static_directory``
+    (normally the app's static folder) from copies compressed on first request
+
+    Returns:
+        StaticAssets: The loaded assets, or None without a static directory
+    """
+    app.after_request(compress_response)
+    if not static_directory:
+        return None
+
+    assets = StaticAssets(static_directory)
+    if app.static_folder and os.path.abspath(app.static_folder) == os.path.abspath(static_directory):
+        app.view_functions['static'] = assets.send
+    return assets
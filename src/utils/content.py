@@ -0,0 +1,75 @@
+"""
+Transparent compression of large note content
+
+On SQLite, content of COMPRESS_THRESHOLD bytes or more is stored as a
+zlib-compressed BLOB; shorter content stays TEXT, and reads tell the two
+apart by storage type, so existing rows need no migration. The FTS
+triggers see plain text through the note_text() SQL function.
+
+PostgreSQL already compresses large values when it moves them to TOAST
+storage, and compressing in the application would hide the text from the
+tsvector and pg_trgm indexes, so there the column stays plain text and is
+switched to the faster lz4 TOAST compression instead.
+"""
+import zlib
+
+from sqlalchemy import Text, text
+from sqlalchemy.types import TypeDecorator
+
+COMPRESS_THRESHOLD = 2048
+COMPRESSION_LEVEL = 6
+
+# PostgreSQL 14+; only affects values written afterwards
+POSTGRES_DDL = "ALTER TABLE note ALTER COLUMN content SET COMPRESSION lz4"
+# Lists lz4 when the server is 14+ and was built with it
+POSTGRES_LZ4_SUPPORT = "SELECT enumvals FROM pg_settings WHERE name = 'default_toast_compression'"
+
+
+def compress_content(value):
+    """
+    The value to store for a note's content
+
+    Returns:
+        str | bytes: The text itself, or zlib bytes if that is smaller
+    """
+    encoded = value.encode('utf-8')
+    if len(encoded) < COMPRESS_THRESHOLD:
+        return value
+    compressed = zlib.compress(encoded, COMPRESSION_LEVEL)
+    return compressed if len(compressed) < len(encoded) else value
+
+
+def decompress_content(value):
+    """Inverse of compress_content; also the note_text() SQLite function"""
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode('utf-8')
+    return value
+
+
+class CompressedText(TypeDecorator):
+    """Text column that SQLite stores compressed once it is large enough"""
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != 'sqlite':
+            return value
+        return compress_content(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name != 'sqlite':
+            return value
+        return decompress_content(value)
+
+
+def install_content_compression(engine):
+    """Switch note content to lz4 TOAST compression where PostgreSQL supports it"""
+    if engine.dialect.name != 'postgresql':
+        return
+    with engine.begin() as conn:
+        methods = conn.execute(text(POSTGRES_LZ4_SUPPORT)).scalar()
+        if not methods or 'lz4' not in methods:
+            print("⚠️  lz4 compression for note content unavailable; keeping the default")
+            return
+        conn.execute(text(POSTGRES_DDL))
@@ -0,0 +1,92 @@
+"""
+Streaming NDJSON export of every note
+
+Rows come from a server-side cursor on a dedicated connection and are
+written out in fixed-size chunks, so memory stays flat however many notes
+there are. The export is one SELECT, so it is a consistent snapshot.
+"""
+import json
+import zlib
+
+from flask import Response
+from sqlalchemy import select
+
+ROWS_PER_FETCH = 1000
+CHUNK_SIZE = 64 * 1024
+
+EXPORT_FIELDS = ('id', 'title', 'content', 'created_at', 'updated_at', 'version')
+
+
+def _record(row):
+    return {
+        'id': row.id,
+        'title': row.title,
+        'content': row.content,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+        'version': row.version
+    }
+
+
+def iter_ndjson(engine, model):
+    """
+    Yield the notes as UTF-8 NDJSON, one note per line, in id order
+
+    Args:
+        engine: The SQLAlchemy engine to read from
+        model: The note model class
+
+    Yields:
+        bytes: Chunks of roughly CHUNK_SIZE bytes
+    """
+    table = model.__table__
+    statement = select(*(table.c[field] for field in EXPORT_FIELDS)).order_by(table.c.id)
+
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=ROWS_PER_FETCH).execute(statement)
+        buffer = []
+        size = 0
+        for row in result:
+            line = json.dumps(_record(row), ensure_ascii=False) + '\n'
+            buffer.append(line)
+            size += len(line)
+            if size >= CHUNK_SIZE:
+                yield ''.join(buffer).encode('utf-8')
+                buffer = []
+                size = 0
+        if buffer:
+            yield ''.join(buffer).encode('utf-8')
+
+
+def gzip_chunks(chunks):
+    """Gzip a stream of byte chunks without buffering the whole stream"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(engine, model, compress=False):
+    """
+    A streamed download of all notes
+
+    Args:
+        engine: The SQLAlchemy engine to read from
+        model: The note model class
+        compress (bool): Send a ``.ndjson.gz`` file instead of plain NDJSON
+
+    Returns:
+        Response: The streaming response
+    """
+    chunks = iter_ndjson(engine, model)
+    if compress:
+        return Response(
+            gzip_chunks(chunks), mimetype='application/gzip',
+            headers={'Content-Disposition': 'attachment; filename=notes.ndjson.gz'}
+        )
+    return Response(
+        chunks, mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=notes.ndjson'}
+    )
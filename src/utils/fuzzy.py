@@ -0,0 +1,230 @@
+"""
+Typo-tolerant note search backed by trigram indexes
+
+PostgreSQL uses pg_trgm GIN indexes on title and content. Other databases
+use an in-process ``TrigramIndex`` over the note vocabulary, built on the
+first fuzzy query and kept current incrementally through note_events.
+Other processes' writes and deletes (through tombstones) are picked up at
+most every REFRESH_INTERVAL seconds by ``change_seq`` watermarks, as in
+suggest.py.
+"""
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+
+from sqlalchemy import func, literal, or_, text
+
+from src.utils import note_events
+from src.utils.tokenizer import trigrams, words
+
+# Minimum trigram similarity for a word to count as a match (pg_trgm's default)
+SIMILARITY_THRESHOLD = 0.3
+# Matches in the title weigh more than matches in the content
+TITLE_BOOST = 2.0
+# Seconds between checks for notes written by other processes
+REFRESH_INTERVAL = 5.0
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_note_title_trgm ON note USING GIN (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_note_content_trgm ON note USING GIN (content gin_trgm_ops)",
+]
+
+
+def install_fuzzy_index(engine):
+    """Create the pg_trgm indexes on PostgreSQL; other databases index in process"""
+    if engine.dialect.name != 'postgresql':
+        return
+    try:
+        with engine.begin() as conn:
+            for statement in POSTGRES_DDL:
+                conn.execute(text(statement))
+    except Exception as e:
+        # pg_trgm may not be installable with the app's privileges
+        print(f"⚠️  Fuzzy search index unavailable: {e}")
+
+
+class TrigramIndex:
+    """
+    In-memory trigram index over the words of every note
+
+    Query words are matched against the vocabulary by trigram similarity
+    (shared trigrams over the union, as in pg_trgm), then notes are scored
+    by their best-matching word for each query word.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._word_trigram_counts = {}
+        self._trigram_words = defaultdict(set)
+        self._word_notes = defaultdict(dict)
+        self._note_words = {}
+        self.built = False
+        self.watermark = 0
+        self.deleted_watermark = 0
+        self.refreshed_at = 0.0
+
+    def clear(self):
+        """Forget every note; the next query rebuilds the index"""
+        with self._lock:
+            self._word_trigram_counts = {}
+            self._trigram_words = defaultdict(set)
+            self._word_notes = defaultdict(dict)
+            self._note_words = {}
+            self.built = False
+            self.watermark = 0
+            self.deleted_watermark = 0
+            self.refreshed_at = 0.0
+
+    def _add(self, note_id, title, content):
+        weights = dict.fromkeys(words(content), 1.0)
+        weights.update(dict.fromkeys(words(title), TITLE_BOOST))
+        self._note_words[note_id] = set(weights)
+        for word, weight in weights.items():
+            self._word_notes[word][note_id] = weight
+            if word not in self._word_trigram_counts:
+                grams = trigrams(word)
+                self._word_trigram_counts[word] = len(grams)
+                for gram in grams:
+                    self._trigram_words[gram].add(word)
+
+    def _remove(self, note_id):
+        for word in self._note_words.pop(note_id, ()):
+            notes = self._word_notes[word]
+            notes.pop(note_id, None)
+            if notes:
+                continue
+            del self._word_notes[word]
+            del self._word_trigram_counts[word]
+            for gram in trigrams(word):
+                vocabulary = self._trigram_words[gram]
+                vocabulary.discard(word)
+                if not vocabulary:
+                    del self._trigram_words[gram]
+
+    def apply(self, upserts, deleted_ids):
+        """Apply committed note changes; ignored until the index is built"""
+        with self._lock:
+            if not self.built:
+                return
+            for note_id in deleted_ids:
+                self._remove(note_id)
+            for note_id, (title, content) in upserts.items():
+                self._remove(note_id)
+                self._add(note_id, title, content)
+
+    def refresh(self, model, tombstone_model):
+        """Build the index on first use, then periodically pick up other processes' writes and deletes"""
+        if self.built and time.monotonic() - self.refreshed_at < REFRESH_INTERVAL:
+            return
+        with self._lock:
+            if self.built:
+                self._remove_deleted(tombstone_model)
+            else:
+                # Tombstones older than the initial load are already reflected in it
+                self.deleted_watermark = tombstone_model.query.with_entities(
+                    func.max(tombstone_model.change_seq)
+                ).scalar() or 0
+
+            rows = model.query.with_entities(model.id, model.title, model.content, model.change_seq)
+            if self.built:
+                rows = rows.filter(model.change_seq > self.watermark)
+            for note_id, title, content, change_seq in rows.yield_per(1000):
+                self._remove(note_id)
+                self._add(note_id, title, content)
+                self.watermark = max(self.watermark, change_seq)
+            self.built = True
+            self.refreshed_at = time.monotonic()
+
+    def _remove_deleted(self, tombstone_model):
+        rows = tombstone_model.query.with_entities(tombstone_model.note_id, tombstone_model.change_seq).filter(
+            # Strictly after: a tombstone read twice could remove a note whose id was reused
+            tombstone_model.change_seq > self.deleted_watermark
+        )
+        for note_id, change_seq in rows:
+            self._remove(note_id)
+            self.deleted_watermark = max(self.deleted_watermark, change_seq)
+
+    def discard(self, note_ids):
+        """Drop notes found to be gone before the next refresh saw their tombstones"""
+        with self._lock:
+            for note_id in note_ids:
+                self._remove(note_id)
+
+    def search(self, query, limit):
+        """
+        Score notes against the query
+
+        Returns:
+            list: (note_id, score) pairs, best first
+        """
+        scores = defaultdict(float)
+        with self._lock:
+            for query_word in set(words(query)):
+                grams = trigrams(query_word)
+                shared = Counter()
+                for gram in grams:
+                    shared.update(self._trigram_words.get(gram, ()))
+
+                best = {}
+                for word, common in shared.items():
+                    similarity = common / (len(grams) + self._word_trigram_counts[word] - common)
+                    if similarity < SIMILARITY_THRESHOLD:
+                        continue
+                    for note_id, weight in self._word_notes[word].items():
+                        score = similarity * weight
+                        if score > best.get(note_id, 0.0):
+                            best[note_id] = score
+
+                for note_id, score in best.items():
+                    scores[note_id] += score
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+trigram_index = TrigramIndex()
+note_events.subscribe(trigram_index.apply)
+
+
+def fuzzy_search(model, tombstone_model, query, limit, columns=None):
+    """
+    Find notes whose words are similar to the query's words, tolerating typos
+
+    Args:
+        model: The note model class
+        tombstone_model: The tombstone model class, for other processes' deletes
+        query (str): The user's search text
+        limit (int): Maximum number of notes to return
+        columns: Return rows of just these columns instead of Note objects
+
+    Returns:
+        list: Matching notes, most similar first
+    """
+    base = model.query.with_entities(*columns) if columns else model.query
+    session = base.session
+
+    if session.get_bind().dialect.name == 'postgresql':
+        session.execute(
+            text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+            {'threshold': str(SIMILARITY_THRESHOLD)}
+        )
+        title_similarity = func.word_similarity(query, model.title)
+        content_similarity = func.word_similarity(query, model.content)
+        return base.filter(
+            or_(literal(query).op('<%')(model.title), literal(query).op('<%')(model.content))
+        ).order_by(
+            func.greatest(title_similarity * TITLE_BOOST, content_similarity).desc(),
+            model.updated_at.desc()
+        ).limit(limit).all()
+
+    trigram_index.refresh(model, tombstone_model)
+    while True:
+        ranked = trigram_index.search(query, limit)
+        ids = [note_id for note_id, _ in ranked]
+        notes = {note.id: note for note in base.filter(model.id.in_(ids))} if ids else {}
+        # Deleted by another process since the last refresh: drop them and rank again to fill the limit
+        gone = [note_id for note_id in ids if note_id not in notes]
+        if not gone:
+            return [notes[note_id] for note_id in ids]
+        trigram_index.discard(gone)
@@ -0,0 +1,245 @@
+"""
+Streaming bulk import of notes
+
+Accepts NDJSON (one note object per line, optionally gzipped, e.g. the
+output of /api/notes/export) or a zip of Markdown files. Records are parsed
+one at a time and written in large batches: ``COPY`` on PostgreSQL with
+psycopg2 and multi-row INSERTs elsewhere, one transaction per batch. Each
+batch is stamped with the time it is written as ``updated_at``, so sync
+clients and the in-process search indexes pick it up as a new change even
+when they read part way through a long import; the indexes are also told
+through note_events.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime
+
+from flask import Response, stream_with_context
+from sqlalchemy import select
+
+from src.utils import note_events
+from src.utils.pagination import parse_timestamp
+from src.utils.summary import SUMMARY_FIELDS, note_summary
+
+BATCH_SIZE = 5000
+# Keeps each multi-row INSERT under SQLite's bound parameter limit
+ROWS_PER_INSERT = 500
+MAX_REPORTED_ERRORS = 20
+TITLE_LENGTH = 200
+# Raw uploads are spooled to disk past this size so zips can be seeked
+SPOOL_SIZE = 8 * 1024 * 1024
+
+MARKDOWN_EXTENSIONS = ('.md', '.markdown', '.txt')
+IMPORT_COLUMNS = ('title', 'content') + SUMMARY_FIELDS + ('created_at', 'updated_at', 'version')
+
+
+def _ndjson_lines(fileobj):
+    for number, line in enumerate(fileobj, 1):
+        if line.strip():
+            yield f'line {number}', line
+
+
+def _markdown_note(filename, text):
+    """Use a leading ``# heading`` as the title, else the file name"""
+    lines = text.lstrip('\n').split('\n', 1)
+    if lines[0].startswith('# '):
+        return {'title': lines[0][2:].strip(), 'content': lines[1].lstrip('\n') if len(lines) > 1 else ''}
+    return {'title': os.path.splitext(os.path.basename(filename))[0], 'content': text}
+
+
+def _markdown_files(fileobj):
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith('__MACOSX/') or not name.lower().endswith(MARKDOWN_EXTENSIONS):
+                continue
+            with archive.open(info) as member:
+                text = member.read().decode('utf-8-sig', errors='replace')
+            yield name, _markdown_note(name, text)
+
+
+def read_source(fileobj):
+    """
+    Yield ``(location, record)`` pairs from a seekable binary file, picking
+    the format from its first bytes. NDJSON records are still unparsed.
+    """
+    head = fileobj.read(4)
+    fileobj.seek(0)
+    if head.startswith(b'PK\x03\x04'):
+        return _markdown_files(fileobj)
+    if head.startswith(b'\x1f\x8b'):
+        return _ndjson_lines(gzip.GzipFile(fileobj=fileobj))
+    return _ndjson_lines(fileobj)
+
+
+def _note_row(record):
+    """
+    Turn one parsed record into column values; the timestamps the record
+    does not provide are left for _write_batch to fill in
+
+    Raises:
+        ValueError: If the record is not a valid note
+    """
+    if isinstance(record, (bytes, str)):
+        try:
+            record = json.loads(record)
+        except ValueError:
+            raise ValueError('Invalid JSON')
+    if not isinstance(record, dict):
+        raise ValueError('Each record must be a JSON object')
+    title, content = record.get('title'), record.get('content')
+    if not isinstance(title, str) or not isinstance(content, str):
+        raise ValueError('Title and content are required')
+
+    created_at = record.get('created_at')
+    return {
+        'title': title[:TITLE_LENGTH],
+        'content': content,
+        **note_summary(content),
+        'created_at': parse_timestamp(created_at, 'created_at') if isinstance(created_at, str) else None,
+        'updated_at': None,
+        'version': 1
+    }
+
+
+def _copy_rows(conn, table, rows):
+    # QUOTE_ALL keeps empty strings distinct from NULL in COPY's CSV format
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    for row in rows:
+        writer.writerow([
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in (row[column] for column in IMPORT_COLUMNS)
+        ])
+    buffer.seek(0)
+    cursor = conn.connection.cursor()
+    cursor.copy_expert(f"COPY {table.name} ({', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _insert_rows(conn, table, rows):
+    # Core would recompile a multi-row insert().values() for every chunk,
+    # which costs more than the insert itself, so build the SQL directly
+    placeholder = '?' if conn.dialect.paramstyle == 'qmark' else '%s'
+    row_sql = '(' + ', '.join([placeholder] * len(IMPORT_COLUMNS)) + ')'
+    processors = [table.c[column].type.bind_processor(conn.dialect) for column in IMPORT_COLUMNS]
+
+    for start in range(0, len(rows), ROWS_PER_INSERT):
+        chunk = rows[start:start + ROWS_PER_INSERT]
+        params = tuple(
+            process(row[column]) if process else row[column]
+            for row in chunk
+            for column, process in zip(IMPORT_COLUMNS, processors)
+        )
+        conn.exec_driver_sql(
+            f"INSERT INTO {table.name} ({', '.join(IMPORT_COLUMNS)}) VALUES " + ', '.join([row_sql] * len(chunk)),
+            params
+        )
+
+
+def _write_batch(engine, table, rows):
+    # copy_expert is psycopg2's; other drivers (psycopg 3) use multi-row INSERTs
+    write = _copy_rows if engine.dialect.driver == 'psycopg2' else _insert_rows
+    now = datetime.utcnow()
+    for row in rows:
+        row['updated_at'] = now
+        if row['created_at'] is None:
+            row['created_at'] = now
+
+    with engine.begin() as conn:
+        write(conn, table, rows)
+        # Neither COPY nor the raw INSERT returns ids; the batch's stamp finds them
+        ids = conn.execute(
+            select(table.c.id).where(table.c.updated_at == now).order_by(table.c.id)
+        ).scalars().all()
+        if len(ids) == len(rows):
+            # Ids are assigned in insertion order
+            upserts = {note_id: (row['title'], row['content']) for note_id, row in zip(ids, rows)}
+        else:
+            # Another write shared the stamp; read the notes back instead
+            upserts = {
+                note_id: (title, content) for note_id, title, content in conn.execute(
+                    select(table.c.id, table.c.title, table.c.content).where(table.c.updated_at == now)
+                )
+            }
+    note_events.publish(upserts, [])
+
+
+def import_notes(engine, model, fileobj, batch_size=BATCH_SIZE):
+    """
+    Import every note in a file, committing one batch at a time
+
+    Invalid records are skipped and reported rather than aborting the
+    import, and batches that were already written stay committed.
+
+    Args:
+        engine: The SQLAlchemy engine to write to
+        model: The note model class
+        fileobj: A seekable binary file with NDJSON, gzipped NDJSON or a zip of Markdown
+        batch_size (int): Notes per transaction
+
+    Yields:
+        dict: Progress after each batch; the last one has ``done`` set and
+        lists up to MAX_REPORTED_ERRORS skipped records
+    """
+    table = model.__table__
+    imported = 0
+    skipped = 0
+    errors = []
+    batch = []
+
+    for location, record in read_source(fileobj):
+        try:
+            batch.append(_note_row(record))
+        except ValueError as e:
+            skipped += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'source': location, 'error': str(e)})
+            continue
+        if len(batch) >= batch_size:
+            _write_batch(engine, table, batch)
+            imported += len(batch)
+            batch = []
+            yield {'imported': imported, 'skipped': skipped}
+
+    if batch:
+        _write_batch(engine, table, batch)
+        imported += len(batch)
+    yield {'done': True, 'imported': imported, 'skipped': skipped, 'errors': errors}
+
+
+def upload_source(request):
+    """
+    The uploaded file as a seekable binary file: the ``file`` field of a
+    multipart form, or else the raw request body
+
+    Raises:
+        ValueError: If nothing was uploaded
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        return upload.stream
+
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    shutil.copyfileobj(request.stream, spooled)
+    if not spooled.tell():
+        raise ValueError('No file uploaded')
+    spooled.seek(0)
+    return spooled
+
+
+def import_response(engine, model, fileobj):
+    """Run an import, streaming its progress back as NDJSON"""
+    def progress():
+        try:
+            for update in import_notes(engine, model, fileobj):
+                yield json.dumps(update) + '\n'
+        except Exception as e:
+            yield json.dumps({'error': f'Import failed: {str(e)}'}) + '\n'
+
+    return Response(stream_with_context(progress()), mimetype='application/x-ndjson')
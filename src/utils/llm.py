@@ -1,22 +1,276 @@
+import asyncio
+import json
 import os
-from openai import OpenAI
+import threading
+from collections import deque
 from dotenv import load_dotenv
+from src.utils.llm_cache import LLMCache, llm_cache_key
+from src.utils.segments import paragraphs, stream_segments, translate_segments
+from src.utils.singleflight import BackgroundLoop, SingleFlight
+from src.utils.translation_batch import parse_pack, plan_jobs
 
 load_dotenv()
 
+# Model requests in flight at once per process; the rest wait their turn
+MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 4))
+
+
+def strip_stream(pieces):
+    """Yield the pieces of a streamed text with its outer whitespace removed, as str.strip() would"""
+    started = False
+    pending = ''
+    for piece in pieces:
+        if not started:
+            piece = piece.lstrip()
+            if not piece:
+                continue
+            started = True
+        stripped = piece.rstrip()
+        if stripped:
+            yield pending + stripped
+            pending = piece[len(stripped):]
+        else:
+            # Held back until more text follows, so trailing whitespace is dropped
+            pending += piece
+
+
 class LLMClient:
     def __init__(self):
         self.token = os.getenv("GITHUB_AI_TOKEN")
         self.endpoint = "https://models.github.ai/inference"
         self.model = "openai/gpt-4.1-mini"
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+        # Results of deterministic-enough prompts (translation, completion)
+        self.cache = LLMCache()
+        # Non-streaming requests run on this loop, limited and coalesced
+        self._loop = BackgroundLoop()
+        self._limit = None
+        self.flights = SingleFlight()
+    
+    @property
+    def configured(self) -> bool:
+        """Whether a token is available for AI requests"""
+        return bool(self.token)
+    
+    @property
+    def client(self):
+        """
+        The OpenAI client, created on first use
+        
+        openai takes most of a second to import, so cold starts that never
+        call the AI endpoints should not pay for it.
+        
+        Raises:
+            ValueError: If GITHUB_AI_TOKEN is not set
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if not self.token:
+                        raise ValueError("GITHUB_AI_TOKEN environment variable is required")
+                    from openai import OpenAI
+                    self._client = OpenAI(
+                        base_url=self.endpoint,
+                        api_key=self.token,
+                    )
+        return self._client
+    
+    @property
+    def async_client(self):
+        """The AsyncOpenAI client used on the request loop, created on first use"""
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    if not self.token:
+                        raise ValueError("GITHUB_AI_TOKEN environment variable is required")
+                    from openai import AsyncOpenAI
+                    self._async_client = AsyncOpenAI(
+                        base_url=self.endpoint,
+                        api_key=self.token,
+                    )
+        return self._async_client
+    
+    def _cache_key(self, system_prompt: str, prompt_template: str, temperature: float, top_p: float, **inputs) -> str:
+        return llm_cache_key(self.model, system_prompt, prompt_template, temperature, top_p, inputs)
+    
+    async def _shared_request(self, prompt: dict, remember: bool = True) -> str:
+        """
+        One chat completion, shared with every caller that asks for the same
+        prompt while it is in flight
+        
+        Args:
+            prompt (dict): Completion arguments, e.g. from _translation_prompt
+            remember (bool): Whether to cache the reply under the prompt's key
+            
+        Returns:
+            str: The model's reply, unstripped
+        """
+        key = self._cache_key(**prompt)
+        return await self.flights.do(key, lambda: self._upstream_request(key, remember, **prompt))
+    
+    async def _shared_stream(self, key: str, prompt: dict, emit) -> None:
+        """
+        Stream one chat completion through emit, piece by piece. An identical
+        request already in flight is not repeated: its whole reply is
+        emitted once it finishes.
+        """
+        leader = []
+        
+        def start():
+            leader.append(True)
+            return self._upstream_request(key, True, emit=emit, **prompt)
         
-        if not self.token:
-            raise ValueError("GITHUB_AI_TOKEN environment variable is required")
+        reply = await self.flights.do(key, start)
+        if not leader:
+            emit(reply)
+    
+    async def _upstream_request(self, key: str, remember: bool, system_prompt: str, prompt_template: str, temperature: float, top_p: float, emit=None, **inputs) -> str:
+        """The API call behind _shared_request and _shared_stream; streamed when given emit"""
+        if self._limit is None:
+            # Created here so it belongs to the request loop
+            self._limit = asyncio.Semaphore(MAX_CONCURRENCY)
+        
+        async with self._limit:
+            response = await self.async_client.chat.completions.create(
+                messages=self._messages(system_prompt, prompt_template, inputs),
+                temperature=temperature,
+                top_p=top_p,
+                model=self.model,
+                stream=emit is not None
+            )
+            
+            if emit is None:
+                result = response.choices[0].message.content
+            else:
+                parts = []
+                async for chunk in response:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        emit(delta)
+                result = ''.join(parts)
+        
+        if remember:
+            # The database write blocks, so keep it off the loop
+            await asyncio.get_running_loop().run_in_executor(None, self.cache.set, key, result)
+        return result
+    
+    def _cached_completion(self, system_prompt: str, prompt_template: str, temperature: float, top_p: float, **inputs) -> str:
+        """
+        One chat completion, served from the cache when the same model,
+        prompts, sampling parameters and inputs were seen before, and
+        otherwise shared with any identical request already in flight
+        
+        Args:
+            system_prompt (str): The system message
+            prompt_template (str): The user message, formatted with inputs
+            temperature (float): Sampling temperature
+            top_p (float): Nucleus sampling cutoff
+            
+        Returns:
+            str: The model's reply, unstripped
+        """
+        prompt = dict(system_prompt=system_prompt, prompt_template=prompt_template, temperature=temperature, top_p=top_p, **inputs)
+        cached = self.cache.get(self._cache_key(**prompt))
+        if cached is not None:
+            return cached
+        
+        return self._loop.run(self._shared_request(prompt))
+    
+    def _stream_completion(self, system_prompt: str, prompt_template: str, temperature: float, top_p: float, **inputs):
+        """
+        Like _cached_completion, but yields the reply in pieces as the model
+        generates it, and caches the reply once the stream completes. A
+        cached reply, or one shared with an identical request in flight, is
+        yielded whole.
+        """
+        prompt = dict(system_prompt=system_prompt, prompt_template=prompt_template, temperature=temperature, top_p=top_p, **inputs)
+        key = self._cache_key(**prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
         
-        self.client = OpenAI(
-            base_url=self.endpoint,
-            api_key=self.token,
-        )
+        yield from self._loop.relay(lambda emit: self._shared_stream(key, prompt, emit))
+    
+    def _messages(self, system_prompt: str, prompt_template: str, inputs: dict) -> list:
+        return [
+            {
+                "role": "system",
+                "content": system_prompt,
+            },
+            {
+                "role": "user",
+                "content": prompt_template.format(**inputs),
+            }
+        ]
+    
+    def _translation_prompt(self, text: str) -> dict:
+        """The cached-completion arguments for translating text"""
+        system_prompt = """You are a professional translator specializing in English to Chinese translation. 
+            Please translate the given English text to Chinese (Simplified Chinese). 
+            Maintain the original meaning, tone, and style as much as possible. 
+            Only return the translated text without any additional explanations or comments."""
+        
+        return {
+            "system_prompt": system_prompt,
+            "prompt_template": "Please translate the following English text to Chinese:\n\n{text}",
+            "temperature": 0.3,  # Lower temperature for more consistent translations
+            "top_p": 1,
+            "text": text
+        }
+    
+    def _pack_prompt(self, texts: list) -> dict:
+        """The completion arguments for translating several short texts in one request"""
+        system_prompt = """You are a professional translator specializing in English to Chinese translation. 
+            You will be given a JSON array of English texts. Translate each one to Chinese (Simplified Chinese), 
+            maintaining the original meaning, tone, and style as much as possible. 
+            Return only a JSON array of the translations, in the same order and with the same number of items."""
+        
+        return {
+            "system_prompt": system_prompt,
+            "prompt_template": "Please translate each English text in this JSON array to Chinese:\n\n{texts}",
+            "temperature": 0.3,
+            "top_p": 1,
+            "texts": json.dumps(texts, ensure_ascii=False)
+        }
+    
+    def _completion_prompt(self, title: str, content: str) -> dict:
+        """The cached-completion arguments for auto-completing a note"""
+        system_prompt = """You are an intelligent note-taking assistant that helps users enhance their notes. 
+            Your task is to analyze the existing note content and provide:
+            1. Content suggestions and associations related to the topic
+            2. Grammar and style improvements
+            3. Additional relevant information or ideas
+            4. Structure improvements
+            
+            Return your response in a structured JSON format with the following keys:
+            - "suggestions": Array of content suggestions and related ideas
+            - "improvements": Array of grammar/style improvement suggestions
+            - "additional_content": Suggested additional paragraphs or sections
+            - "structure_tips": Tips for better organization
+            
+            Be helpful, constructive, and maintain the original tone and intent of the note."""
+            
+        user_prompt = """Please analyze and help enhance this note:
+
+Title: {title}
+
+Current Content:
+{content}
+
+Please provide suggestions for improvement, related content ideas, grammar corrections, and structural enhancements."""
+        
+        return {
+            "system_prompt": system_prompt,
+            "prompt_template": user_prompt,
+            "temperature": 0.7,  # Moderate temperature for creativity while maintaining relevance
+            "top_p": 0.9,
+            "title": title,
+            "content": content
+        }
     
     def translate_to_chinese(self, text: str) -> str:
         """
@@ -29,32 +283,133 @@ class LLMClient:
             str: The translated Chinese text
         """
         try:
-            system_prompt = """You are a professional translator specializing in English to Chinese translation. 
-            Please translate the given English text to Chinese (Simplified Chinese). 
-            Maintain the original meaning, tone, and style as much as possible. 
-            Only return the translated text without any additional explanations or comments."""
+            translated = self._cached_completion(**self._translation_prompt(text))
             
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt,
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Please translate the following English text to Chinese:\n\n{text}",
-                    }
-                ],
-                temperature=0.3,  # Lower temperature for more consistent translations
-                top_p=1,
-                model=self.model
-            )
-            
-            return response.choices[0].message.content.strip()
+            return translated.strip()
             
         except Exception as e:
             raise Exception(f"Translation failed: {str(e)}")
     
+    def translate_batch_to_chinese(self, texts: list) -> list:
+        """
+        Translate many English texts to Chinese concurrently
+        
+        Each distinct paragraph across all texts is translated once. Cached
+        paragraphs are reused, short ones are packed several to a request,
+        and the requests run concurrently, up to LLM_MAX_CONCURRENCY at a time.
+        
+        Args:
+            texts (list): The English texts to translate
+            
+        Returns:
+            list: The translated Chinese texts, in the order of texts
+        """
+        keys = {
+            paragraph: self._cache_key(**self._translation_prompt(paragraph))
+            for text in texts for paragraph in paragraphs(text)
+        }
+        cached = self.cache.get_many(list(keys.values()))
+        translations = {paragraph: cached[key].strip() for paragraph, key in keys.items() if key in cached}
+        pending = [paragraph for paragraph, key in keys.items() if key not in cached]
+        
+        jobs = plan_jobs(pending)
+        
+        async def translate_jobs():
+            return await asyncio.gather(*(self._translate_job(job) for job in jobs))
+        
+        for job, translated in zip(jobs, self._loop.run(translate_jobs())):
+            translations.update(zip(job, translated))
+        
+        return [translate_segments(text, translations.__getitem__) for text in texts]
+    
+    async def _translate_job(self, texts: list) -> list:
+        """
+        Translate uncached paragraphs in one request if there are several
+        and the reply matches them up, else one request each
+        
+        Each translation is cached as if translate_to_chinese had made it.
+        """
+        if len(texts) > 1:
+            reply = await self._shared_request(self._pack_prompt(texts), remember=False)
+            translated = parse_pack(reply, len(texts))
+            if translated is not None:
+                loop = asyncio.get_running_loop()
+                for text, translation in zip(texts, translated):
+                    key = self._cache_key(**self._translation_prompt(text))
+                    await loop.run_in_executor(None, self.cache.set, key, translation)
+                return translated
+        
+        replies = await asyncio.gather(*(self._shared_request(self._translation_prompt(text)) for text in texts))
+        return [reply.strip() for reply in replies]
+    
+    def stream_translate_to_chinese(self, text: str):
+        """
+        Translate English text to Chinese, yielding the translation in
+        pieces as the model generates it
+        
+        Args:
+            text (str): The English text to translate
+            
+        Yields:
+            str: Pieces that join to what translate_to_chinese returns
+        """
+        return strip_stream(self._stream_completion(**self._translation_prompt(text)))
+    
+    def stream_document_to_chinese(self, text: str):
+        """
+        Translate longer English text paragraph by paragraph, yielding the
+        translation in pieces
+        
+        Cached paragraphs are reused and the rest are all requested at once,
+        up to LLM_MAX_CONCURRENCY at a time. The translation is yielded in
+        paragraph order: the paragraph being yielded streams as the model
+        generates it, while later ones are buffered until their turn.
+        
+        Args:
+            text (str): The English text to translate
+            
+        Yields:
+            str: Pieces that join to the text with each paragraph translated
+            as translate_to_chinese would, and the layout kept
+        """
+        prompts = {paragraph: self._translation_prompt(paragraph) for paragraph in paragraphs(text)}
+        keys = {paragraph: self._cache_key(**prompt) for paragraph, prompt in prompts.items()}
+        cached = self.cache.get_many(list(keys.values()))
+        pending = {paragraph: deque() for paragraph in prompts if keys[paragraph] not in cached}
+        
+        async def translate_all(emit):
+            async def translate(paragraph):
+                try:
+                    await self._shared_stream(keys[paragraph], prompts[paragraph], lambda piece: emit((paragraph, piece)))
+                    emit((paragraph, None))
+                except Exception as e:
+                    # Raised when the paragraph's turn comes, after the ones before it
+                    emit((paragraph, e))
+            
+            await asyncio.gather(*(translate(paragraph) for paragraph in pending))
+        
+        arrivals = self._loop.relay(translate_all) if pending else iter(())
+        
+        def pieces(paragraph):
+            buffer = pending[paragraph]
+            while True:
+                while buffer:
+                    piece = buffer.popleft()
+                    if piece is None:
+                        return
+                    if isinstance(piece, Exception):
+                        raise piece
+                    yield piece
+                source, piece = next(arrivals)
+                pending[source].append(piece)
+        
+        def stream_translate(paragraph):
+            if paragraph in pending:
+                return strip_stream(pieces(paragraph))
+            return strip_stream([cached[keys[paragraph]]])
+        
+        return stream_segments(text, stream_translate)
+    
     def generate_response(self, prompt: str, system_message: str = "") -> str:
         """
         General purpose AI response generation
@@ -100,97 +455,82 @@ class LLMClient:
             dict: Enhanced content with suggestions, corrections, and associations
         """
         try:
-            system_prompt = """You are an intelligent note-taking assistant that helps users enhance their notes. 
-            Your task is to analyze the existing note content and provide:
-            1. Content suggestions and associations related to the topic
-            2. Grammar and style improvements
-            3. Additional relevant information or ideas
-            4. Structure improvements
+            ai_response = self._cached_completion(**self._completion_prompt(title, content)).strip()
             
-            Return your response in a structured JSON format with the following keys:
-            - "suggestions": Array of content suggestions and related ideas
-            - "improvements": Array of grammar/style improvement suggestions
-            - "additional_content": Suggested additional paragraphs or sections
-            - "structure_tips": Tips for better organization
+            return self.parse_completion(ai_response)
             
-            Be helpful, constructive, and maintain the original tone and intent of the note."""
+        except Exception as e:
+            raise Exception(f"Auto-completion failed: {str(e)}")
+    
+    def stream_auto_complete_note(self, title: str, content: str):
+        """
+        Auto-complete a note, yielding the model's raw reply in pieces as it
+        is generated; pass the joined reply to parse_completion
+        
+        Args:
+            title (str): The note title
+            content (str): The existing note content
             
-            user_prompt = f"""Please analyze and help enhance this note:
-
-Title: {title}
-
-Current Content:
-{content}
-
-Please provide suggestions for improvement, related content ideas, grammar corrections, and structural enhancements."""
-
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt,
-                    },
-                    {
-                        "role": "user",
-                        "content": user_prompt,
-                    }
-                ],
-                temperature=0.7,  # Moderate temperature for creativity while maintaining relevance
-                top_p=0.9,
-                model=self.model
-            )
+        Yields:
+            str: Pieces of the reply
+        """
+        return strip_stream(self._stream_completion(**self._completion_prompt(title, content)))
+    
+    def parse_completion(self, ai_response: str) -> dict:
+        """
+        Normalize an auto-completion reply, JSON or not, into its four fields
+        
+        Args:
+            ai_response (str): The model's reply
             
-            ai_response = response.choices[0].message.content.strip()
+        Returns:
+            dict: suggestions, improvements, additional_content and structure_tips
+        """
+        # Try to parse as JSON, fallback to structured text if needed
+        try:
+            result = json.loads(ai_response)
             
-            # Try to parse as JSON, fallback to structured text if needed
-            try:
-                import json
-                result = json.loads(ai_response)
-                
-                # Ensure all required keys exist with proper data types
-                normalized_result = {
-                    "suggestions": [],
-                    "improvements": [],
-                    "additional_content": "",
-                    "structure_tips": []
-                }
-                
-                # Normalize suggestions
-                if "suggestions" in result:
-                    if isinstance(result["suggestions"], list):
-                        normalized_result["suggestions"] = [str(s) for s in result["suggestions"] if s]
-                    elif isinstance(result["suggestions"], str):
-                        normalized_result["suggestions"] = [result["suggestions"]]
-                
-                # Normalize improvements
-                if "improvements" in result:
-                    if isinstance(result["improvements"], list):
-                        normalized_result["improvements"] = [str(i) for i in result["improvements"] if i]
-                    elif isinstance(result["improvements"], str):
-                        normalized_result["improvements"] = [result["improvements"]]
-                
-                # Normalize additional_content
-                if "additional_content" in result:
-                    if isinstance(result["additional_content"], str):
-                        normalized_result["additional_content"] = result["additional_content"]
-                    elif isinstance(result["additional_content"], list):
-                        normalized_result["additional_content"] = "\n".join(str(c) for c in result["additional_content"] if c)
-                
-                # Normalize structure_tips
-                if "structure_tips" in result:
-                    if isinstance(result["structure_tips"], list):
-                        normalized_result["structure_tips"] = [str(t) for t in result["structure_tips"] if t]
-                    elif isinstance(result["structure_tips"], str):
-                        normalized_result["structure_tips"] = [result["structure_tips"]]
-                        
-                return normalized_result
-                
-            except json.JSONDecodeError:
-                # Fallback: parse as structured text
-                return self._parse_completion_response(ai_response)
+            # Ensure all required keys exist with proper data types
+            normalized_result = {
+                "suggestions": [],
+                "improvements": [],
+                "additional_content": "",
+                "structure_tips": []
+            }
             
-        except Exception as e:
-            raise Exception(f"Auto-completion failed: {str(e)}")
+            # Normalize suggestions
+            if "suggestions" in result:
+                if isinstance(result["suggestions"], list):
+                    normalized_result["suggestions"] = [str(s) for s in result["suggestions"] if s]
+                elif isinstance(result["suggestions"], str):
+                    normalized_result["suggestions"] = [result["suggestions"]]
+            
+            # Normalize improvements
+            if "improvements" in result:
+                if isinstance(result["improvements"], list):
+                    normalized_result["improvements"] = [str(i) for i in result["improvements"] if i]
+                elif isinstance(result["improvements"], str):
+                    normalized_result["improvements"] = [result["improvements"]]
+            
+            # Normalize additional_content
+            if "additional_content" in result:
+                if isinstance(result["additional_content"], str):
+                    normalized_result["additional_content"] = result["additional_content"]
+                elif isinstance(result["additional_content"], list):
+                    normalized_result["additional_content"] = "\n".join(str(c) for c in result["additional_content"] if c)
+            
+            # Normalize structure_tips
+            if "structure_tips" in result:
+                if isinstance(result["structure_tips"], list):
+                    normalized_result["structure_tips"] = [str(t) for t in result["structure_tips"] if t]
+                elif isinstance(result["structure_tips"], str):
+                    normalized_result["structure_tips"] = [result["structure_tips"]]
+                    
+            return normalized_result
+            
+        except json.JSONDecodeError:
+            # Fallback: parse as structured text
+            return self._parse_completion_response(ai_response)
     
     def _parse_completion_response(self, response_text: str) -> dict:
         """
@@ -267,5 +607,5 @@ Please provide suggestions for improvement, related content ideas, grammar corre
         
         return result
 
-# Create a global instance for easy importing
+# Create a global instance for easy importing; it connects on first use
 llm_client = LLMClient()
\ No newline at end of file
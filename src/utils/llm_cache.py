@@ -0,0 +1,202 @@
+"""
+Two-tier cache for LLM results
+
+Results are keyed by a hash of everything that shapes the model's answer:
+the model, the prompt template, the sampling parameters and the input
+text. Lookups go to an in-process LRU first, then to the ``llm_cache``
+table in the app's database, which outlives restarts and is shared by every
+instance. Entries expire after LLM_CACHE_TTL seconds in both tiers;
+expired rows are deleted by an occasional write (one in PRUNE_EVERY on
+average), so the table stays bounded without a scheduled job.
+
+The database tier is active once ``bind`` has been given an engine; until
+then (for example in scripts run outside the app) only the LRU is used.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, Text, select
+
+# Thirty days: translations of unchanged text stay valid, but a prompt or
+# model change is picked up through the key anyway
+CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 30 * 24 * 3600))
+MEMORY_ENTRIES = 1024
+PRUNE_EVERY = 100
+# Keys per SELECT in get_many, well under every database's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+llm_cache_table = Table(
+    'llm_cache', MetaData(),
+    Column('key', String(64), primary_key=True),
+    Column('value', Text, nullable=False),
+    Column('created_at', DateTime, nullable=False)
+)
+
+
+def llm_cache_key(*parts):
+    """SHA-256 of the JSON-encoded parts, e.g. (model, template, temperature, text)"""
+    encoded = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """In-process LRU with TTL in front of the llm_cache table"""
+
+    def __init__(self, max_entries=MEMORY_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.engine = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.database_hits = 0
+        self.misses = 0
+
+    def bind(self, engine):
+        """Persist results in the engine's llm_cache table (created by the migrations)"""
+        self.engine = engine
+
+    def get(self, key):
+        """
+        A cached result, or None
+
+        Returns:
+            str | None: The result from memory, else from the database
+            (which is then kept in memory too)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+
+        value = self._load(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.database_hits += 1
+        self._remember(key, value, now)
+        return value
+
+    def get_many(self, keys):
+        """
+        Look up many keys at once: memory first, then one query for the rest
+
+        Returns:
+            dict: The cached result for each key that has one
+        """
+        now = time.time()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[1]
+            self.memory_hits += len(found)
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+
+        loaded = self._load_many(missing)
+        with self._lock:
+            self.database_hits += len(loaded)
+            self.misses += len(missing) - len(loaded)
+        for key, value in loaded.items():
+            self._remember(key, value, now)
+        found.update(loaded)
+        return found
+
+    def set(self, key, value):
+        self._remember(key, value, time.time())
+        if self.engine is None:
+            return
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(llm_cache_table.delete().where(llm_cache_table.c.key == key))
+                conn.execute(llm_cache_table.insert().values(key=key, value=value, created_at=datetime.utcnow()))
+        except Exception as e:
+            print(f"⚠️  LLM cache write failed: {e}")
+            return
+        if random.randrange(PRUNE_EVERY) == 0:
+            self.prune()
+
+    def prune(self):
+        """
+        Delete expired rows from the database tier
+
+        Returns:
+            int: Rows deleted
+        """
+        if self.engine is None:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        try:
+            with self.engine.begin() as conn:
+                return conn.execute(llm_cache_table.delete().where(llm_cache_table.c.created_at <= cutoff)).rowcount
+        except Exception as e:
+            print(f"⚠️  LLM cache prune failed: {e}")
+            return 0
+
+    def _remember(self, key, value, now):
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, key):
+        if self.engine is None:
+            return None
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        try:
+            with self.engine.connect() as conn:
+                return conn.execute(
+                    select(llm_cache_table.c.value)
+                    .where(llm_cache_table.c.key == key, llm_cache_table.c.created_at > cutoff)
+                ).scalar()
+        except Exception as e:
+            print(f"⚠️  LLM cache read failed: {e}")
+            return None
+
+    def _load_many(self, keys):
+        if self.engine is None or not keys:
+            return {}
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        loaded = {}
+        try:
+            with self.engine.connect() as conn:
+                for start in range(0, len(keys), LOOKUP_CHUNK):
+                    loaded.update(conn.execute(
+                        select(llm_cache_table.c.key, llm_cache_table.c.value).where(
+                            llm_cache_table.c.key.in_(keys[start:start + LOOKUP_CHUNK]),
+                            llm_cache_table.c.created_at > cutoff
+                        )
+                    ).all())
+        except Exception as e:
+            print(f"⚠️  LLM cache read failed: {e}")
+        return loaded
+
+    def clear(self):
+        """Forget the in-process entries; the database tier is left alone"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit and miss counters for this process"""
+        with self._lock:
+            lookups = self.memory_hits + self.database_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'database_hits': self.database_hits,
+                'misses': self.misses,
+                'hit_rate': round((lookups - self.misses) / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries)
+            }
@@ -0,0 +1,226 @@
+"""
+Versioned schema migrations shared by the Flask entry points
+
+Each migration runs once and is recorded in ``schema_migrations``. At
+startup ``migrate`` reads the recorded version in a single query and returns
+immediately when the schema is current, so cold starts skip the catalog
+queries that create_all and index checks would make. On PostgreSQL an
+advisory lock keeps instances that cold-start together from migrating twice.
+
+Migrations own every index; the models declare none. They never read the
+models either: each one spells out the tables and columns it creates, so
+what a migration does cannot change after it has shipped. To change the
+schema (a new model column included), append a migration.
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text, exc, func, inspect, select, text
+
+from src.utils.content import CompressedText, install_content_compression
+from src.utils.fuzzy import install_fuzzy_index
+from src.utils.search import install_search_index
+from src.utils.summary import backfill_note_summaries
+from src.utils.versioning import install_change_tracking
+
+Migration = namedtuple('Migration', ['version', 'description', 'apply'])
+
+schema_migrations = Table(
+    'schema_migrations', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+# Arbitrary key for pg_advisory_xact_lock, shared by every instance of the app
+MIGRATION_LOCK = 7204318
+
+INDEXES = [
+    # Keyset-paginated listing, newest first
+    "CREATE INDEX IF NOT EXISTS ix_note_updated_at_id ON note (updated_at DESC, id DESC)",
+]
+
+# Created by older supabase_init.py runs. No query filters or sorts on them
+# (title suggestions are served in process), so they only slow down writes.
+UNUSED_INDEXES = ['idx_note_title', 'idx_note_created_at']
+
+
+# The tables as migration 1 created them
+initial_schema = MetaData()
+
+Table(
+    'note', initial_schema,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(200), nullable=False),
+    Column('content', CompressedText, nullable=False),
+    Column('preview', String(200)),
+    Column('content_length', Integer),
+    Column('word_count', Integer),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    Column('version', Integer, nullable=False, server_default=text('1'))
+)
+Table(
+    'note_tombstone', initial_schema,
+    Column('id', Integer, primary_key=True),
+    Column('note_id', Integer, nullable=False),
+    Column('deleted_at', DateTime, nullable=False)
+)
+Table(
+    'user', initial_schema,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(80), unique=True, nullable=False),
+    Column('email', String(120), unique=True, nullable=False)
+)
+
+# Columns the note table gained after the first release, which created it
+# without them; create_all never adds columns to an existing table
+NOTE_COLUMNS_BEFORE_MIGRATIONS = [
+    ('preview', 'VARCHAR(200)'),
+    ('content_length', 'INTEGER'),
+    ('word_count', 'INTEGER'),
+    ('version', 'INTEGER DEFAULT 1 NOT NULL'),
+]
+
+llm_cache_schema = Table(
+    'llm_cache', MetaData(),
+    Column('key', String(64), primary_key=True),
+    Column('value', Text, nullable=False),
+    Column('created_at', DateTime, nullable=False),
+    # Lets the cache delete its expired rows without scanning the table
+    Index('ix_llm_cache_created_at', 'created_at')
+)
+
+# Keeps updated_at current for writes made outside the app
+POSTGRES_TIMESTAMP_TRIGGER_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION update_updated_at_column()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        NEW.updated_at = CURRENT_TIMESTAMP;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS update_note_updated_at ON note",
+    """
+    CREATE TRIGGER update_note_updated_at
+        BEFORE UPDATE ON note
+        FOR EACH ROW
+        EXECUTE FUNCTION update_updated_at_column()
+    """,
+]
+
+
+def _create_tables(engine):
+    """Create missing tables, and the note columns older releases lacked"""
+    initial_schema.create_all(engine)
+    note = initial_schema.tables['note']
+    existing = {column['name'] for column in inspect(engine).get_columns('note')}
+    missing = [(name, ddl) for name, ddl in NOTE_COLUMNS_BEFORE_MIGRATIONS if name not in existing]
+    if not missing:
+        return
+    with engine.begin() as conn:
+        for name, ddl in missing:
+            conn.execute(text(f'ALTER TABLE note ADD COLUMN {name} {ddl}'))
+    # Notes written before the summary fields existed need them filled in once
+    if any(name == 'content_length' for name, _ in missing):
+        backfill_note_summaries(engine, note)
+
+
+def _create_indexes(engine):
+    with engine.begin() as conn:
+        for statement in INDEXES:
+            conn.execute(text(statement))
+
+
+def _drop_unused_indexes(engine):
+    with engine.begin() as conn:
+        for name in UNUSED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def _install_timestamp_trigger(engine):
+    if engine.dialect.name != 'postgresql':
+        return
+    with engine.begin() as conn:
+        for statement in POSTGRES_TIMESTAMP_TRIGGER_DDL:
+            conn.execute(text(statement))
+
+
+MIGRATIONS = [
+    Migration(1, 'Create tables and add missing columns', _create_tables),
+    Migration(2, 'Create the listing index', _create_indexes),
+    Migration(3, 'Install full-text search', install_search_index),
+    Migration(4, 'Install trigram indexes', install_fuzzy_index),
+    Migration(5, 'Compress note content with lz4', install_content_compression),
+    Migration(6, 'Drop unused supabase_init indexes', _drop_unused_indexes),
+    Migration(7, 'Create LLM result cache', lambda engine: llm_cache_schema.create(engine, checkfirst=True)),
+    Migration(8, 'Install the updated_at trigger on PostgreSQL', _install_timestamp_trigger),
+    Migration(9, 'Track note changes in commit order', install_change_tracking),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def schema_version(engine):
+    """The last applied migration, or 0 for a database that has never been migrated"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+    except exc.DBAPIError:
+        # No schema_migrations table yet
+        return 0
+
+
+@contextmanager
+def _migration_lock(engine):
+    """Serialize migrations across instances; released when the transaction ends"""
+    if engine.dialect.name != 'postgresql':
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': MIGRATION_LOCK})
+        try:
+            yield
+        finally:
+            conn.rollback()
+
+
+def migrate(engine):
+    """
+    Apply pending migrations in order
+
+    Args:
+        engine: The database engine
+
+    Returns:
+        list: Versions applied, empty when the schema was already current
+    """
+    if schema_version(engine) >= LATEST_VERSION:
+        return []
+
+    try:
+        schema_migrations.create(engine, checkfirst=True)
+    except exc.DBAPIError:
+        # Another instance created it first
+        pass
+
+    applied = []
+    with _migration_lock(engine):
+        # Re-read under the lock: another instance may have just migrated
+        current = schema_version(engine)
+        for migration in MIGRATIONS:
+            if migration.version <= current:
+                continue
+            migration.apply(engine)
+            with engine.begin() as conn:
+                conn.execute(schema_migrations.insert().values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=datetime.utcnow()
+                ))
+            print(f"✅ Applied schema migration {migration.version}: {migration.description}")
+            applied.append(migration.version)
+    return applied
@@ -0,0 +1,61 @@
+"""
+Post-commit notifications about note writes
+
+In-process indexes (fuzzy search, title autocomplete) subscribe here to
+stay current without rescanning the table. ORM writes are picked up
+automatically from the session; code that writes notes through Core
+statements must call ``publish`` itself after committing.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_subscribers = []
+
+
+def subscribe(callback):
+    """
+    Register a callback for committed note changes
+
+    Args:
+        callback: Called as callback(upserts, deleted_ids), where upserts
+            maps note id to a (title, content) tuple
+    """
+    _subscribers.append(callback)
+    return callback
+
+
+def publish(upserts, deleted_ids):
+    """Notify subscribers of committed note changes"""
+    if not upserts and not deleted_ids:
+        return
+    for callback in _subscribers:
+        callback(upserts, deleted_ids)
+
+
+def _is_note(obj):
+    return getattr(obj, '__tablename__', None) == 'note'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_note_changes(session, flush_context):
+    changes = session.info.setdefault('note_changes', {})
+    for obj in list(session.new) + list(session.dirty):
+        if _is_note(obj):
+            changes[obj.id] = (obj.title, obj.content)
+    for obj in session.deleted:
+        if _is_note(obj):
+            changes[obj.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_note_changes(session):
+    changes = session.info.pop('note_changes', None)
+    if changes:
+        upserts = {note_id: row for note_id, row in changes.items() if row is not None}
+        deleted_ids = [note_id for note_id, row in changes.items() if row is None]
+        publish(upserts, deleted_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_note_changes(session):
+    session.info.pop('note_changes', None)
@@ -0,0 +1,97 @@
+"""
+Keyset (cursor) pagination helpers for note listings
+"""
+import base64
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(updated_at, note_id):
+    """Encode the sort key of the last row on a page into an opaque cursor"""
+    payload = json.dumps([updated_at.isoformat() if updated_at else None, note_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        updated_at, note_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return (datetime.fromisoformat(updated_at) if updated_at else None), int(note_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def parse_timestamp(value, name):
+    """
+    Parse an ISO 8601 query parameter into a naive UTC datetime
+
+    Raises:
+        ValueError: If the value is not a valid timestamp
+    """
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 timestamp')
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE):
+    """Parse the limit query parameter, clamped to MAX_PAGE_SIZE"""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def paginate_notes(query, model, args):
+    """
+    Apply keyset pagination on (updated_at, id) to a note query
+
+    Args:
+        query: A SQLAlchemy query over the note model
+        model: The note model class
+        args: Request query arguments (cursor, limit, updated_after, updated_before)
+
+    Returns:
+        tuple: (list of notes on this page, next cursor or None)
+
+    Raises:
+        ValueError: If any of the pagination arguments are invalid
+    """
+    limit = parse_limit(args.get('limit'))
+
+    if args.get('updated_after'):
+        query = query.filter(model.updated_at > parse_timestamp(args['updated_after'], 'updated_after'))
+    if args.get('updated_before'):
+        query = query.filter(model.updated_at < parse_timestamp(args['updated_before'], 'updated_before'))
+
+    if args.get('cursor'):
+        updated_at, note_id = decode_cursor(args['cursor'])
+        query = query.filter(tuple_(model.updated_at, model.id) < tuple_(updated_at, note_id))
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.order_by(model.updated_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.updated_at, last.id)
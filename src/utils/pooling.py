@@ -0,0 +1,175 @@
+"""
+Connection pooling modes and pool telemetry
+
+DB_POOL_MODE picks how the app holds PostgreSQL connections:
+
+- ``queue``: a small QueuePool per instance (DB_POOL_SIZE, DB_MAX_OVERFLOW,
+  DB_POOL_TIMEOUT), for long-lived servers or session-mode poolers
+- ``null``: no pooling in the app; every checkout opens a connection and
+  every checkin closes it, leaving pooling to PgBouncer/Supavisor
+- ``transaction``: ``null`` plus no server-side prepared statements, which
+  do not survive a transaction-mode pooler handing the next transaction to
+  another backend
+- ``auto`` (default): ``transaction`` for Supabase's transaction pooler
+  port (6543), otherwise ``queue``
+
+Checkout wait, in-use and overflow counts are recorded in ``pool_stats`` so
+pools can be sized from data.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+POOL_MODES = ('queue', 'null', 'transaction')
+TRANSACTION_POOLER_PORT = 6543
+
+# Connect arguments that turn off server-side prepared statements, per driver.
+# psycopg2 and pg8000 never name prepared statements, so need nothing.
+NO_PREPARED_STATEMENTS = {
+    'psycopg': {'prepare_threshold': None},
+}
+
+
+class PoolStats:
+    """Checkout and occupancy counters for the app's connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.failures = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.in_use = 0
+            self.peak_in_use = 0
+            self.peak_overflow = 0
+
+    def record_checkout(self, wait, overflow=0, failed=False):
+        with self._lock:
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            if failed:
+                self.failures += 1
+                return
+            self.checkouts += 1
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def record_in_use(self, delta):
+        with self._lock:
+            self.in_use += delta
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def snapshot(self, pool=None):
+        """
+        Current counters, plus the pool's configuration when it is given
+
+        Returns:
+            dict: checkouts, failures (timeouts and connect errors), average
+            and maximum checkout wait in milliseconds, connections in use
+            now and at peak, and overflow connections now and at peak
+        """
+        with self._lock:
+            attempts = self.checkouts + self.failures
+            stats = {
+                'checkouts': self.checkouts,
+                'failures': self.failures,
+                'wait_avg_ms': round(self.wait_total / attempts * 1000, 3) if attempts else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'peak_overflow': self.peak_overflow
+            }
+        if pool is not None:
+            stats['pool'] = type(pool).__name__
+            if isinstance(pool, QueuePool):
+                stats['size'] = pool.size()
+                stats['overflow'] = max(pool.overflow(), 0)
+        return stats
+
+
+pool_stats = PoolStats()
+
+
+class _TimedCheckout:
+    """Pool mixin that records how long each checkout waits"""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except Exception:
+            pool_stats.record_checkout(time.perf_counter() - start, failed=True)
+            raise
+        overflow = max(self.overflow(), 0) if isinstance(self, QueuePool) else 0
+        pool_stats.record_checkout(time.perf_counter() - start, overflow)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+for _pool_class in (TimedQueuePool, TimedNullPool):
+    event.listen(_pool_class, 'checkout', lambda *args: pool_stats.record_in_use(1))
+    event.listen(_pool_class, 'checkin', lambda *args: pool_stats.record_in_use(-1))
+
+
+def pool_mode(url, mode=None):
+    """
+    Resolve the pooling mode for a database URL
+
+    Raises:
+        ValueError: If the mode is not one of POOL_MODES or ``auto``
+    """
+    mode = (mode or os.getenv('DB_POOL_MODE') or 'auto').lower()
+    if mode == 'auto':
+        return 'transaction' if make_url(url).port == TRANSACTION_POOLER_PORT else 'queue'
+    if mode not in POOL_MODES:
+        raise ValueError(f'DB_POOL_MODE must be auto or one of {", ".join(POOL_MODES)}')
+    return mode
+
+
+def engine_options(url, mode=None, pool_size=3, max_overflow=5, connect_timeout=15):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for a PostgreSQL URL
+
+    Args:
+        url (str): The database URL
+        mode (str): A pooling mode; defaults to DB_POOL_MODE
+        pool_size (int): QueuePool size unless DB_POOL_SIZE is set
+        max_overflow (int): QueuePool overflow unless DB_MAX_OVERFLOW is set
+        connect_timeout (int): Seconds to wait for a new connection
+
+    Returns:
+        dict: Engine options for Flask-SQLAlchemy
+    """
+    mode = pool_mode(url, mode)
+    options = {
+        'connect_args': {'sslmode': 'require', 'connect_timeout': connect_timeout}
+    }
+    if mode == 'queue':
+        options.update({
+            'poolclass': TimedQueuePool,
+            'pool_pre_ping': True,
+            'pool_recycle': 300,
+            'pool_size': int(os.getenv('DB_POOL_SIZE', pool_size)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', max_overflow)),
+            'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 10))
+        })
+    else:
+        # Every checkout is a fresh connection, so there is nothing to ping or recycle
+        options['poolclass'] = TimedNullPool
+        if mode == 'transaction':
+            options['connect_args'].update(NO_PREPARED_STATEMENTS.get(make_url(url).get_driver_name(), {}))
+    return options
@@ -0,0 +1,177 @@
+"""
+Response cache for note listings and search
+
+Entries are keyed by the note collection version plus the request
+arguments. Every transaction that inserts, updates or deletes notes
+advances that version in the database before it commits (see
+versioning.py), so a write makes all older entries unreachable at once,
+and they age out through LRU eviction instead of being deleted one by one.
+
+The backend comes from RESPONSE_CACHE:
+    unset or "memory"      an LRU in this process (the default)
+    "sqlite:///<path>"     an LRU in a local SQLite file, shared by every
+                           worker on the machine (e.g. a file in /dev/shm)
+    "none"                 caching disabled
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+# Shared entries only record a hit if their last one is older than this,
+# so cache reads don't turn into a write each time
+ACCESS_RESOLUTION = 1.0
+
+
+class MemoryBackend:
+    """Size-bounded LRU of byte strings in this process"""
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _key, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class SQLiteBackend:
+    """Size-bounded LRU in a SQLite file that several processes can share"""
+
+    def __init__(self, path, max_bytes=MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_accessed ON response_cache (accessed)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute("SELECT value, accessed FROM response_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > ACCESS_RESOLUTION:
+            with conn:
+                conn.execute("UPDATE response_cache SET accessed = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key, value):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time())
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM response_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # Drop least recently used entries until back under the limit
+            excess = total - self.max_bytes
+            for evict_key, size in conn.execute(
+                "SELECT key, size FROM response_cache ORDER BY accessed"
+            ).fetchall():
+                if excess <= 0:
+                    break
+                conn.execute("DELETE FROM response_cache WHERE key = ?", (evict_key,))
+                excess -= size
+
+    def clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM response_cache")
+
+
+class ResponseCache:
+    """Counts hits and misses in front of a backend; a None backend disables caching"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            print(f"⚠️  Response cache read failed: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            print(f"⚠️  Response cache write failed: {e}")
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+
+def backend_from_url(url):
+    """
+    Build a cache backend from a RESPONSE_CACHE value
+
+    Raises:
+        ValueError: If the value is not a supported backend
+    """
+    if not url or url == 'memory':
+        return MemoryBackend()
+    if url == 'none':
+        return None
+    if url.startswith('sqlite:///'):
+        return SQLiteBackend(url[len('sqlite:///'):])
+    raise ValueError(f'Unsupported RESPONSE_CACHE backend: {url}')
+
+
+response_cache = ResponseCache(backend_from_url(os.getenv('RESPONSE_CACHE')))
+
+
+def cache_key(kind, etag):
+    """Cache key for one kind of response (list, search) at a collection ETag"""
+    return f'{kind}:{etag}'
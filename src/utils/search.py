@@ -0,0 +1,247 @@
+"""
+Database-native full-text search over notes
+
+PostgreSQL keeps a trigger-maintained ``search_vector`` tsvector column on
+``note`` with a GIN index. SQLite keeps an FTS5 shadow table ``note_fts``
+that triggers on ``note`` hold in sync. Both rank title matches above
+content matches.
+
+Both indexes are fed through ``cjk_bigrams`` so unsegmented Chinese,
+Japanese and Korean text is searchable through the index: on PostgreSQL
+as a PL/pgSQL function, on SQLite as a Python function registered on every
+connection.
+"""
+import re
+import sqlite3
+
+from sqlalchemy import column, event, func, literal_column, or_, table, text
+from sqlalchemy.engine import Engine
+
+from src.utils.content import decompress_content
+from src.utils.tokenizer import (
+    POSTGRES_CJK_BIGRAMS,
+    cjk_bigrams,
+    cjk_query_bigrams,
+    is_single_cjk_character,
+)
+
+# Title terms weigh more than content terms in the ranking
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+POSTGRES_SEARCH_VECTOR = """
+    setweight(to_tsvector('english', cjk_bigrams({row}.title)), 'A') ||
+    setweight(to_tsvector('english', cjk_bigrams({row}.content)), 'B')
+"""
+
+POSTGRES_DDL = [
+    POSTGRES_CJK_BIGRAMS,
+    "ALTER TABLE note ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    f"""
+    CREATE OR REPLACE FUNCTION note_search_vector_update()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        NEW.search_vector := {POSTGRES_SEARCH_VECTOR.format(row='NEW')};
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS note_search_vector_trigger ON note",
+    """
+    CREATE TRIGGER note_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, content ON note
+        FOR EACH ROW
+        EXECUTE FUNCTION note_search_vector_update()
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_note_search_vector ON note USING GIN (search_vector)",
+]
+
+# Rewrites search_vector without letting the updated_at trigger (see
+# migrations.py) mark every note as freshly edited
+POSTGRES_REINDEX = f"""
+DO $$
+DECLARE
+    has_timestamp_trigger boolean := EXISTS (
+        SELECT 1 FROM pg_trigger
+        WHERE tgname = 'update_note_updated_at' AND tgrelid = 'note'::regclass
+    );
+BEGIN
+    IF has_timestamp_trigger THEN
+        ALTER TABLE note DISABLE TRIGGER update_note_updated_at;
+    END IF;
+    UPDATE note SET search_vector = {POSTGRES_SEARCH_VECTOR.format(row='note')}
+    WHERE {{condition}};
+    IF has_timestamp_trigger THEN
+        ALTER TABLE note ENABLE TRIGGER update_note_updated_at;
+    END IF;
+END
+$$
+"""
+
+SQLITE_TRIGGERS = {
+    'note_fts_insert': """
+    CREATE TRIGGER note_fts_insert AFTER INSERT ON note BEGIN
+        INSERT INTO note_fts(rowid, title, content)
+        VALUES (new.id, cjk_bigrams(new.title), cjk_bigrams(note_text(new.content)));
+    END
+    """,
+    'note_fts_delete': """
+    CREATE TRIGGER note_fts_delete AFTER DELETE ON note BEGIN
+        INSERT INTO note_fts(note_fts, rowid, title, content)
+        VALUES ('delete', old.id, cjk_bigrams(old.title), cjk_bigrams(note_text(old.content)));
+    END
+    """,
+    'note_fts_update': """
+    CREATE TRIGGER note_fts_update AFTER UPDATE OF title, content ON note BEGIN
+        INSERT INTO note_fts(note_fts, rowid, title, content)
+        VALUES ('delete', old.id, cjk_bigrams(old.title), cjk_bigrams(note_text(old.content)));
+        INSERT INTO note_fts(rowid, title, content)
+        VALUES (new.id, cjk_bigrams(new.title), cjk_bigrams(note_text(new.content)));
+    END
+    """,
+}
+
+note_fts = table('note_fts', column('rowid'))
+
+_TERM_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
+
+@event.listens_for(Engine, 'connect')
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    """Make cjk_bigrams() and note_text() available to the FTS5 triggers on every SQLite connection"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function('cjk_bigrams', 1, cjk_bigrams, deterministic=True)
+        dbapi_connection.create_function('note_text', 1, decompress_content, deterministic=True)
+
+
+def install_search_index(engine):
+    """
+    Create the full-text index for the engine's dialect, and (re)index
+    existing notes when the index is new or predates CJK tokenization
+    """
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == 'postgresql':
+            _install_postgres(conn)
+        elif dialect == 'sqlite':
+            _install_sqlite(conn)
+
+
+def _install_postgres(conn):
+    tokenizer_missing = conn.execute(text("SELECT to_regproc('cjk_bigrams') IS NULL")).scalar()
+    for statement in POSTGRES_DDL:
+        conn.execute(text(statement))
+    condition = 'true' if tokenizer_missing else 'search_vector IS NULL'
+    conn.execute(text(POSTGRES_REINDEX.format(condition=condition)))
+
+
+def _install_sqlite(conn):
+    exists = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'note_fts'"
+    )).first()
+    if not exists:
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE note_fts USING fts5("
+            "title, content, content='note', content_rowid='id', "
+            "tokenize='porter unicode61')"
+        ))
+
+    trigger_sql = conn.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'note_fts_insert'"
+    )).scalar()
+    if exists and trigger_sql and 'note_text' in trigger_sql:
+        return
+
+    # New index, or one built before CJK tokenization or compressed content:
+    # replace the triggers and reindex every note through cjk_bigrams()
+    for name, ddl in SQLITE_TRIGGERS.items():
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text(ddl))
+    conn.execute(text("INSERT INTO note_fts(note_fts) VALUES ('delete-all')"))
+    conn.execute(text(
+        "INSERT INTO note_fts(rowid, title, content) "
+        "SELECT id, cjk_bigrams(title), cjk_bigrams(note_text(content)) FROM note"
+    ))
+
+
+def parse_terms(query):
+    """
+    Split a search query into terms, keeping double-quoted phrases together
+
+    Returns:
+        list: Non-empty terms and phrases in query order
+    """
+    terms = []
+    for phrase, word in _TERM_PATTERN.findall(query):
+        term = (phrase or word).strip()
+        if term:
+            terms.append(term)
+    return terms
+
+
+def to_fts5_query(terms):
+    """Build an FTS5 MATCH expression that ANDs every term and phrase"""
+    parts = []
+    for term in terms:
+        quoted = '"{}"'.format(cjk_query_bigrams(term).replace('"', '""'))
+        # A lone CJK character only occurs inside bigrams, so match it as a prefix
+        parts.append(quoted + '*' if is_single_cjk_character(term) else quoted)
+    return ' '.join(parts)
+
+
+def to_tsquery(terms):
+    """Build a PostgreSQL tsquery expression that ANDs every term and phrase"""
+    tsquery = None
+    for term in terms:
+        if is_single_cjk_character(term):
+            part = func.to_tsquery('simple', term + ':*')
+        else:
+            part = func.phraseto_tsquery('english', cjk_query_bigrams(term))
+        tsquery = part if tsquery is None else tsquery.op('&&')(part)
+    return tsquery
+
+
+def fulltext_search(model, query, limit, columns=None):
+    """
+    Rank notes against a free-text query
+
+    Multiple terms must all match; double-quoted phrases must match in order.
+
+    Args:
+        model: The note model class
+        query (str): The user's search text
+        limit (int): Maximum number of notes to return
+        columns: Return rows of just these columns instead of Note objects
+
+    Returns:
+        list: Matching notes, best match first
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return []
+
+    base = model.query.with_entities(*columns) if columns else model.query
+    dialect = base.session.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        tsquery = to_tsquery(terms)
+        vector = literal_column('note.search_vector')
+        results = base.filter(vector.op('@@')(tsquery)).order_by(
+            func.ts_rank_cd(vector, tsquery).desc(), model.updated_at.desc()
+        )
+    elif dialect == 'sqlite':
+        fts = literal_column('note_fts')
+        results = base.join(note_fts, note_fts.c.rowid == model.id).filter(
+            fts.op('MATCH')(to_fts5_query(terms))
+        ).order_by(
+            # bm25() is lower for better matches
+            func.bm25(fts, literal_column(str(TITLE_WEIGHT)), literal_column(str(CONTENT_WEIGHT))),
+            model.updated_at.desc()
+        )
+    else:
+        results = base
+        for term in terms:
+            results = results.filter(or_(model.title.contains(term), model.content.contains(term)))
+        results = results.order_by(model.updated_at.desc())
+
+    return results.limit(limit).all()
@@ -0,0 +1,111 @@
+"""
+Paragraph-level translation of note content
+
+Content is split into paragraphs at blank lines (never inside a fenced
+code block), and each paragraph is translated on its own. Translations go
+through the LLM cache, whose key includes a hash of the paragraph, so it
+acts as a segment memory: translating an edited note only sends the
+paragraphs that changed, and latency and token cost follow the size of the
+edit rather than the size of the note.
+"""
+
+FENCE = '```'
+
+
+def split_segments(text):
+    """
+    Split text into paragraphs and the blank lines between them
+
+    Returns:
+        list: (piece, is_paragraph) pairs; joining the pieces gives back text
+    """
+    pieces = []
+    paragraph = []
+    gap = []
+    in_fence = False
+    for line in text.splitlines(keepends=True):
+        if not line.strip() and not in_fence:
+            if paragraph:
+                pieces.append((''.join(paragraph), True))
+                paragraph = []
+            gap.append(line)
+            continue
+        if gap:
+            pieces.append((''.join(gap), False))
+            gap = []
+        if line.lstrip().startswith(FENCE):
+            in_fence = not in_fence
+        paragraph.append(line)
+    if paragraph:
+        pieces.append((''.join(paragraph), True))
+    if gap:
+        pieces.append((''.join(gap), False))
+    return pieces
+
+
+def paragraphs(text):
+    """The distinct paragraphs of text, stripped, in order of first appearance"""
+    cores = (piece.strip() for piece, is_paragraph in split_segments(text) if is_paragraph)
+    return list(dict.fromkeys(core for core in cores if core))
+
+
+def translate_segments(text, translate):
+    """
+    Translate text paragraph by paragraph, keeping its layout
+
+    Args:
+        text (str): The text to translate
+        translate (callable): Translates one paragraph, e.g.
+            LLMClient.translate_to_chinese
+
+    Returns:
+        str: The translated paragraphs, reassembled in order with the
+        original whitespace around and between them
+    """
+    translated = {}
+    parts = []
+    for piece, is_paragraph in split_segments(text):
+        core = piece.strip()
+        if not is_paragraph or not core:
+            parts.append(piece)
+            continue
+        # Repeated paragraphs are translated once
+        if core not in translated:
+            translated[core] = translate(core)
+        start = piece.index(core)
+        parts.append(piece[:start] + translated[core] + piece[start + len(core):])
+    return ''.join(parts)
+
+
+def stream_segments(text, stream_translate):
+    """
+    Like translate_segments, but yields the translation in pieces as each
+    paragraph is translated
+
+    Args:
+        text (str): The text to translate
+        stream_translate (callable): Translates one paragraph, yielding
+            pieces, e.g. LLMClient.stream_translate_to_chinese
+
+    Yields:
+        str: Pieces that join to what translate_segments returns
+    """
+    translated = {}
+    for piece, is_paragraph in split_segments(text):
+        core = piece.strip()
+        if not is_paragraph or not core:
+            yield piece
+            continue
+        start = piece.index(core)
+        if start:
+            yield piece[:start]
+        if core in translated:
+            yield translated[core]
+        else:
+            parts = []
+            for token in stream_translate(core):
+                parts.append(token)
+                yield token
+            translated[core] = ''.join(parts)
+        if piece[start + len(core):]:
+            yield piece[start + len(core):]
@@ -0,0 +1,153 @@
+"""
+Fast JSON for note lists
+
+List and search endpoints read plain column tuples instead of hydrating
+Note objects, and each note's encoded JSON (full, or the summary
+projection) is cached by (id, updated_at), so a response is mostly a
+concatenation of cached byte strings. orjson is used when installed; the
+stdlib encoder is the fallback.
+"""
+import json
+from collections import OrderedDict
+from threading import Lock
+
+from flask import Response
+
+from src.utils import note_events
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Upper bound on cached JSON, in bytes
+MAX_FRAGMENT_BYTES = 32 * 1024 * 1024
+
+
+def dumps(value):
+    """Encode a value as compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def parse_fields(value):
+    """
+    Parse the fields query parameter: ``full`` (the default) or ``summary``,
+    which swaps content for its preview, length and word count
+
+    Raises:
+        ValueError: For any other value
+    """
+    if value is None or value == '':
+        return 'full'
+    if value not in ('full', 'summary'):
+        raise ValueError('fields must be full or summary')
+    return value
+
+
+def note_columns(model, fields='full'):
+    """The columns a list response with these fields needs"""
+    columns = (model.id, model.title, model.preview, model.content_length, model.word_count,
+               model.created_at, model.updated_at, model.version)
+    return columns + (model.content,) if fields == 'full' else columns
+
+
+def _summary(row):
+    # Same fields and key order as Note.to_dict() under jsonify's sort_keys
+    return {
+        'content_length': row.content_length,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'id': row.id,
+        'preview': row.preview,
+        'title': row.title,
+        'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+        'version': row.version,
+        'word_count': row.word_count
+    }
+
+
+def _encode_summary(row):
+    return dumps(_summary(row))
+
+
+def _encode_full(row):
+    return dumps({'content': row.content, **_summary(row)})
+
+
+class FragmentCache:
+    """
+    LRU of encoded notes, keyed by id and checked against updated_at
+
+    Every write changes updated_at, so a stale fragment is never served;
+    note_events just drops changed and deleted notes early to free space.
+    """
+
+    def __init__(self, encode, max_bytes=MAX_FRAGMENT_BYTES):
+        self._encode = encode
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._fragments = OrderedDict()
+        self._lock = Lock()
+
+    def _discard(self, note_id):
+        entry = self._fragments.pop(note_id, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def apply(self, upserts, deleted_ids):
+        """note_events callback"""
+        with self._lock:
+            for note_id in list(upserts) + list(deleted_ids):
+                self._discard(note_id)
+
+    def encode(self, row):
+        """The JSON bytes for one note row, from cache when it is current"""
+        with self._lock:
+            entry = self._fragments.get(row.id)
+            if entry is not None and entry[0] == row.updated_at:
+                self._fragments.move_to_end(row.id)
+                self.hits += 1
+                return entry[1]
+
+        fragment = self._encode(row)
+        with self._lock:
+            self.misses += 1
+            self._discard(row.id)
+            self._fragments[row.id] = (row.updated_at, fragment)
+            self.size += len(fragment)
+            while self.size > self.max_bytes and self._fragments:
+                _note_id, (_updated_at, evicted) = self._fragments.popitem(last=False)
+                self.size -= len(evicted)
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+            self.size = 0
+
+
+fragment_caches = {
+    'full': FragmentCache(_encode_full),
+    'summary': FragmentCache(_encode_summary, max_bytes=MAX_FRAGMENT_BYTES // 4),
+}
+for _cache in fragment_caches.values():
+    note_events.subscribe(_cache.apply)
+
+
+def notes_json(rows, fields='full'):
+    """A JSON array of notes, assembled from cached fragments"""
+    cache = fragment_caches[fields]
+    return b'[' + b','.join(cache.encode(row) for row in rows) + b']'
+
+
+def json_response(body, status=200):
+    """A response for already-encoded JSON bytes"""
+    return Response(body, status=status, mimetype='application/json')
+
+
+def note_page_json(rows, next_cursor, fields='full'):
+    """The {"next_cursor", "notes"} envelope for a page of notes"""
+    return b'{"next_cursor":' + dumps(next_cursor) + b',"notes":' + notes_json(rows, fields) + b'}'
@@ -0,0 +1,106 @@
+"""
+Shared upstream calls for the LLM client
+
+Model requests run as coroutines on one background event loop, so any
+thread (a Flask request, a streaming response) can submit one and wait for
+its result, or relay a streamed one piece by piece. ``SingleFlight`` makes
+callers that ask for the same key while a call is in flight await that
+call instead of starting another: during a burst of identical prompts only
+the first reaches the API and every caller gets its result (or its
+exception).
+"""
+import asyncio
+import queue
+import threading
+
+
+class BackgroundLoop:
+    """An asyncio event loop in a daemon thread, started on first use"""
+
+    def __init__(self, name='llm-loop'):
+        self.name = name
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name=self.name, daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def run(self, coroutine):
+        """Run a coroutine on the loop and block the calling thread until it finishes"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def relay(self, produce):
+        """
+        Run produce(emit) on the loop, yielding in the calling thread each
+        item it emits as soon as it is emitted
+
+        Args:
+            produce (callable): Takes emit and returns the coroutine to run
+
+        Yields:
+            The emitted items; the coroutine's exception, if any, is raised
+            after the last one
+        """
+        items = queue.Queue()
+        done = object()
+
+        async def run():
+            try:
+                await produce(items.put)
+            finally:
+                items.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(run(), self.loop)
+        while True:
+            item = items.get()
+            if item is done:
+                break
+            yield item
+        future.result()
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls by key
+
+    Must only be used from coroutines on one event loop, which is what
+    keeps the in-flight table consistent without a lock.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, call):
+        """
+        Await call() once per key at a time
+
+        Args:
+            key (str): Identifies the request, e.g. its LLM cache key
+            call (callable): Returns the coroutine that makes the request
+
+        Returns:
+            The result of the call in flight for key, started now if none was
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(call())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._flights.pop(key, None))
+            self.calls += 1
+        else:
+            self.shared += 1
+        # Shielded so a caller that gives up does not cancel the call for the others
+        return await asyncio.shield(flight)
+
+    def stats(self):
+        """Upstream calls made and callers that shared one already in flight"""
+        return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._flights)}
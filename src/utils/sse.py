@@ -0,0 +1,75 @@
+"""
+Server-sent events for streaming AI responses
+
+A stream is a series of ``token`` events, each carrying the next piece of
+the model's output as it is generated, followed by one ``done`` event with
+the same payload the non-streaming endpoint returns, or an ``error`` event
+if the model call fails part way.
+"""
+import json
+
+from flask import Response, stream_with_context
+
+
+def wants_stream(request, data=None):
+    """Whether a request asked for SSE, through ?stream=1 or "stream": true in its JSON body"""
+    if request.args.get('stream', '').lower() in ('1', 'true'):
+        return True
+    return bool(isinstance(data, dict) and data.get('stream') is True)
+
+
+def sse_event(event, data):
+    """One event, with its data encoded as a single line of JSON"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(events):
+    """Stream events to the client without proxy buffering"""
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def stream_tokens(tokens, finish, error_prefix):
+    """
+    Relay model output as token events, then a done event
+
+    Args:
+        tokens: Iterable of output text pieces, e.g. a stream_* LLMClient method
+        finish (callable): Builds the done payload from the full output
+        error_prefix (str): Prefix for the error event's message
+    """
+    parts = []
+    try:
+        for token in tokens:
+            parts.append(token)
+            yield sse_event('token', {'text': token})
+        yield sse_event('done', finish(''.join(parts)))
+    except Exception as e:
+        yield sse_event('error', {'error': f'{error_prefix}: {str(e)}'})
+
+
+def stream_fields(fields, finish, error_prefix):
+    """
+    Like stream_tokens for output with several parts, streamed one after
+    another; each token event names its field
+
+    Args:
+        fields: (name, tokens) pairs
+        finish (callable): Builds the done payload from a dict of each
+            field's full output
+        error_prefix (str): Prefix for the error event's message
+    """
+    outputs = {}
+    try:
+        for name, tokens in fields:
+            parts = []
+            for token in tokens:
+                parts.append(token)
+                yield sse_event('token', {'field': name, 'text': token})
+            outputs[name] = ''.join(parts)
+        yield sse_event('done', finish(outputs))
+    except Exception as e:
+        yield sse_event('error', {'error': f'{error_prefix}: {str(e)}'})
@@ -0,0 +1,182 @@
+"""
+Title autocomplete backed by an in-process prefix index
+
+Titles are kept in sorted arrays and prefix lookups are two binary
+searches, so a suggestion costs microseconds and can run on every
+keystroke. The index is built on first use and kept current through
+note_events; writes and deletes (through tombstones) from other processes
+are picked up at most every REFRESH_INTERVAL seconds, by ``change_seq``
+watermarks, which follow commit order so no late commit is skipped.
+"""
+import bisect
+import threading
+import time
+
+from sqlalchemy import func
+
+from src.utils import note_events
+
+# Seconds between checks for notes written by other processes
+REFRESH_INTERVAL = 5.0
+# Suggestions returned when the client does not ask for a limit
+DEFAULT_SUGGESTIONS = 10
+
+_HIGHEST = '\U0010ffff'
+
+
+def normalize_title(title):
+    """Case-fold and collapse whitespace so lookups ignore case and spacing"""
+    return ' '.join((title or '').casefold().split())
+
+
+class TitlePrefixIndex:
+    """
+    Sorted (key, note_id) arrays over note titles
+
+    ``_titles`` holds each whole title; ``_words`` holds the title from each
+    later word onwards, so "learn" also suggests "Machine Learning".
+    Whole-title matches are suggested first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._titles = []
+        self._words = []
+        self._note_titles = {}
+        self.built = False
+        self.watermark = 0
+        self.deleted_watermark = 0
+        self.refreshed_at = 0.0
+
+    def clear(self):
+        """Forget every title; the next lookup rebuilds the index"""
+        with self._lock:
+            self._titles = []
+            self._words = []
+            self._note_titles = {}
+            self.built = False
+            self.watermark = 0
+            self.deleted_watermark = 0
+            self.refreshed_at = 0.0
+
+    def _entries(self, note_id, title):
+        key = normalize_title(title)
+        yield self._titles, (key, note_id)
+        position = key.find(' ')
+        while position != -1:
+            yield self._words, (key[position + 1:], note_id)
+            position = key.find(' ', position + 1)
+
+    def _add(self, note_id, title):
+        self._note_titles[note_id] = title
+        for entries, entry in self._entries(note_id, title):
+            bisect.insort(entries, entry)
+
+    def _remove(self, note_id):
+        title = self._note_titles.pop(note_id, None)
+        if title is None:
+            return
+        for entries, entry in self._entries(note_id, title):
+            position = bisect.bisect_left(entries, entry)
+            if position < len(entries) and entries[position] == entry:
+                del entries[position]
+
+    def apply(self, upserts, deleted_ids):
+        """Apply committed note changes; ignored until the index is built"""
+        with self._lock:
+            if not self.built:
+                return
+            for note_id in deleted_ids:
+                self._remove(note_id)
+            for note_id, (title, _content) in upserts.items():
+                self._remove(note_id)
+                self._add(note_id, title)
+
+    def refresh(self, model, tombstone_model):
+        """Build the index on first use, then periodically pick up other processes' writes and deletes"""
+        if self.built and time.monotonic() - self.refreshed_at < REFRESH_INTERVAL:
+            return
+        with self._lock:
+            if self.built:
+                self._remove_deleted(tombstone_model)
+            else:
+                # Tombstones older than the initial load are already reflected in it
+                self.deleted_watermark = tombstone_model.query.with_entities(
+                    func.max(tombstone_model.change_seq)
+                ).scalar() or 0
+
+            rows = model.query.with_entities(model.id, model.title, model.change_seq)
+            if self.built:
+                rows = rows.filter(model.change_seq > self.watermark)
+            for note_id, title, change_seq in rows.yield_per(1000):
+                if self.built:
+                    self._remove(note_id)
+                    self._add(note_id, title)
+                else:
+                    # Initial load: append everything and sort once below
+                    self._note_titles[note_id] = title
+                    for entries, entry in self._entries(note_id, title):
+                        entries.append(entry)
+                self.watermark = max(self.watermark, change_seq)
+            if not self.built:
+                self._titles.sort()
+                self._words.sort()
+                self.built = True
+            self.refreshed_at = time.monotonic()
+
+    def _remove_deleted(self, tombstone_model):
+        rows = tombstone_model.query.with_entities(tombstone_model.note_id, tombstone_model.change_seq).filter(
+            # Strictly after: a tombstone read twice could remove a note whose id was reused
+            tombstone_model.change_seq > self.deleted_watermark
+        )
+        for note_id, change_seq in rows:
+            self._remove(note_id)
+            self.deleted_watermark = max(self.deleted_watermark, change_seq)
+
+    def suggest(self, prefix, limit):
+        """
+        Titles starting with the prefix, or with a word starting with it
+
+        Returns:
+            list: Up to limit (note_id, title) pairs
+        """
+        key = normalize_title(prefix)
+        if not key:
+            return []
+
+        results = []
+        seen = set()
+        with self._lock:
+            for entries in (self._titles, self._words):
+                start = bisect.bisect_left(entries, (key,))
+                end = bisect.bisect_left(entries, (key + _HIGHEST,))
+                for position in range(start, end):
+                    note_id = entries[position][1]
+                    if note_id in seen:
+                        continue
+                    seen.add(note_id)
+                    results.append((note_id, self._note_titles[note_id]))
+                    if len(results) == limit:
+                        return results
+        return results
+
+
+title_index = TitlePrefixIndex()
+note_events.subscribe(title_index.apply)
+
+
+def suggest_titles(model, tombstone_model, prefix, limit):
+    """
+    Autocomplete note titles
+
+    Args:
+        model: The note model class
+        tombstone_model: The tombstone model class, for other processes' deletes
+        prefix (str): What the user has typed so far
+        limit (int): Maximum number of suggestions
+
+    Returns:
+        list: Suggestions as {'id', 'title'} dicts
+    """
+    title_index.refresh(model, tombstone_model)
+    return [{'id': note_id, 'title': title} for note_id, title in title_index.suggest(prefix, limit)]
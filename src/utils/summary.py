@@ -0,0 +1,80 @@
+"""
+Derived summary fields stored alongside note content
+
+``preview``, ``content_length`` and ``word_count`` are computed whenever
+content is written (ORM, batch and import paths alike), so listings can
+show an excerpt without reading the content column.
+"""
+import re
+
+from sqlalchemy import bindparam, select, text
+
+from src.utils.tokenizer import CJK_CHARACTERS
+
+PREVIEW_LENGTH = 200
+SUMMARY_FIELDS = ('preview', 'content_length', 'word_count')
+
+WHITESPACE = re.compile(r'\s+')
+# Each CJK character counts as a word, like word processors count them
+SUMMARY_WORD = re.compile(f'[{CJK_CHARACTERS}]|[^\\W{CJK_CHARACTERS}]+')
+
+BACKFILL_BATCH_SIZE = 1000
+
+# A backfill must not bump updated_at through Supabase's timestamp trigger
+POSTGRES_TIMESTAMP_TRIGGER = """
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_trigger
+        WHERE tgname = 'update_note_updated_at' AND tgrelid = 'note'::regclass
+    ) THEN
+        ALTER TABLE note {action} TRIGGER update_note_updated_at;
+    END IF;
+END
+$$
+"""
+
+
+def note_summary(content):
+    """
+    Summary fields for a note's content
+
+    Returns:
+        dict: preview (the first PREVIEW_LENGTH characters, whitespace
+        collapsed), content_length (in characters) and word_count
+    """
+    content = content or ''
+    return {
+        'preview': WHITESPACE.sub(' ', content[:PREVIEW_LENGTH * 2]).strip()[:PREVIEW_LENGTH],
+        'content_length': len(content),
+        'word_count': len(SUMMARY_WORD.findall(content))
+    }
+
+
+def backfill_note_summaries(engine, table):
+    """Fill in summary fields for notes written before they existed"""
+    statement = table.update().where(table.c.id == bindparam('note_id')).values(
+        **{field: bindparam(f'new_{field}') for field in SUMMARY_FIELDS},
+        # Set explicitly so the column's onupdate default does not fire
+        updated_at=table.c.updated_at
+    )
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(table.c.id, table.c.content)
+                .where(table.c.id > last_id, table.c.content_length.is_(None))
+                .order_by(table.c.id).limit(BACKFILL_BATCH_SIZE)
+            ).all()
+            if not rows:
+                return
+            postgres = conn.dialect.name == 'postgresql'
+            if postgres:
+                conn.execute(text(POSTGRES_TIMESTAMP_TRIGGER.format(action='DISABLE')))
+            conn.execute(statement, [
+                {'note_id': row.id, **{f'new_{field}': value for field, value in note_summary(row.content).items()}}
+                for row in rows
+            ])
+            if postgres:
+                conn.execute(text(POSTGRES_TIMESTAMP_TRIGGER.format(action='ENABLE')))
+        last_id = rows[-1].id
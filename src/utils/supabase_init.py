@@ -1,6 +1,16 @@
 import os
-import psycopg2
+import sys
+from datetime import datetime
+
 from dotenv import load_dotenv
+from sqlalchemy import create_engine, func, select, text
+
+# Add the project root to Python path so this script can run directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from src.models.note import Note
+from src.utils.migrations import migrate
+from src.utils.summary import note_summary
 
 # Load environment variables
 load_dotenv()
@@ -15,64 +25,36 @@ def init_supabase_database():
     
     print("🔄 Connecting to Supabase database...")
     
+    if database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+
     try:
-        # Connect to database
-        conn = psycopg2.connect(database_url, sslmode='require')
-        cursor = conn.cursor()
+        engine = create_engine(database_url, connect_args={'sslmode': 'require'})
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
         
         print("✅ Connected to Supabase successfully!")
         
-        # Create notes table
-        create_table_sql = """
-        CREATE TABLE IF NOT EXISTS note (
-            id SERIAL PRIMARY KEY,
-            title VARCHAR(200) NOT NULL,
-            content TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        
-        -- Create index for better search performance
-        CREATE INDEX IF NOT EXISTS idx_note_title ON note(title);
-        CREATE INDEX IF NOT EXISTS idx_note_created_at ON note(created_at);
-        
-        -- Create a trigger to update updated_at automatically
-        CREATE OR REPLACE FUNCTION update_updated_at_column()
-        RETURNS TRIGGER AS $$
-        BEGIN
-            NEW.updated_at = CURRENT_TIMESTAMP;
-            RETURN NEW;
-        END;
-        $$ language 'plpgsql';
-        
-        DROP TRIGGER IF EXISTS update_note_updated_at ON note;
-        CREATE TRIGGER update_note_updated_at
-            BEFORE UPDATE ON note
-            FOR EACH ROW
-            EXECUTE FUNCTION update_updated_at_column();
-        """
-        
-        cursor.execute(create_table_sql)
-        conn.commit()
-        
+        # Tables, indexes, search and triggers all come from the migrations
+        migrate(engine)
+
         print("✅ Database tables created successfully!")
         
-        # Test insert
-        cursor.execute("""
-            INSERT INTO note (title, content) 
-            VALUES ('Welcome Note', 'Welcome to your new note-taking app with Supabase!') 
-            ON CONFLICT DO NOTHING
-        """)
-        conn.commit()
-        
-        # Check if data exists
-        cursor.execute("SELECT COUNT(*) FROM note")
-        count = cursor.fetchone()[0]
+        notes = Note.__table__
+        with engine.begin() as conn:
+            count = conn.execute(select(func.count()).select_from(notes)).scalar()
+            if not count:
+                # Welcome note for a fresh database
+                content = 'Welcome to your new note-taking app with Supabase!'
+                now = datetime.utcnow()
+                conn.execute(notes.insert().values(
+                    title='Welcome Note', content=content, created_at=now, updated_at=now, **note_summary(content)
+                ))
+                count = 1
         
         print(f"✅ Database initialization complete! Found {count} notes in database.")
         
-        cursor.close()
-        conn.close()
+        engine.dispose()
         
         return True
         
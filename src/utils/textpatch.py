@@ -0,0 +1,50 @@
+"""
+Compact text diffs for autosave
+
+A patch is a list of splices against the base text, each
+``{"start": int, "end": int, "text": str}``, replacing ``base[start:end]``
+with ``text``. Offsets count UTF-16 code units, matching JavaScript string
+indices, so the browser can compute them directly.
+"""
+
+
+def apply_edits(base, edits):
+    """
+    Apply splices to the base text
+
+    Args:
+        base (str): The text the client edited
+        edits (list): Non-overlapping splices in ascending order
+
+    Returns:
+        str: The patched text
+
+    Raises:
+        ValueError: If the edits are malformed or out of range
+    """
+    if not isinstance(edits, list):
+        raise ValueError('content_edits must be a list')
+
+    encoded = base.encode('utf-16-le', 'surrogatepass')
+    length = len(encoded) // 2
+    pieces = []
+    position = 0
+
+    for edit in edits:
+        if not isinstance(edit, dict):
+            raise ValueError('Each edit must be an object')
+        start, end, text = edit.get('start'), edit.get('end'), edit.get('text', '')
+        if not isinstance(start, int) or not isinstance(end, int) or not isinstance(text, str):
+            raise ValueError('Each edit needs integer start/end and string text')
+        if not position <= start <= end <= length:
+            raise ValueError('Edits must be in order, non-overlapping and within the base text')
+        pieces.append(encoded[position * 2:start * 2])
+        # Lone surrogates are allowed here as long as the result pairs them up
+        pieces.append(text.encode('utf-16-le', 'surrogatepass'))
+        position = end
+
+    pieces.append(encoded[position * 2:])
+    try:
+        return b''.join(pieces).decode('utf-16-le')
+    except UnicodeDecodeError:
+        raise ValueError('Edits split a surrogate pair')
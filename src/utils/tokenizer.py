@@ -0,0 +1,105 @@
+"""
+Tokenization helpers for the note search indexes
+
+Chinese, Japanese and Korean text is written without spaces, so database
+word parsers see a whole sentence as a single token. ``cjk_bigrams``
+rewrites each CJK run as overlapping character bigrams so that the
+ordinary word tokenizers of FTS5 and PostgreSQL index it usefully, while
+leaving all other text untouched.
+"""
+import re
+
+# Hiragana/Katakana, CJK Extension A, CJK Unified Ideographs,
+# CJK Compatibility Ideographs and Hangul syllables
+CJK_CHARACTERS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af'
+
+CJK_RUN = re.compile(f'[{CJK_CHARACTERS}]+')
+
+# The SQL twin of cjk_bigrams(), used by the PostgreSQL search trigger.
+# Both must produce the same tokens for index and query to agree. It runs
+# on every note write, so it is set-based: the text is split into CJK and
+# other runs, each CJK run into characters paired with the next one by
+# lead(), and string_agg joins everything once, in linear time.
+POSTGRES_CJK_BIGRAMS = f"""
+CREATE OR REPLACE FUNCTION cjk_bigrams(input text)
+RETURNS text AS $$
+    SELECT coalesce(string_agg(
+        CASE WHEN run ~ '^[{CJK_CHARACTERS}]' THEN ' ' || (
+            -- Each character with the next one, then the last one alone
+            SELECT string_agg(ch || coalesce(next_ch, ''), ' ' ORDER BY n)
+            FROM (
+                SELECT ch, n, lead(ch) OVER (ORDER BY n) AS next_ch
+                FROM regexp_split_to_table(run, '') WITH ORDINALITY AS chars(ch, n)
+            ) pairs
+        ) || ' ' ELSE run END,
+        '' ORDER BY run_n
+    ), '')
+    FROM (
+        SELECT parts[1] AS run, run_n
+        FROM regexp_matches(input, '([{CJK_CHARACTERS}]+|[^{CJK_CHARACTERS}]+)', 'g')
+            WITH ORDINALITY AS runs(parts, run_n)
+    ) runs
+$$ LANGUAGE sql IMMUTABLE
+"""
+
+
+def _index_run(match):
+    run = match.group(0)
+    grams = [run[i:i + 2] for i in range(len(run) - 1)]
+    # The last character is also indexed alone so single-character
+    # queries can match it at the end of a run
+    grams.append(run[-1])
+    return ' ' + ' '.join(grams) + ' '
+
+
+def _query_run(match):
+    run = match.group(0)
+    if len(run) == 1:
+        return ' ' + run + ' '
+    return ' ' + ' '.join(run[i:i + 2] for i in range(len(run) - 1)) + ' '
+
+
+def cjk_bigrams(text):
+    """
+    Rewrite text for indexing: every CJK run becomes its overlapping
+    bigrams followed by its last character, e.g. 世界和平 -> 世界 界和 和平 平
+
+    Args:
+        text (str): Note title or content
+
+    Returns:
+        str: Text ready for a word tokenizer
+    """
+    if not text:
+        return ''
+    return CJK_RUN.sub(_index_run, text)
+
+
+def cjk_query_bigrams(term):
+    """
+    Rewrite a query term the same way, without the trailing unigram, so a
+    CJK term becomes a phrase of consecutive bigrams in the index
+    """
+    return CJK_RUN.sub(_query_run, term).strip()
+
+
+def is_single_cjk_character(term):
+    """True if the term is one CJK character, which needs a prefix match"""
+    return len(term) == 1 and CJK_RUN.fullmatch(term) is not None
+
+
+WORD = re.compile(r'\w+')
+
+
+def words(text):
+    """Lowercased word tokens of a text"""
+    return WORD.findall(text.lower()) if text else []
+
+
+def trigrams(word):
+    """
+    Character trigrams of a word, padded the way pg_trgm pads them so
+    that word starts weigh more than word ends
+    """
+    padded = '  ' + word + ' '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
@@ -0,0 +1,139 @@
+"""
+Batch translation: many texts, one concurrent fan-out
+
+The texts of a batch are split into paragraphs (see segments.py) and each
+distinct paragraph is translated once. Paragraphs already in the LLM cache
+cost nothing; short ones are packed several to a prompt, sent as a JSON
+array and expected back as one; the rest get a request each. The requests
+run concurrently within the LLM client's limit, and each text is
+reassembled from its paragraphs so results come back in input order.
+"""
+import json
+
+from sqlalchemy.orm import undefer
+
+MAX_BATCH_ITEMS = 100
+
+# Paragraphs up to PACK_ITEM_CHARS long are packed, at most PACK_SIZE or
+# PACK_CHARS in total to a prompt, so one bad reply only costs a few retries
+PACK_ITEM_CHARS = 300
+PACK_SIZE = 20
+PACK_CHARS = 2000
+
+
+def validate_translation_batch(data):
+    """
+    Check a batch translation request body
+
+    Returns:
+        tuple: (texts, note ids)
+
+    Raises:
+        ValueError: Describing what is wrong with the body
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    texts = data.get('texts', [])
+    note_ids = data.get('note_ids', [])
+    if not isinstance(texts, list) or not isinstance(note_ids, list):
+        raise ValueError('texts and note_ids must be lists')
+    if not texts and not note_ids:
+        raise ValueError('Provide texts and/or note_ids to translate')
+    if len(texts) + len(note_ids) > MAX_BATCH_ITEMS:
+        raise ValueError(f'A batch may contain at most {MAX_BATCH_ITEMS} items')
+    if not all(isinstance(text, str) and text.strip() for text in texts):
+        raise ValueError('texts must be a list of non-empty strings')
+    if not all(isinstance(note_id, int) for note_id in note_ids):
+        raise ValueError('note_ids must be a list of note ids')
+    return texts, note_ids
+
+
+def plan_jobs(paragraphs):
+    """
+    Group paragraphs into model requests
+
+    Returns:
+        list: Lists of paragraphs; one with several is sent as a pack
+    """
+    jobs = []
+    pack = []
+    pack_chars = 0
+    for paragraph in paragraphs:
+        if len(paragraph) > PACK_ITEM_CHARS:
+            jobs.append([paragraph])
+            continue
+        if pack and (len(pack) == PACK_SIZE or pack_chars + len(paragraph) > PACK_CHARS):
+            jobs.append(pack)
+            pack, pack_chars = [], 0
+        pack.append(paragraph)
+        pack_chars += len(paragraph)
+    if pack:
+        jobs.append(pack)
+    return jobs
+
+
+def parse_pack(reply, count):
+    """
+    The translations in a pack reply
+
+    Returns:
+        list | None: count strings, or None if the reply is not a JSON array
+        of that many strings (the model merged, split or dropped an item)
+    """
+    start, end = reply.find('['), reply.rfind(']')
+    if start < 0 or end < start:
+        return None
+    try:
+        items = json.loads(reply[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(items, list) or len(items) != count:
+        return None
+    if not all(isinstance(item, str) and item.strip() for item in items):
+        return None
+    return [item.strip() for item in items]
+
+
+def run_translation_batch(translate_batch, Note, texts, note_ids):
+    """
+    Translate texts and notes with one call to translate_batch, so every
+    title, content and text shares the fan-out
+
+    Args:
+        translate_batch (callable): e.g. LLMClient.translate_batch_to_chinese
+        Note: The note model, used to load note_ids
+        texts (list): Texts to translate
+        note_ids (list): Notes to translate
+
+    Returns:
+        dict: A result per text and per note id, in request order; note ids
+        that do not exist get an error entry
+    """
+    notes = {}
+    if note_ids:
+        query = Note.query.options(undefer(Note.content)).filter(Note.id.in_(note_ids))
+        notes = {note.id: note for note in query}
+    found = [notes[note_id] for note_id in dict.fromkeys(note_ids) if note_id in notes]
+
+    translated = iter(translate_batch(texts + [field for note in found for field in (note.title, note.content)]))
+    translations = [{'original_text': text, 'translated_text': next(translated)} for text in texts]
+    translated_notes = {note.id: {'title': next(translated), 'content': next(translated)} for note in found}
+
+    note_results = []
+    for note_id in note_ids:
+        if note_id not in notes:
+            note_results.append({'note_id': note_id, 'error': 'Note not found'})
+            continue
+        note = notes[note_id]
+        note_results.append({
+            'note_id': note_id,
+            'original': {'title': note.title, 'content': note.content},
+            'translated': translated_notes[note_id]
+        })
+
+    return {
+        'translations': translations,
+        'notes': note_results,
+        'source_language': 'en',
+        'target_language': 'zh'
+    }
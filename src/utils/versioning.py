@@ -0,0 +1,179 @@
+"""
+Version counters and ETags for conditional note reads
+
+Each note carries a ``version`` that SQLAlchemy increments on update. The
+note collection as a whole has a counter in ``collection_version``, which
+database triggers advance once per transaction that writes notes or
+tombstones, stamping the new value on every row it writes as
+``change_seq``. The counter row stays locked from that first write until
+commit, so the values follow commit order: a list ETag changes with every
+committed write, and the change feed can page on ``change_seq`` without
+missing a write that committed late.
+"""
+import hashlib
+
+from flask import make_response
+from sqlalchemy import text
+
+from src.utils.compression import CONTENT_CODINGS, encoded_etag
+
+NOTE_COLLECTION = 'note'
+
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS collection_version (
+        name VARCHAR(50) PRIMARY KEY,
+        version BIGINT NOT NULL
+    )
+    """,
+    "ALTER TABLE note ADD COLUMN IF NOT EXISTS change_seq BIGINT DEFAULT 0 NOT NULL",
+    "ALTER TABLE note_tombstone ADD COLUMN IF NOT EXISTS change_seq BIGINT DEFAULT 0 NOT NULL",
+    # The transaction's number is kept in a transaction-local setting, so
+    # the counter is advanced once however many rows the transaction writes
+    """
+    CREATE OR REPLACE FUNCTION stamp_note_change()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        seq text := current_setting('notes.change_seq', true);
+    BEGIN
+        IF seq IS NULL OR seq = '' THEN
+            UPDATE collection_version SET version = version + 1 WHERE name = 'note'
+            RETURNING version::text INTO seq;
+            PERFORM set_config('notes.change_seq', seq, true);
+        END IF;
+        NEW.change_seq := seq::bigint;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS note_change_seq_trigger ON note",
+    """
+    CREATE TRIGGER note_change_seq_trigger
+        BEFORE INSERT OR UPDATE ON note
+        FOR EACH ROW
+        EXECUTE FUNCTION stamp_note_change()
+    """,
+    "DROP TRIGGER IF EXISTS note_tombstone_change_seq_trigger ON note_tombstone",
+    """
+    CREATE TRIGGER note_tombstone_change_seq_trigger
+        BEFORE INSERT ON note_tombstone
+        FOR EACH ROW
+        EXECUTE FUNCTION stamp_note_change()
+    """,
+]
+
+# SQLite has one writer at a time, so numbering each row as it is written
+# already follows commit order
+SQLITE_STAMP = """
+    UPDATE collection_version SET version = version + 1 WHERE name = 'note';
+    UPDATE {table} SET change_seq = (SELECT version FROM collection_version WHERE name = 'note')
+    WHERE id = NEW.id;
+"""
+
+SQLITE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS collection_version (
+        name VARCHAR(50) PRIMARY KEY,
+        version BIGINT NOT NULL
+    )
+    """,
+    "ALTER TABLE note ADD COLUMN change_seq BIGINT DEFAULT 0 NOT NULL",
+    "ALTER TABLE note_tombstone ADD COLUMN change_seq BIGINT DEFAULT 0 NOT NULL",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS note_change_seq_insert AFTER INSERT ON note BEGIN
+        {SQLITE_STAMP.format(table='note')}
+    END
+    """,
+    # The stamp itself changes change_seq, which must not fire this again
+    f"""
+    CREATE TRIGGER IF NOT EXISTS note_change_seq_update AFTER UPDATE ON note
+    WHEN NEW.change_seq IS OLD.change_seq BEGIN
+        {SQLITE_STAMP.format(table='note')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS note_tombstone_change_seq_insert AFTER INSERT ON note_tombstone BEGIN
+        {SQLITE_STAMP.format(table='note_tombstone')}
+    END
+    """,
+]
+
+INDEXES = [
+    # The change feed's keyset scans over notes and tombstones
+    "CREATE INDEX IF NOT EXISTS ix_note_change_seq ON note (change_seq, id)",
+    "CREATE INDEX IF NOT EXISTS ix_note_tombstone_change_seq ON note_tombstone (change_seq, id)",
+]
+
+
+def install_change_tracking(engine):
+    """
+    Create and seed the note collection counter, add change_seq to notes
+    and tombstones (0 for rows written before) and install the triggers
+    that advance it
+    """
+    dialect = engine.dialect.name
+    if dialect == 'postgresql':
+        statements = POSTGRES_DDL
+    elif dialect == 'sqlite':
+        statements = SQLITE_DDL
+    else:
+        return
+    with engine.begin() as conn:
+        for statement in statements + INDEXES:
+            conn.execute(text(statement))
+        conn.execute(
+            text("INSERT INTO collection_version (name, version) VALUES (:name, 0)"),
+            {'name': NOTE_COLLECTION}
+        )
+
+
+def collection_version(session, name=NOTE_COLLECTION):
+    """Current value of a collection's change counter"""
+    return session.execute(
+        text("SELECT version FROM collection_version WHERE name = :name"), {'name': name}
+    ).scalar() or 0
+
+
+def collection_etag(version, args):
+    """
+    Strong ETag for a listing: the collection version plus the query
+    arguments, since each page or filter is a different representation
+    """
+    query = '&'.join(f'{key}={value}' for key, value in sorted(args.items(multi=True)))
+    digest = hashlib.sha1(query.encode('utf-8')).hexdigest()[:12]
+    return f'notes-{version}-{digest}'
+
+
+def note_etag(note_id, version):
+    """Strong ETag for a single note"""
+    return f'note-{note_id}-{version}'
+
+
+def tag_response(response, etag):
+    """
+    Attach a strong ETag, and ask browsers to revalidate it on every use
+    so fetch() sends If-None-Match instead of guessing freshness
+    """
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def matching_etag(if_none_match, etag):
+    """
+    The form of etag that If-None-Match names: the tag itself, or the tag
+    of one of its compressed representations
+
+    Returns:
+        str | None: The matching tag, for the 304 to carry, or None
+    """
+    for encoding in (None,) + CONTENT_CODINGS:
+        candidate = encoded_etag(etag, encoding)
+        if candidate in if_none_match:
+            return candidate
+    return None
+
+
+def not_modified(etag):
+    """An empty 304 response carrying the ETag"""
+    return tag_response(make_response('', 304), etag)
@@ -0,0 +1,142 @@
+"""
+Single-statement updates and deletes of one note
+
+Each write is one ``UPDATE ... RETURNING`` or ``DELETE ... RETURNING``, with
+an optional If-Match version check in its WHERE clause, so a conditional
+write costs no extra round trip. On PostgreSQL the delete and its tombstone
+insert share one statement through a data-modifying CTE. Databases without
+RETURNING (SQLite before 3.35) fall back to a follow-up SELECT.
+
+These are Core statements, so the ORM version counter, summary fields,
+tombstones and note_events are handled here rather than by model events.
+"""
+import re
+from datetime import datetime
+
+from sqlalchemy import literal, select
+
+from src.utils import note_events
+from src.utils.compression import CONTENT_CODINGS
+from src.utils.summary import note_summary
+
+# A note's ETag, or the ETag of a compressed representation of it
+NOTE_ETAG = re.compile(r'note-(\d+)-(\d+)(?:-(?:{}))?'.format('|'.join(CONTENT_CODINGS)))
+
+
+class PreconditionFailed(Exception):
+    """The note's version did not match If-Match"""
+
+
+def if_match_versions(if_match, note_id):
+    """
+    Versions of this note that an If-Match header accepts
+
+    Returns:
+        list | None: None when there is no precondition (no header or ``*``);
+        otherwise the acceptable versions, possibly none
+    """
+    if not if_match or if_match.star_tag:
+        return None
+    versions = []
+    for etag in if_match:
+        match = NOTE_ETAG.fullmatch(etag)
+        if match and int(match.group(1)) == note_id:
+            versions.append(int(match.group(2)))
+    return versions
+
+
+def _check_missing(session, table, note_id, versions):
+    """Tell a failed precondition from a missing note after a write matched nothing"""
+    if versions is not None and session.execute(
+        select(table.c.id).where(table.c.id == note_id)
+    ).first():
+        raise PreconditionFailed()
+    return None
+
+
+def update_note_row(session, model, note_id, data, versions=None):
+    """
+    Update title and/or content and commit
+
+    Args:
+        session: The database session
+        model: The note model class
+        note_id (int): The note to update
+        data (dict): New title and/or content
+        versions (list): Acceptable current versions, from if_match_versions
+
+    Returns:
+        Row: The updated note, or None if it does not exist
+
+    Raises:
+        PreconditionFailed: If the note exists at a version not in versions
+    """
+    table = model.__table__
+    condition = table.c.id == note_id
+    if versions is not None:
+        condition &= table.c.version.in_(versions)
+
+    values = {field: data[field] for field in ('title', 'content') if field in data}
+    if not values:
+        # Nothing to change: answer like a read
+        row = session.execute(select(table).where(condition)).first()
+        return row or _check_missing(session, table, note_id, versions)
+    if 'content' in values:
+        values.update(note_summary(values['content']))
+
+    statement = table.update().where(condition).values(
+        **values, updated_at=datetime.utcnow(), version=table.c.version + 1
+    )
+    if session.get_bind().dialect.update_returning:
+        row = session.execute(statement.returning(*table.c)).first()
+    else:
+        result = session.execute(statement)
+        row = session.execute(select(table).where(table.c.id == note_id)).first() if result.rowcount else None
+
+    if row is None:
+        session.rollback()
+        return _check_missing(session, table, note_id, versions)
+    session.commit()
+    note_events.publish({row.id: (row.title, row.content)}, [])
+    return row
+
+
+def delete_note_row(session, model, tombstone_model, note_id, versions=None):
+    """
+    Delete a note, leave its tombstone and commit
+
+    Returns:
+        bool: Whether the note existed
+
+    Raises:
+        PreconditionFailed: If the note exists at a version not in versions
+    """
+    table = model.__table__
+    tombstones = tombstone_model.__table__
+    condition = table.c.id == note_id
+    if versions is not None:
+        condition &= table.c.version.in_(versions)
+    deleted_at = datetime.utcnow()
+    dialect = session.get_bind().dialect
+
+    if dialect.name == 'postgresql':
+        deleted = table.delete().where(condition).returning(table.c.id).cte('deleted')
+        statement = tombstones.insert().from_select(
+            ['note_id', 'deleted_at'], select(deleted.c.id, literal(deleted_at, tombstones.c.deleted_at.type))
+        ).returning(tombstones.c.note_id)
+        found = session.execute(statement).first() is not None
+    else:
+        if dialect.delete_returning:
+            found = session.execute(table.delete().where(condition).returning(table.c.id)).first() is not None
+        else:
+            found = session.execute(table.delete().where(condition)).rowcount > 0
+        if found:
+            session.execute(tombstones.insert().values(note_id=note_id, deleted_at=deleted_at))
+
+    if not found:
+        session.rollback()
+        _check_missing(session, table, note_id, versions)
+        return False
+    session.commit()
+    note_events.publish({}, [note_id])
+    return True
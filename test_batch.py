@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for POST /api/notes/batch (src/utils/batch.py)
+
+Covers result ordering, the per-row INSERT path for databases without
+multi-row RETURNING, and reporting the values the database stored.
+Run with pytest.
+"""
+from sqlalchemy import text
+
+from src.models.note import db
+
+
+def run_batch(client, operations, get=()):
+    response = client.post('/api/notes/batch', json={'operations': operations, 'get': list(get)})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_batch_results_follow_request_order(client, create_note):
+    existing = create_note('existing')
+    doomed = create_note('doomed')
+
+    results = run_batch(client, [
+        {'op': 'delete', 'id': doomed['id']},
+        {'op': 'create', 'title': 'one', 'content': 'a'},
+        {'op': 'update', 'id': 999, 'title': 'missing'},
+        {'op': 'update', 'id': existing['id'], 'content': 'updated'},
+        {'op': 'create', 'title': 'two', 'content': 'b'},
+    ])['results']
+
+    assert [(result['index'], result['op'], result['status']) for result in results] == [
+        (0, 'delete', 204), (1, 'create', 201), (2, 'update', 404), (3, 'update', 200), (4, 'create', 201)
+    ]
+    assert results[1]['note']['title'] == 'one' and results[4]['note']['title'] == 'two'
+    assert results[3]['note']['content'] == 'updated'
+    assert results[3]['note']['version'] == existing['version'] + 1
+    assert client.get(f"/api/notes/{doomed['id']}").status_code == 404
+
+
+def test_creates_without_multi_row_returning(client, monkeypatch):
+    monkeypatch.setattr(db.engine.dialect, 'insert_executemany_returning_sort_by_parameter_order', False)
+    results = run_batch(client, [{'op': 'create', 'title': f'note {i}', 'content': str(i)} for i in range(3)])['results']
+
+    titles = [result['note']['title'] for result in results]
+    assert titles == ['note 0', 'note 1', 'note 2']
+    for result in results:
+        assert client.get(f"/api/notes/{result['note']['id']}").get_json()['title'] == result['note']['title']
+
+
+def test_updates_report_the_stored_timestamp(client, create_note):
+    note = create_note('title')
+    # Stand-in for the PostgreSQL trigger that sets updated_at on every UPDATE
+    db.session.execute(text(
+        "CREATE TRIGGER test_fixed_updated_at AFTER UPDATE OF title, content ON note "
+        "BEGIN UPDATE note SET updated_at = '2001-01-01 00:00:00.000000' WHERE id = NEW.id; END"
+    ))
+    db.session.commit()
+
+    result = run_batch(client, [{'op': 'update', 'id': note['id'], 'title': 'renamed'}])['results'][0]
+    assert result['note']['updated_at'] == client.get(f"/api/notes/{note['id']}").get_json()['updated_at']
+    assert result['note']['updated_at'].startswith('2001-01-01')
+
+
+def test_get_returns_notes_and_missing_ids(client, create_note):
+    note = create_note('fetched', 'body')
+    response = run_batch(client, [], get=[note['id'], 999])
+    assert [fetched['content'] for fetched in response['notes']] == ['body']
+    assert response['missing'] == [999]
+
+
+def test_invalid_batches_are_rejected(client):
+    for body in ({'operations': [{'op': 'rename'}]}, {'operations': [{'op': 'update', 'id': 1}]}, []):
+        assert client.post('/api/notes/batch', json=body).status_code == 400
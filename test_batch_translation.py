@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for batch translation (LLMClient.translate_batch_to_chinese)
+
+Uses the fake model from conftest.py: each distinct uncached paragraph
+must reach it once, and cached ones must be found with a single query.
+Run with pytest.
+"""
+from sqlalchemy import event
+
+from src.models.note import db
+
+
+def count_cache_selects(engine):
+    """A list that grows by one for each SELECT on llm_cache"""
+    selects = []
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'llm_cache' in statement:
+            selects.append(statement)
+
+    return selects
+
+
+def test_each_distinct_paragraph_is_translated_once(llm):
+    result = llm.translate_batch_to_chinese(['One.\n\nTwo.', 'Two.\n\n  Three.  '])
+    assert result == ['zh:One.\n\nzh:Two.', 'zh:Two.\n\n  zh:Three.  ']
+
+    # Short paragraphs go out as one packed request
+    assert llm._async_client.prompts == ['["One.", "Two.", "Three."]']
+
+
+def test_cached_paragraphs_are_found_in_one_query(llm):
+    llm.translate_batch_to_chinese(['Cached one.\n\nCached two.'])
+    llm.cache.clear()
+    llm._async_client.prompts.clear()
+
+    selects = count_cache_selects(db.engine)
+    result = llm.translate_batch_to_chinese(['Cached one.\n\nNew.', 'Cached two.'])
+
+    assert result == ['zh:Cached one.\n\nzh:New.', 'zh:Cached two.']
+    assert len(selects) == 1
+    assert llm._async_client.prompts == ['New.']
+
+
+def test_get_many_checks_memory_before_the_database(llm):
+    cache = llm.cache
+    cache.set('in-memory', 'a')
+    cache.set('in-database', 'b')
+    cache._entries.pop('in-database')
+
+    assert cache.get_many(['in-memory', 'in-database', 'absent']) == {'in-memory': 'a', 'in-database': 'b'}
+    stats = cache.stats()
+    assert (stats['memory_hits'], stats['database_hits'], stats['misses']) == (1, 1, 1)
+    # Loaded entries are kept in memory
+    assert 'in-database' in cache._entries
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the /api/notes/changes delta sync feed (src/utils/changes.py)
+
+A client that follows next_cursor must see every committed write exactly
+once, including writes whose updated_at is older than its last sync.
+Run with pytest.
+"""
+from datetime import datetime
+
+import pytest
+
+from src.models.note import Note, db
+
+
+def sync(client, since=None, limit=None):
+    """Follow next_cursor until has_more is false; returns (changes, cursor)"""
+    changes = []
+    while True:
+        args = {key: value for key, value in (('since', since), ('limit', limit)) if value}
+        response = client.get('/api/notes/changes', query_string=args)
+        assert response.status_code == 200
+        page = response.get_json()
+        changes.extend(page['changes'])
+        since = page['next_cursor']
+        if not page['has_more']:
+            return changes, since
+
+
+def test_initial_sync_lists_notes_in_write_order(client, create_note):
+    notes = [create_note(f'note {i}') for i in range(5)]
+    client.put(f"/api/notes/{notes[1]['id']}", json={'title': 'edited'})
+
+    changes, _cursor = sync(client, limit=2)
+    assert [change['note']['id'] for change in changes] == [notes[i]['id'] for i in (0, 2, 3, 4, 1)]
+    assert changes[-1]['note']['title'] == 'edited'
+
+
+def test_delta_reports_upserts_and_deletes_since_the_cursor(client, create_note):
+    kept = create_note('kept')
+    removed = create_note('removed')
+    _changes, cursor = sync(client)
+
+    client.put(f"/api/notes/{kept['id']}", json={'content': 'new'})
+    assert client.delete(f"/api/notes/{removed['id']}").status_code == 204
+    changes, cursor = sync(client, since=cursor)
+
+    assert [change['type'] for change in changes] == ['upsert', 'delete']
+    assert changes[0]['note']['content'] == 'new'
+    assert changes[1]['id'] == removed['id'] and changes[1]['deleted_at']
+
+    # Nothing new since the last cursor
+    assert sync(client, since=cursor) == ([], cursor)
+
+
+def test_a_late_commit_with_an_old_timestamp_is_not_skipped(client, create_note):
+    late = create_note('late')
+    create_note('other')
+    _changes, cursor = sync(client)
+
+    # Stamped before the last sync, committed after it
+    notes = Note.__table__
+    db.session.execute(notes.update().where(notes.c.id == late['id']).values(
+        title='late edit', updated_at=datetime(2000, 1, 1)
+    ))
+    db.session.commit()
+
+    changes, _cursor = sync(client, since=cursor)
+    assert [change['note']['title'] for change in changes] == ['late edit']
+
+
+def test_batch_writes_page_without_gaps(client, create_note):
+    notes = [create_note(f'note {i}') for i in range(3)]
+    _changes, cursor = sync(client)
+
+    client.post('/api/notes/batch', json={'operations': [
+        {'op': 'update', 'id': notes[0]['id'], 'title': 'a'},
+        {'op': 'delete', 'id': notes[1]['id']},
+        {'op': 'create', 'title': 'b', 'content': 'c'},
+        {'op': 'delete', 'id': notes[2]['id']},
+    ]})
+    changes, _cursor = sync(client, since=cursor, limit=1)
+
+    upserts = sorted(change['note']['title'] for change in changes if change['type'] == 'upsert')
+    deletes = sorted(change['id'] for change in changes if change['type'] == 'delete')
+    assert upserts == ['a', 'b']
+    assert deletes == [notes[1]['id'], notes[2]['id']]
+
+
+@pytest.mark.parametrize('args', [{'since': 'not-a-cursor'}, {'limit': '0'}])
+def test_invalid_arguments_are_rejected(client, args):
+    assert client.get('/api/notes/changes', query_string=args).status_code == 400
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for response compression (src/utils/compression.py)
+
+Covers negotiation, per-coding ETags and 304s, streamed responses and
+precompressed static files. Run with pytest.
+"""
+import gzip
+import zlib
+
+import pytest
+
+from src.utils.compression import MIN_SIZE, init_compression
+
+STYLESHEET = 'body { color: black; }\n' * 100
+
+
+@pytest.fixture
+def compressed_client(app, tmp_path):
+    (tmp_path / 'style.css').write_text(STYLESHEET)
+    app.static_folder = str(tmp_path)
+    init_compression(app, str(tmp_path))
+    return app.test_client()
+
+
+@pytest.fixture
+def long_list(create_note):
+    for i in range(5):
+        create_note(f'note {i}', 'words ' * MIN_SIZE)
+
+
+def test_large_responses_use_the_best_accepted_coding(compressed_client, long_list):
+    plain = compressed_client.get('/api/notes')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+
+    gzipped = compressed_client.get('/api/notes', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(gzipped.data) == plain.data
+
+    brotli = pytest.importorskip('brotli')
+    brotlied = compressed_client.get('/api/notes', headers={'Accept-Encoding': 'gzip, br'})
+    assert brotlied.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(brotlied.data) == plain.data
+
+
+def test_each_coding_has_its_own_etag_and_gets_a_304(compressed_client, long_list):
+    plain_etag = compressed_client.get('/api/notes').headers['ETag']
+    gzipped = compressed_client.get('/api/notes', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['ETag'] == plain_etag[:-1] + '-gzip"'
+
+    response = compressed_client.get('/api/notes', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.headers['ETag']
+    })
+    assert response.status_code == 304 and response.data == b''
+    assert response.headers['ETag'] == gzipped.headers['ETag']
+
+
+def test_small_responses_are_left_alone(compressed_client, create_note):
+    note = create_note('short')
+    response = compressed_client.get(f"/api/notes/{note['id']}", headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_streamed_export_is_compressed_chunk_by_chunk(compressed_client, long_list):
+    plain = compressed_client.get('/api/notes/export').data
+    response = compressed_client.get('/api/notes/export', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip' and 'Content-Length' not in response.headers
+    decompressor = zlib.decompressobj(31)
+    assert decompressor.decompress(response.data) + decompressor.flush() == plain
+
+
+def test_static_files_are_served_precompressed(compressed_client):
+    brotli = pytest.importorskip('brotli')
+    response = compressed_client.get('/static/style.css', headers={'Accept-Encoding': 'br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data).decode() == STYLESHEET
+
+    cached = compressed_client.get('/static/style.css', headers={
+        'Accept-Encoding': 'br', 'If-None-Match': response.headers['ETag']
+    })
+    assert cached.status_code == 304
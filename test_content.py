@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for compressed, deferred note content (src/utils/content.py)
+
+Run with pytest.
+"""
+from sqlalchemy import event, text
+
+from src.models.note import Note, db
+from src.utils.content import compress_content, decompress_content
+
+LONG_TEXT = 'The quick brown fox jumps over the lazy dog. ' * 100
+
+
+def stored_type(note_id):
+    return db.session.execute(text('SELECT typeof(content) FROM note WHERE id = :id'), {'id': note_id}).scalar()
+
+
+def test_only_large_compressible_content_is_compressed():
+    assert compress_content('short') == 'short'
+    compressed = compress_content(LONG_TEXT)
+    assert isinstance(compressed, bytes) and len(compressed) < len(LONG_TEXT)
+    assert decompress_content(compressed) == LONG_TEXT
+    assert decompress_content('plain') == 'plain'
+
+
+def test_large_content_is_stored_compressed_and_read_back_as_text(client, create_note):
+    short = create_note('Short', 'a few words')
+    long = create_note('Long', LONG_TEXT)
+
+    assert stored_type(short['id']) == 'text'
+    assert stored_type(long['id']) == 'blob'
+    assert client.get(f"/api/notes/{long['id']}").get_json()['content'] == LONG_TEXT
+    assert client.get('/api/notes').get_json()['notes'][0]['content'] == LONG_TEXT
+
+
+def test_search_sees_through_compression(client, create_note):
+    create_note('Long', LONG_TEXT + ' platypus')
+    found = client.get('/api/notes/search', query_string={'q': 'platypus'}).get_json()
+    assert [note['title'] for note in found] == ['Long']
+
+
+def test_updates_switch_between_text_and_blob(client, create_note):
+    note = create_note('Note', 'short')
+    client.put(f"/api/notes/{note['id']}", json={'content': LONG_TEXT})
+    assert stored_type(note['id']) == 'blob'
+    client.put(f"/api/notes/{note['id']}", json={'content': 'short again'})
+    assert stored_type(note['id']) == 'text'
+
+
+def test_content_is_not_loaded_unless_used(client, create_note):
+    create_note('Long', LONG_TEXT)
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    titles = [note.title for note in Note.query.all()]
+    summary = client.get('/api/notes', query_string={'fields': 'summary'}).get_json()['notes']
+
+    assert titles == ['Long'] and 'content' not in summary[0]
+    assert not any('note.content AS' in statement for statement in statements)
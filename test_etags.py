@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for list and note ETags (src/utils/versioning.py)
+
+The list ETag must change with every committed write, including one whose
+updated_at is older than other notes', and a matching If-None-Match must
+get an empty 304. Run with pytest.
+"""
+from datetime import datetime
+
+from src.models.note import Note, NoteTombstone, db
+from src.utils.versioning import collection_version
+
+
+def list_etag(client):
+    response = client.get('/api/notes')
+    assert response.status_code == 200
+    return response.headers['ETag']
+
+
+def test_matching_if_none_match_is_304(client, create_note):
+    note = create_note('title')
+    etag = list_etag(client)
+    response = client.get('/api/notes', headers={'If-None-Match': etag})
+    assert response.status_code == 304 and response.data == b''
+
+    note_etag = client.get(f"/api/notes/{note['id']}").headers['ETag']
+    assert client.get(f"/api/notes/{note['id']}", headers={'If-None-Match': note_etag}).status_code == 304
+
+
+def test_every_write_changes_the_list_etag(client, create_note):
+    seen = [list_etag(client)]
+    note = create_note('first')
+    seen.append(list_etag(client))
+    client.put(f"/api/notes/{note['id']}", json={'title': 'renamed'})
+    seen.append(list_etag(client))
+    client.post('/api/notes/batch', json={'operations': [{'op': 'create', 'title': 'b', 'content': 'c'}]})
+    seen.append(list_etag(client))
+    client.delete(f"/api/notes/{note['id']}")
+    seen.append(list_etag(client))
+
+    assert len(set(seen)) == len(seen)
+    assert client.get('/api/notes', headers={'If-None-Match': seen[0]}).status_code == 200
+
+
+def test_a_write_stamped_earlier_still_changes_the_version(client, create_note):
+    create_note('newer')
+    older = create_note('older')
+    before = collection_version(db.session)
+
+    # As if the write had taken its timestamp before the other note's and committed after it
+    notes = Note.__table__
+    db.session.execute(notes.update().where(notes.c.id == older['id']).values(
+        title='late commit', updated_at=datetime(2000, 1, 1)
+    ))
+    db.session.commit()
+
+    assert collection_version(db.session) > before
+    seqs = dict(db.session.execute(db.select(notes.c.id, notes.c.change_seq)).all())
+    assert seqs[older['id']] == max(seqs.values())
+
+
+def test_deletes_are_stamped_after_earlier_writes(client, create_note):
+    note = create_note('doomed')
+    client.delete(f"/api/notes/{note['id']}")
+    tombstone = NoteTombstone.query.one()
+    assert tombstone.change_seq == collection_version(db.session) > 0
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming NDJSON export (src/utils/export.py)
+
+Run with pytest.
+"""
+import gzip
+import json
+
+from src.utils import export
+
+
+def exported(response):
+    return [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+
+
+def test_export_lists_every_note_in_id_order(client, create_note):
+    notes = [create_note(f'note {i}', f'content {i} ✓') for i in range(3)]
+    response = client.get('/api/notes/export')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'notes.ndjson' in response.headers['Content-Disposition']
+    records = exported(response)
+    assert [record['id'] for record in records] == [note['id'] for note in notes]
+    assert set(records[0]) == set(export.EXPORT_FIELDS)
+    assert records[2]['content'] == 'content 2 ✓'
+    assert records[0]['created_at'] == notes[0]['created_at']
+
+
+def test_gzip_export_holds_the_same_lines(client, create_note):
+    for i in range(3):
+        create_note(f'note {i}')
+    plain = client.get('/api/notes/export').data
+    response = client.get('/api/notes/export', query_string={'gzip': '1'})
+
+    assert response.mimetype == 'application/gzip'
+    assert gzip.decompress(response.data) == plain
+
+
+def test_export_is_written_in_chunks(client, create_note, monkeypatch):
+    monkeypatch.setattr(export, 'CHUNK_SIZE', 1)
+    for i in range(3):
+        create_note(f'note {i}')
+
+    response = client.get('/api/notes/export')
+    assert response.is_streamed
+    chunks = list(response.response)
+    assert len(chunks) == 3 and all(chunk.endswith(b'\n') for chunk in chunks)
+
+
+def test_empty_export(client):
+    assert client.get('/api/notes/export').data == b''
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for typo-tolerant search (src/utils/fuzzy.py)
+
+Covers ranking with misspelled queries and keeping the in-process trigram
+index current with notes another process wrote or deleted, which this
+process only sees through the database. Run with pytest.
+"""
+from datetime import datetime
+
+import pytest
+
+from src.models.note import Note, NoteTombstone, db
+from src.utils import fuzzy
+
+
+def fuzzy_titles(client, query, **args):
+    response = client.get('/api/notes/search', query_string={'q': query, 'fuzzy': '1', **args})
+    assert response.status_code == 200
+    return [note['title'] for note in response.get_json()]
+
+
+def write_elsewhere(title, content=''):
+    """Insert a note without publishing note_events, as another process would"""
+    now = datetime.utcnow()
+    result = db.session.execute(Note.__table__.insert().values(
+        title=title, content=content, created_at=now, updated_at=now
+    ))
+    db.session.commit()
+    return result.inserted_primary_key[0]
+
+
+def delete_elsewhere(note_id, tombstone=True):
+    db.session.execute(Note.__table__.delete().where(Note.id == note_id))
+    if tombstone:
+        db.session.execute(NoteTombstone.__table__.insert().values(note_id=note_id, deleted_at=datetime.utcnow()))
+    db.session.commit()
+
+
+@pytest.fixture
+def no_refresh_delay(monkeypatch):
+    monkeypatch.setattr(fuzzy, 'REFRESH_INTERVAL', 0.0)
+
+
+def test_misspelled_query_matches_title_before_content(client, create_note):
+    create_note('Grocery list', 'milk and eggs')
+    create_note('Weekend', 'grocery run on saturday')
+    create_note('Unrelated', 'nothing here')
+
+    assert fuzzy_titles(client, 'grocrey') == ['Grocery list', 'Weekend']
+
+
+def test_own_writes_show_up_immediately(client, create_note):
+    assert fuzzy_titles(client, 'pineapple') == []
+    note = create_note('Pineapple cake')
+    assert fuzzy_titles(client, 'pinapple') == ['Pineapple cake']
+
+    client.delete(f"/api/notes/{note['id']}")
+    assert fuzzy_titles(client, 'pinapple') == []
+
+
+def test_other_processes_writes_and_deletes_are_picked_up(client, no_refresh_delay):
+    assert fuzzy_titles(client, 'remote') == []
+    note_id = write_elsewhere('Remote note')
+    assert fuzzy_titles(client, 'remot') == ['Remote note']
+
+    delete_elsewhere(note_id)
+    fuzzy_titles(client, 'remot')
+    assert note_id not in fuzzy.trigram_index._note_words
+
+
+def test_other_processes_writes_wait_for_the_refresh_interval(client, create_note):
+    create_note('Local')
+    assert fuzzy_titles(client, 'locl') == ['Local']
+    write_elsewhere('Local elsewhere')
+    assert fuzzy_titles(client, 'locl') == ['Local']
+
+
+def test_notes_deleted_before_the_refresh_do_not_shrink_results(client, create_note):
+    notes = [create_note(f'Meeting {i}') for i in range(4)]
+    assert len(fuzzy_titles(client, 'meting', limit=3)) == 3
+
+    # Deleted elsewhere; this process has not seen the tombstones yet
+    delete_elsewhere(notes[0]['id'])
+    delete_elsewhere(notes[1]['id'])
+    titles = fuzzy_titles(client, 'meting', limit=2)
+    assert sorted(titles) == ['Meeting 2', 'Meeting 3']
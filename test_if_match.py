@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for If-Match preconditions on PUT and DELETE (src/utils/writes.py)
+
+Run with pytest.
+"""
+
+
+def etag_of(client, note_id):
+    return client.get(f'/api/notes/{note_id}').headers['ETag']
+
+
+def test_put_with_current_etag_succeeds(client, create_note):
+    note = create_note('title')
+    etag = etag_of(client, note['id'])
+
+    response = client.put(f"/api/notes/{note['id']}", json={'title': 'new'}, headers={'If-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['title'] == 'new'
+    assert response.headers['ETag'] != etag
+
+
+def test_put_with_stale_etag_is_412(client, create_note):
+    note = create_note('title')
+    stale = etag_of(client, note['id'])
+    client.put(f"/api/notes/{note['id']}", json={'title': 'someone else'})
+
+    response = client.put(f"/api/notes/{note['id']}", json={'title': 'mine'}, headers={'If-Match': stale})
+    assert response.status_code == 412
+    assert client.get(f"/api/notes/{note['id']}").get_json()['title'] == 'someone else'
+
+
+def test_if_match_accepts_the_compressed_etag(client, create_note):
+    note = create_note('title')
+    compressed = etag_of(client, note['id'])[:-1] + '-gzip"'
+
+    response = client.put(f"/api/notes/{note['id']}", json={'title': 'new'}, headers={'If-Match': compressed})
+    assert response.status_code == 200
+
+
+def test_if_match_for_another_note_is_412(client, create_note):
+    first = create_note('first')
+    second = create_note('second')
+    etag = etag_of(client, first['id'])
+
+    assert client.put(f"/api/notes/{second['id']}", json={'title': 'x'}, headers={'If-Match': etag}).status_code == 412
+
+
+def test_delete_with_stale_etag_is_412(client, create_note):
+    note = create_note('title')
+    stale = etag_of(client, note['id'])
+    client.put(f"/api/notes/{note['id']}", json={'content': 'changed'})
+
+    assert client.delete(f"/api/notes/{note['id']}", headers={'If-Match': stale}).status_code == 412
+    assert client.get(f"/api/notes/{note['id']}").status_code == 200
+
+    current = etag_of(client, note['id'])
+    assert client.delete(f"/api/notes/{note['id']}", headers={'If-Match': current}).status_code == 204
+
+
+def test_if_match_on_missing_note_is_404(client):
+    assert client.put('/api/notes/999', json={'title': 'x'}, headers={'If-Match': '"note-999-1"'}).status_code == 404
+    assert client.delete('/api/notes/999', headers={'If-Match': '"note-999-1"'}).status_code == 404
+
+
+def test_unconditional_writes_still_work(client, create_note):
+    note = create_note('title')
+    # Nothing to change answers like a read
+    assert client.put(f"/api/notes/{note['id']}", json={'tags': []}).get_json()['title'] == 'title'
+    assert client.put(f"/api/notes/{note['id']}", json={}).status_code == 400
+    assert client.delete(f"/api/notes/{note['id']}").status_code == 204
+    assert client.delete(f"/api/notes/{note['id']}").status_code == 404
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk import pipeline (src/utils/importer.py)
+
+Covers round-tripping an export, gzipped NDJSON, zips of Markdown, skipped
+records and per-batch progress. Run with pytest.
+"""
+import gzip
+import io
+import json
+import zipfile
+
+from src.models.note import Note, db
+from src.utils.importer import import_notes
+
+
+def import_file(client, data):
+    response = client.post('/api/notes/import', data={'file': (io.BytesIO(data), 'notes')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+
+
+def ndjson(*records):
+    return ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+
+
+def test_export_round_trips_through_import(client, create_note):
+    for i in range(3):
+        create_note(f'note {i}', f'body {i} 😀')
+    original = client.get('/api/notes/export').data
+    for note in client.get('/api/notes').get_json()['notes']:
+        client.delete(f"/api/notes/{note['id']}")
+
+    progress = import_file(client, original)
+    assert progress[-1] == {'done': True, 'imported': 3, 'skipped': 0, 'errors': []}
+
+    def contents(export):
+        records = (json.loads(line) for line in export.splitlines())
+        return sorted((record['title'], record['content'], record['created_at']) for record in records)
+
+    assert contents(client.get('/api/notes/export').data) == contents(original)
+
+
+def test_imported_notes_are_searchable_and_listed(client):
+    import_file(client, gzip.compress(ndjson({'title': 'Imported penguins', 'content': 'from a gzip file'})))
+
+    found = client.get('/api/notes/search', query_string={'q': 'penguins'}).get_json()
+    assert [note['title'] for note in found] == ['Imported penguins']
+    suggested = client.get('/api/notes/suggest', query_string={'prefix': 'imp'}).get_json()
+    assert [item['title'] for item in suggested] == ['Imported penguins']
+    listed = client.get('/api/notes', query_string={'fields': 'summary'}).get_json()['notes'][0]
+    assert (listed['preview'], listed['word_count']) == ('from a gzip file', 4)
+
+
+def test_markdown_zip_uses_headings_as_titles(client):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as files:
+        files.writestr('notes/first.md', '# Heading title\n\nBody text')
+        files.writestr('notes/second.txt', 'No heading here')
+        files.writestr('notes/image.png', b'\x89PNG')
+        files.writestr('__MACOSX/notes/._first.md', 'metadata')
+
+    assert import_file(client, archive.getvalue())[-1]['imported'] == 2
+    notes = {note.title: note.content for note in Note.query.all()}
+    assert notes == {'Heading title': 'Body text', 'second': 'No heading here'}
+
+
+def test_invalid_records_are_skipped_and_reported(client):
+    data = ndjson({'title': 'good', 'content': 'x'}, {'title': 'no content'}, [1, 2]) + b'{not json\n\n'
+    result = import_file(client, data)[-1]
+
+    assert (result['imported'], result['skipped']) == (1, 3)
+    assert [error['source'] for error in result['errors']] == ['line 2', 'line 3', 'line 4']
+
+
+def test_progress_is_reported_per_batch(app):
+    data = ndjson(*({'title': f'note {i}', 'content': ''} for i in range(5)))
+    progress = list(import_notes(db.engine, Note, io.BytesIO(data), batch_size=2))
+
+    assert [update['imported'] for update in progress] == [2, 4, 5]
+    assert progress[-1]['done'] and Note.query.count() == 5
+
+
+def test_empty_upload_is_rejected(client):
+    assert client.post('/api/notes/import', data=b'').status_code == 400
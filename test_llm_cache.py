@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the two-tier LLM result cache (src/utils/llm_cache.py)
+
+Run with pytest.
+"""
+from datetime import datetime, timedelta
+
+from src.models.note import db
+from src.utils.llm_cache import LLMCache, llm_cache_key, llm_cache_table
+
+
+def test_keys_cover_every_part():
+    key = llm_cache_key('model', 'template', 0.3, {'text': 'hello'})
+    assert key == llm_cache_key('model', 'template', 0.3, {'text': 'hello'})
+    assert key != llm_cache_key('model', 'template', 0.7, {'text': 'hello'})
+    assert key != llm_cache_key('other model', 'template', 0.3, {'text': 'hello'})
+    assert len(key) == 64
+
+
+def test_without_a_database_only_memory_is_used():
+    cache = LLMCache(max_entries=2)
+    for key in 'abc':
+        cache.set(key, key.upper())
+    assert (cache.get('a'), cache.get('c')) == (None, 'C')
+
+
+def test_memory_entries_expire():
+    cache = LLMCache(ttl=0)
+    cache.set('key', 'value')
+    assert cache.get('key') is None
+
+
+def test_results_are_shared_through_the_database(app):
+    writer, reader = LLMCache(), LLMCache()
+    writer.bind(db.engine)
+    reader.bind(db.engine)
+
+    writer.set('key', 'value')
+    assert reader.get('key') == 'value'
+    assert reader.stats()['database_hits'] == 1
+    # Now in the reader's memory too
+    assert reader.get('key') == 'value'
+    assert reader.stats()['memory_hits'] == 1
+
+
+def test_expired_rows_are_ignored_and_pruned(app):
+    cache = LLMCache()
+    cache.bind(db.engine)
+    cache.set('fresh', 'value')
+    with db.engine.begin() as conn:
+        conn.execute(llm_cache_table.insert().values(
+            key='stale', value='old', created_at=datetime.utcnow() - timedelta(seconds=cache.ttl + 60)
+        ))
+
+    assert cache.get('stale') is None
+    assert cache.prune() == 1
+    with db.engine.connect() as conn:
+        assert conn.execute(llm_cache_table.select()).all()[0].key == 'fresh'
+
+
+def test_repeated_prompts_do_not_reach_the_model(llm):
+    assert llm.translate_to_chinese('Hello') == 'zh:Hello'
+    llm.cache.clear()
+    assert llm.translate_to_chinese('Hello') == 'zh:Hello'
+    assert llm.translate_to_chinese('Hello again') == 'zh:Hello again'
+    assert llm._async_client.prompts == ['Hello', 'Hello again']
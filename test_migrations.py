@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the schema migrations (src/utils/migrations.py) on SQLite
+
+Covers a fresh database, a database created by the first release before
+migrations existed, and re-running at startup. Run with pytest.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+
+from src.utils.migrations import LATEST_VERSION, MIGRATIONS, migrate, schema_version
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'notes.db'}")
+    yield engine
+    engine.dispose()
+
+
+def index_names(engine, table):
+    return {index['name'] for index in inspect(engine).get_indexes(table)}
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_versions_are_consecutive():
+    assert [migration.version for migration in MIGRATIONS] == list(range(1, LATEST_VERSION + 1))
+
+
+def test_fresh_database_gets_every_migration(engine):
+    assert migrate(engine) == list(range(1, LATEST_VERSION + 1))
+    assert schema_version(engine) == LATEST_VERSION
+
+    tables = set(inspect(engine).get_table_names())
+    assert {'note', 'note_tombstone', 'user', 'llm_cache', 'note_fts', 'collection_version'} <= tables
+    assert {'ix_note_updated_at_id', 'ix_note_change_seq'} <= index_names(engine, 'note')
+    assert {'preview', 'version', 'change_seq'} <= {column['name'] for column in inspect(engine).get_columns('note')}
+
+
+def test_current_schema_costs_one_query_at_startup(engine):
+    migrate(engine)
+    statements = count_statements(engine)
+    assert migrate(engine) == []
+    assert len(statements) == 1
+
+
+def test_first_release_database_is_upgraded_in_place(engine):
+    # The schema and data as create_all left them before migrations existed
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE note (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, "
+            "content TEXT NOT NULL, created_at DATETIME, updated_at DATETIME)"
+        ))
+        conn.execute(text("CREATE INDEX idx_note_title ON note (title)"))
+        conn.execute(text(
+            "INSERT INTO note (title, content, created_at, updated_at) "
+            "VALUES ('Old note', 'written by the first release', :stamp, :stamp)"
+        ), {'stamp': datetime(2020, 1, 1)})
+
+    assert migrate(engine) == list(range(1, LATEST_VERSION + 1))
+
+    assert 'idx_note_title' not in index_names(engine, 'note')
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT version, word_count, updated_at FROM note")).one()
+        assert (row.version, row.word_count) == (1, 5)
+        assert row.updated_at.startswith('2020-01-01')
+        # Existing notes are indexed for search
+        assert conn.execute(text("SELECT rowid FROM note_fts WHERE note_fts MATCH 'release'")).scalars().all() == [1]
+
+
+def test_only_pending_migrations_run(engine):
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM schema_migrations WHERE version > 7"))
+        conn.execute(text("DROP TRIGGER note_change_seq_insert"))
+        conn.execute(text("DROP TRIGGER note_change_seq_update"))
+        conn.execute(text("DROP TRIGGER note_tombstone_change_seq_insert"))
+        conn.execute(text("DROP TABLE collection_version"))
+        for index in ('ix_note_change_seq', 'ix_note_tombstone_change_seq'):
+            conn.execute(text(f"DROP INDEX {index}"))
+        conn.execute(text("ALTER TABLE note DROP COLUMN change_seq"))
+        conn.execute(text("ALTER TABLE note_tombstone DROP COLUMN change_seq"))
+
+    assert migrate(engine) == [8, 9]
+    assert schema_version(engine) == LATEST_VERSION
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for keyset pagination and time-window filters on GET /api/notes
+
+Run with pytest.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.note import Note, db
+
+BASE_TIME = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def set_updated_at(note_id, updated_at):
+    notes = Note.__table__
+    db.session.execute(notes.update().where(notes.c.id == note_id).values(updated_at=updated_at))
+    db.session.commit()
+
+
+def list_all(client, limit, **args):
+    """Every page of GET /api/notes, following next_cursor"""
+    ids = []
+    cursor = None
+    while True:
+        params = dict(args, limit=limit, **({'cursor': cursor} if cursor else {}))
+        page = client.get('/api/notes', query_string=params).get_json()
+        ids.extend(note['id'] for note in page['notes'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids
+
+
+def test_pages_cover_every_note_once_in_order(client, create_note):
+    notes = [create_note(f'note {i}') for i in range(7)]
+    # Three notes share a timestamp, so the id has to break the tie
+    offsets = [5, 3, 3, 3, 1, 4, 2]
+    for offset, note in zip(offsets, notes):
+        set_updated_at(note['id'], BASE_TIME + timedelta(minutes=offset))
+
+    expected = [note['id'] for offset, note in sorted(
+        zip(offsets, notes), key=lambda pair: (pair[0], pair[1]['id']), reverse=True
+    )]
+    for limit in (1, 2, 3, 7, 50):
+        assert list_all(client, limit=limit) == expected
+
+
+def test_cursor_is_stable_across_newer_writes(client, create_note):
+    notes = [create_note(f'note {i}') for i in range(4)]
+    for offset, note in enumerate(notes):
+        set_updated_at(note['id'], BASE_TIME + timedelta(minutes=offset))
+
+    first = client.get('/api/notes', query_string={'limit': 2}).get_json()
+    assert [note['id'] for note in first['notes']] == [notes[3]['id'], notes[2]['id']]
+
+    # A note written after the first page must not shift the second one
+    create_note('newer')
+    second = client.get('/api/notes', query_string={'limit': 2, 'cursor': first['next_cursor']}).get_json()
+    assert [note['id'] for note in second['notes']] == [notes[1]['id'], notes[0]['id']]
+    assert second['next_cursor'] is None
+
+
+def test_time_window_filters(client, create_note):
+    notes = [create_note(f'note {i}') for i in range(3)]
+    for offset, note in enumerate(notes):
+        set_updated_at(note['id'], BASE_TIME + timedelta(hours=offset))
+
+    ids = list_all(client, limit=10, updated_after='2024-01-01T12:30:00Z', updated_before='2024-01-01T14:00:00')
+    assert ids == [notes[1]['id']]
+
+
+@pytest.mark.parametrize('args', [{'cursor': 'not-a-cursor'}, {'limit': 'ten'}, {'updated_after': 'yesterday'}])
+def test_invalid_pagination_arguments_are_rejected(client, args):
+    assert client.get('/api/notes', query_string=args).status_code == 400
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the list and search response cache (src/utils/response_cache.py)
+
+Run with pytest.
+"""
+import pytest
+
+from src.utils.response_cache import MemoryBackend, ResponseCache, SQLiteBackend, backend_from_url, response_cache
+
+
+def test_repeat_requests_are_served_from_the_cache(client, create_note):
+    create_note('Cached', 'penguins')
+    hits = response_cache.hits
+    first = client.get('/api/notes/search', query_string={'q': 'penguins'}).data
+    assert client.get('/api/notes/search', query_string={'q': 'penguins'}).data == first
+    client.get('/api/notes')
+    client.get('/api/notes')
+    assert response_cache.hits - hits == 2
+
+
+@pytest.mark.parametrize('write', ['create', 'update', 'delete'])
+def test_every_write_invalidates_lists_and_searches(client, create_note, write):
+    note = create_note('Penguins', 'penguins')
+    client.get('/api/notes')
+    client.get('/api/notes/search', query_string={'q': 'penguins'})
+
+    if write == 'create':
+        create_note('More penguins', 'penguins')
+    elif write == 'update':
+        client.put(f"/api/notes/{note['id']}", json={'title': 'Renamed'})
+    else:
+        client.delete(f"/api/notes/{note['id']}")
+
+    titles = [note['title'] for note in client.get('/api/notes').get_json()['notes']]
+    found = [note['title'] for note in client.get('/api/notes/search', query_string={'q': 'penguins'}).get_json()]
+    assert sorted(titles) == sorted(found)
+    assert titles == {'create': ['More penguins', 'Penguins'], 'update': ['Renamed'], 'delete': []}[write]
+
+
+def test_request_arguments_are_part_of_the_key(client, create_note):
+    for i in range(3):
+        create_note(f'note {i}')
+    assert len(client.get('/api/notes', query_string={'limit': 1}).get_json()['notes']) == 1
+    assert len(client.get('/api/notes', query_string={'limit': 2}).get_json()['notes']) == 2
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_bytes=10)
+    backend.set('a', b'12345')
+    backend.set('b', b'12345')
+    backend.get('a')
+    backend.set('c', b'12345')
+    assert (backend.get('a'), backend.get('b'), backend.get('c')) == (b'12345', None, b'12345')
+
+
+def test_sqlite_backend_is_shared_and_bounded(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    first, second = SQLiteBackend(path, max_bytes=10), SQLiteBackend(path, max_bytes=10)
+    first.set('a', b'12345')
+    assert second.get('a') == b'12345'
+    second.set('b', b'12345')
+    second.set('c', b'12345')
+    assert first.get('a') is None and first.get('c') == b'12345'
+
+
+def test_backend_selection():
+    assert isinstance(backend_from_url(None), MemoryBackend)
+    assert backend_from_url('none') is None
+    assert ResponseCache(None).get('key') is None
+    with pytest.raises(ValueError):
+        backend_from_url('redis://localhost')
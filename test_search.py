@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for full-text note search (src/utils/search.py) on SQLite FTS5
+
+Covers ranking, AND-ed terms and quoted phrases, stemming, and keeping the
+index in step with note writes. Run with pytest.
+"""
+from src.utils.search import parse_terms
+
+
+def search_titles(client, query, **args):
+    response = client.get('/api/notes/search', query_string={'q': query, **args})
+    assert response.status_code == 200
+    return [note['title'] for note in response.get_json()]
+
+
+def test_parse_terms_keeps_quoted_phrases_together():
+    assert parse_terms('  alpha "beta gamma"  delta " " ') == ['alpha', 'beta gamma', 'delta']
+
+
+def test_title_matches_rank_above_content_matches(client, create_note):
+    create_note('Shopping', 'remember the garden hose')
+    create_note('Garden plans', 'tomatoes and beans')
+    create_note('Unrelated', 'nothing to see')
+
+    assert search_titles(client, 'garden') == ['Garden plans', 'Shopping']
+
+
+def test_every_term_must_match_and_phrases_keep_their_order(client, create_note):
+    create_note('One', 'red apples and green pears')
+    create_note('Two', 'green apples')
+
+    assert sorted(search_titles(client, 'apples green')) == ['One', 'Two']
+    assert search_titles(client, 'apples pears') == ['One']
+    assert search_titles(client, '"green apples"') == ['Two']
+
+
+def test_words_match_by_stem(client, create_note):
+    create_note('Morning', 'went running by the river')
+    assert search_titles(client, 'runs') == ['Morning']
+
+
+def test_index_follows_updates_and_deletes(client, create_note):
+    note = create_note('Draft', 'about penguins')
+    assert search_titles(client, 'penguins') == ['Draft']
+
+    client.put(f"/api/notes/{note['id']}", json={'content': 'about walruses'})
+    assert search_titles(client, 'penguins') == []
+    assert search_titles(client, 'walruses') == ['Draft']
+
+    client.delete(f"/api/notes/{note['id']}")
+    assert search_titles(client, 'walruses') == []
+
+
+def test_limit_and_blank_queries(client, create_note):
+    for i in range(3):
+        create_note(f'Note {i}', 'common word')
+    assert len(search_titles(client, 'common', limit=2)) == 2
+    assert search_titles(client, '" "') == []
+    assert client.get('/api/notes/search').get_json() == []
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for paragraph-level translation in src/utils/segments.py
+
+A fake translator upper-cases each paragraph and records what it was
+asked, so the tests check layout, fenced code and repeated paragraphs
+without calling a model; LLMClient.stream_document_to_chinese runs against
+the fake model from conftest.py. Run with pytest.
+"""
+import asyncio
+
+import pytest
+
+from src.utils.segments import paragraphs, split_segments, stream_segments, translate_segments
+
+TEXT = (
+    "\n  First paragraph\nstill first.  \n\n\n"
+    "```\ncode\n\nmore code\n```\n\n"
+    "Repeated\n\n"
+    "Repeated\n"
+)
+EXPECTED = (
+    "\n  FIRST PARAGRAPH\nSTILL FIRST.  \n\n\n"
+    "```\nCODE\n\nMORE CODE\n```\n\n"
+    "REPEATED\n\n"
+    "REPEATED\n"
+)
+
+
+class FakeTranslator:
+    def __init__(self):
+        self.calls = []
+
+    def translate(self, text):
+        self.calls.append(text)
+        return text.upper()
+
+
+def test_split_joins_back_to_the_text():
+    assert ''.join(piece for piece, _is_paragraph in split_segments(TEXT)) == TEXT
+
+
+def test_fenced_blocks_are_not_split_at_blank_lines():
+    assert "```\ncode\n\nmore code\n```" in paragraphs(TEXT)
+
+
+def test_paragraphs_are_stripped_and_distinct():
+    assert paragraphs(TEXT) == ['First paragraph\nstill first.', "```\ncode\n\nmore code\n```", 'Repeated']
+
+
+def test_translation_keeps_the_whitespace_around_paragraphs():
+    translator = FakeTranslator()
+    assert translate_segments(TEXT, translator.translate) == EXPECTED
+
+
+def test_repeated_paragraphs_are_translated_once():
+    translator = FakeTranslator()
+    translate_segments(TEXT, translator.translate)
+    assert translator.calls == paragraphs(TEXT)
+
+
+def test_streaming_yields_the_same_text():
+    def stream_translate(text):
+        # Pieces that only make sense once joined
+        upper = text.upper()
+        yield upper[:3]
+        yield upper[3:]
+
+    assert ''.join(stream_segments(TEXT, stream_translate)) == EXPECTED
+
+
+def test_streaming_translates_repeated_paragraphs_once():
+    calls = []
+
+    def stream_translate(text):
+        calls.append(text)
+        yield text.upper()
+
+    list(stream_segments(TEXT, stream_translate))
+    assert calls == paragraphs(TEXT)
+
+
+def test_document_stream_translates_paragraphs_concurrently_in_order(llm, monkeypatch):
+    model = llm._async_client
+    create = model.create
+    in_flight = []
+    most_in_flight = 0
+
+    async def slow_first_paragraph(messages, **kwargs):
+        nonlocal most_in_flight
+        in_flight.append(messages)
+        most_in_flight = max(most_in_flight, len(in_flight))
+        # The first paragraph finishes last, but must still come out first
+        await asyncio.sleep(0.05 if 'First' in messages[-1]['content'] else 0.01)
+        in_flight.remove(messages)
+        return await create(messages, **kwargs)
+
+    monkeypatch.setattr(model.chat.completions, 'create', slow_first_paragraph)
+    llm.translate_to_chinese('Cached')
+    model.prompts.clear()
+
+    result = ''.join(llm.stream_document_to_chinese(' First.\n\nCached\n\nSecond.\n\nThird.\n'))
+
+    assert result == ' zh:First.\n\nzh:Cached\n\nzh:Second.\n\nzh:Third.\n'
+    assert sorted(model.prompts) == ['First.', 'Second.', 'Third.']
+    assert most_in_flight == 3
+
+
+def test_document_stream_raises_a_failed_paragraph_in_its_turn(llm, monkeypatch):
+    model = llm._async_client
+    create = model.create
+
+    async def fail_second(messages, **kwargs):
+        if 'Second' in messages[-1]['content']:
+            raise RuntimeError('model unavailable')
+        return await create(messages, **kwargs)
+
+    monkeypatch.setattr(model.chat.completions, 'create', fail_second)
+    pieces = []
+    with pytest.raises(RuntimeError, match='model unavailable'):
+        for piece in llm.stream_document_to_chinese('First.\n\nSecond.\n\nThird.'):
+            pieces.append(piece)
+    assert ''.join(pieces) == 'zh:First.\n\n'
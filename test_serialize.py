@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for the list serialization path (src/utils/serialize.py)
+
+Responses assembled from cached per-note fragments must match what
+Note.to_dict() would give, and must never serve a note's old JSON after
+it changes. Run with pytest.
+"""
+import json
+
+import pytest
+
+from src.utils import serialize
+from src.utils.serialize import FragmentCache, dumps, fragment_caches
+
+
+def listed(client, **args):
+    response = client.get('/api/notes', query_string=args)
+    assert response.status_code == 200
+    return response.get_json()['notes']
+
+
+def test_full_fields_match_the_single_note_response(client, create_note):
+    note = create_note('Title', 'Some content ✓ 😀')
+    assert listed(client) == [client.get(f"/api/notes/{note['id']}").get_json()]
+
+
+def test_summary_fields_leave_out_content(client, create_note):
+    create_note('Title', 'word ' * 100)
+    [summary] = listed(client, fields='summary')
+    assert 'content' not in summary
+    assert summary['word_count'] == 100 and summary['content_length'] == 500
+    assert client.get('/api/notes', query_string={'fields': 'everything'}).status_code == 400
+
+
+def test_fragments_are_reused_until_the_note_changes(client, create_note):
+    note = create_note('Title', 'first')
+    cache = fragment_caches['full']
+    misses, hits = cache.misses, cache.hits
+    listed(client)
+    listed(client, limit=5)
+    assert (cache.misses - misses, cache.hits - hits) == (1, 1)
+
+    client.put(f"/api/notes/{note['id']}", json={'content': 'second'})
+    assert listed(client)[0]['content'] == 'second'
+
+
+def test_cache_stays_under_its_byte_limit():
+    cache = FragmentCache(lambda row: b'x' * 10, max_bytes=25)
+    for note_id in range(5):
+        cache.encode(type('Row', (), {'id': note_id, 'updated_at': None}))
+    assert cache.size == 20 and list(cache._fragments) == [3, 4]
+
+
+@pytest.mark.parametrize('value', [{'title': 'ü 😀', 'n': 1, 'items': [None, True]}, []])
+def test_stdlib_fallback_encodes_the_same_json(monkeypatch, value):
+    fast = dumps(value)
+    monkeypatch.setattr(serialize, 'orjson', None)
+    assert json.loads(dumps(value)) == json.loads(fast) == value
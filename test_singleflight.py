@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for the request coalescing in src/utils/singleflight.py
+
+Concurrent callers with the same key must share one call and its result
+or exception; later callers start a new call. Run with pytest.
+"""
+import asyncio
+
+import pytest
+
+from src.utils.singleflight import BackgroundLoop, SingleFlight
+
+
+class Upstream:
+    """Counts calls and answers after a short delay, or fails"""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        number = self.calls
+        await asyncio.sleep(0.01)
+        if self.error:
+            raise self.error
+        return f'result {number}'
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    upstream = Upstream()
+
+    async def burst():
+        return await asyncio.gather(*(flight.do('key', upstream) for _ in range(5)))
+
+    assert asyncio.run(burst()) == ['result 1'] * 5
+    assert upstream.calls == 1
+    assert flight.stats() == {'calls': 1, 'shared': 4, 'in_flight': 0}
+
+
+def test_every_caller_gets_the_exception():
+    flight = SingleFlight()
+    upstream = Upstream(error=RuntimeError('rate limited'))
+
+    async def burst():
+        return await asyncio.gather(*(flight.do('key', upstream) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert upstream.calls == 1
+    assert all(isinstance(result, RuntimeError) and str(result) == 'rate limited' for result in results)
+
+
+def test_different_keys_and_later_calls_are_not_shared():
+    flight = SingleFlight()
+    upstream = Upstream()
+
+    async def run():
+        first = await asyncio.gather(flight.do('a', upstream), flight.do('b', upstream))
+        second = await flight.do('a', upstream)
+        return first, second
+
+    assert asyncio.run(run()) == (['result 1', 'result 2'], 'result 3')
+    assert upstream.calls == 3
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+    upstream = Upstream()
+
+    async def run():
+        quitter = asyncio.ensure_future(flight.do('key', upstream))
+        stayer = asyncio.ensure_future(flight.do('key', upstream))
+        await asyncio.sleep(0)
+        quitter.cancel()
+        return await stayer
+
+    assert asyncio.run(run()) == 'result 1'
+
+
+def test_relay_yields_items_then_raises():
+    loop = BackgroundLoop(name='test-loop')
+
+    async def produce(emit):
+        for piece in ('a', 'b'):
+            emit(piece)
+            await asyncio.sleep(0)
+        raise ValueError('stream broke')
+
+    received = []
+    with pytest.raises(ValueError, match='stream broke'):
+        for item in loop.relay(produce):
+            received.append(item)
+    assert received == ['a', 'b']
+
+
+def test_concurrent_identical_prompts_reach_the_model_once(llm, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    model = llm._async_client
+    create = model.create
+
+    async def slow_create(**kwargs):
+        # Long enough for every caller to join the first request
+        await asyncio.sleep(0.2)
+        return await create(**kwargs)
+
+    monkeypatch.setattr(model.chat.completions, 'create', slow_create)
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(llm.translate_to_chinese, ['Same text'] * 4))
+    assert results == ['zh:Same text'] * 4
+    assert model.prompts == ['Same text']
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for server-sent event streaming of translations and completions
+(src/utils/sse.py), against the fake model from conftest.py
+
+Run with pytest.
+"""
+import json
+
+import pytest
+
+from src.routes import note as note_routes
+
+
+@pytest.fixture
+def ai_client(client, llm, monkeypatch):
+    monkeypatch.setattr(note_routes, 'llm_client', llm)
+    return client
+
+
+def events(response):
+    """(event, data) pairs of an SSE response"""
+    assert response.mimetype == 'text/event-stream'
+    parsed = []
+    for block in response.data.decode('utf-8').strip().split('\n\n'):
+        event, data = block.split('\n')
+        parsed.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return parsed
+
+
+def test_translation_streams_tokens_then_the_full_result(ai_client):
+    response = ai_client.post('/api/translate', json={'text': 'Hello there', 'stream': True})
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    stream = events(response)
+    tokens = [data['text'] for event, data in stream if event == 'token']
+    assert len(tokens) > 1 and ''.join(tokens) == 'zh:Hello there'
+    assert stream[-1] == ('done', ai_client.post('/api/translate', json={'text': 'Hello there'}).get_json())
+
+
+def test_note_translation_streams_each_field(ai_client, create_note):
+    note = create_note('Title', 'First.\n\nSecond.')
+    stream = events(ai_client.post(f"/api/notes/{note['id']}/translate", query_string={'stream': '1'}))
+
+    fields = {}
+    for event, data in stream[:-1]:
+        assert event == 'token'
+        fields[data['field']] = fields.get(data['field'], '') + data['text']
+    assert fields == {'title': 'zh:Title', 'content': 'zh:First.\n\nzh:Second.'}
+    assert stream[-1][0] == 'done' and stream[-1][1]['translated'] == fields
+
+
+def test_completion_done_event_carries_the_parsed_reply(ai_client):
+    stream = events(ai_client.post('/api/complete', json={'title': 'Title', 'content': 'Body', 'stream': True}))
+    event, done = stream[-1]
+    assert event == 'done'
+    assert done['original'] == {'title': 'Title', 'content': 'Body'}
+    assert set(done) >= {'suggestions', 'improvements', 'additional_content', 'structure_tips'}
+
+
+def test_a_failing_model_ends_the_stream_with_an_error_event(ai_client, llm, monkeypatch):
+    async def unavailable(**kwargs):
+        raise RuntimeError('model unavailable')
+
+    monkeypatch.setattr(llm._async_client.chat.completions, 'create', unavailable)
+    stream = events(ai_client.post('/api/translate', json={'text': 'Hello', 'stream': True}))
+    assert stream == [('error', {'error': 'Translation failed: model unavailable'})]
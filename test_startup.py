@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Startup budget test: importing the app must stay cheap for cold starts
+
+Imports what the entry points import in a fresh interpreter under
+``python -X importtime`` and fails when the cumulative cost exceeds
+IMPORT_BUDGET_MS, or when a dependency that should load on first use is
+imported at startup. Run with pytest or directly.
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# What api/index.py and src/main.py import before serving a request
+STARTUP_IMPORTS = [
+    'flask_cors',
+    'src.models.note',
+    'src.routes.note',
+    'src.utils.compression',
+    'src.utils.migrations',
+    'src.utils.pooling',
+]
+# Heavy dependencies that must only load when a request needs them
+LAZY_MODULES = ['openai']
+
+# Under twice the current cost, which is almost all Flask and SQLAlchemy
+IMPORT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', 1000))
+# Best of several runs, to keep a busy machine from failing the budget
+RUNS = 3
+
+
+def measure_imports():
+    """
+    Import STARTUP_IMPORTS in a fresh interpreter
+
+    Returns:
+        tuple: (total_ms, costs, loaded) where costs maps each top-level
+        import to its cumulative milliseconds and loaded lists the
+        LAZY_MODULES that were imported anyway
+    """
+    code = (
+        f"import sys\nimport {', '.join(STARTUP_IMPORTS)}\n"
+        f"print(' '.join(name for name in {LAZY_MODULES!r} if name in sys.modules))"
+    )
+    env = dict(os.environ)
+    env.pop('GITHUB_AI_TOKEN', None)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+    costs = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module that imported them
+        if not name[1:].startswith(' '):
+            costs[name.strip()] = int(cumulative_us) / 1000
+    return sum(costs.values()), costs, result.stdout.split()
+
+
+def best_measurement():
+    return min((measure_imports() for _ in range(RUNS)), key=lambda measurement: measurement[0])
+
+
+def test_lazy_modules_not_imported():
+    """Heavy dependencies such as openai are imported on first use, not at startup"""
+    _total_ms, _costs, loaded = measure_imports()
+    assert not loaded, f"Imported at startup: {', '.join(loaded)}"
+
+
+def test_import_budget():
+    """Startup imports fit in IMPORT_BUDGET_MS"""
+    total_ms, costs, _loaded = best_measurement()
+    slowest = sorted(costs.items(), key=lambda item: item[1], reverse=True)[:5]
+    assert total_ms <= IMPORT_BUDGET_MS, (
+        f"Startup imports took {total_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms); slowest: "
+        + ', '.join(f'{name} {ms:.0f} ms' for name, ms in slowest)
+    )
+
+
+if __name__ == "__main__":
+    total_ms, costs, loaded = best_measurement()
+    for name, ms in sorted(costs.items(), key=lambda item: item[1], reverse=True):
+        print(f"{ms:8.1f} ms  {name}")
+    print(f"{total_ms:8.1f} ms  total (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    if loaded:
+        print(f"❌ Imported at startup: {', '.join(loaded)}")
+    elif total_ms > IMPORT_BUDGET_MS:
+        print("❌ Over the startup budget")
+    else:
+        print("✅ Startup imports within budget")
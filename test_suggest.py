@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for title autocomplete (src/utils/suggest.py)
+
+Covers prefix and later-word matches, and picking up notes that another
+process wrote or deleted, which this process only sees through the
+database. Run with pytest.
+"""
+from datetime import datetime
+
+import pytest
+
+from src.models.note import Note, NoteTombstone, db
+from src.utils import suggest
+
+
+def suggestions(client, prefix, **args):
+    response = client.get('/api/notes/suggest', query_string={'prefix': prefix, **args})
+    assert response.status_code == 200
+    return [item['title'] for item in response.get_json()]
+
+
+def write_elsewhere(title):
+    """Insert a note without publishing note_events, as another process would"""
+    notes = Note.__table__
+    now = datetime.utcnow()
+    result = db.session.execute(notes.insert().values(title=title, content='', created_at=now, updated_at=now))
+    db.session.commit()
+    return result.inserted_primary_key[0]
+
+
+def delete_elsewhere(note_id):
+    db.session.execute(Note.__table__.delete().where(Note.id == note_id))
+    db.session.execute(NoteTombstone.__table__.insert().values(note_id=note_id, deleted_at=datetime.utcnow()))
+    db.session.commit()
+
+
+@pytest.fixture
+def no_refresh_delay(monkeypatch):
+    monkeypatch.setattr(suggest, 'REFRESH_INTERVAL', 0.0)
+
+
+def test_whole_title_matches_come_before_word_matches(client, create_note):
+    create_note('Deep Learning notes')
+    create_note('learning  Rust')
+    create_note('Unrelated')
+
+    assert suggestions(client, 'LEARN') == ['learning  Rust', 'Deep Learning notes']
+    assert suggestions(client, 'learning r') == ['learning  Rust']
+    assert suggestions(client, 'learn', limit=1) == ['learning  Rust']
+
+
+def test_blank_prefix_suggests_nothing(client, create_note):
+    create_note('Anything')
+    assert suggestions(client, '   ') == []
+
+
+def test_own_writes_show_up_immediately(client, create_note):
+    assert suggestions(client, 'new') == []
+    note = create_note('New idea')
+    assert suggestions(client, 'new') == ['New idea']
+
+    client.put(f"/api/notes/{note['id']}", json={'title': 'Renamed idea'})
+    assert suggestions(client, 'new') == []
+    client.delete(f"/api/notes/{note['id']}")
+    assert suggestions(client, 'renamed') == []
+
+
+def test_other_processes_writes_are_picked_up(client, no_refresh_delay):
+    # Built while the table is empty, the index must still refresh afterwards
+    assert suggestions(client, 'remote') == []
+    note_id = write_elsewhere('Remote note')
+    assert suggestions(client, 'remote') == ['Remote note']
+
+    delete_elsewhere(note_id)
+    assert suggestions(client, 'remote') == []
+
+
+def test_other_processes_writes_wait_for_the_refresh_interval(client, create_note):
+    create_note('Local')
+    assert suggestions(client, 'local') == ['Local']
+    write_elsewhere('Local elsewhere')
+    assert suggestions(client, 'local') == ['Local']
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for the stored note summary fields (src/utils/summary.py)
+
+Run with pytest.
+"""
+from datetime import datetime
+
+from src.models.note import Note, db
+from src.utils.summary import PREVIEW_LENGTH, backfill_note_summaries, note_summary
+
+
+def summary(client, note_id):
+    notes = client.get('/api/notes', query_string={'fields': 'summary'}).get_json()['notes']
+    [note] = [note for note in notes if note['id'] == note_id]
+    return note['preview'], note['content_length'], note['word_count']
+
+
+def test_note_summary():
+    assert note_summary('  Hello,\n\n  world!  ') == {'preview': 'Hello, world!', 'content_length': 20, 'word_count': 2}
+    assert note_summary('学习 Python 很有趣')['word_count'] == 6
+    assert len(note_summary('word ' * 1000)['preview']) == PREVIEW_LENGTH
+    assert note_summary(None) == {'preview': '', 'content_length': 0, 'word_count': 0}
+
+
+def test_every_write_path_keeps_the_summary_current(client, create_note):
+    note = create_note('Note', 'one two')
+    assert summary(client, note['id']) == ('one two', 7, 2)
+
+    client.put(f"/api/notes/{note['id']}", json={'content': 'one two three'})
+    assert summary(client, note['id']) == ('one two three', 13, 3)
+
+    client.patch(f"/api/notes/{note['id']}", json={
+        'base_version': note['version'] + 1, 'content_edits': [{'start': 0, 'end': 3, 'text': 'zero'}]
+    })
+    assert summary(client, note['id']) == ('zero two three', 14, 3)
+
+    client.post('/api/notes/batch', json={'operations': [{'op': 'update', 'id': note['id'], 'content': 'four'}]})
+    assert summary(client, note['id']) == ('four', 4, 1)
+
+
+def test_title_only_updates_keep_the_summary(client, create_note):
+    note = create_note('Note', 'one two')
+    client.put(f"/api/notes/{note['id']}", json={'title': 'Renamed'})
+    assert summary(client, note['id']) == ('one two', 7, 2)
+
+
+def test_backfill_fills_old_notes_without_touching_updated_at(app):
+    notes = Note.__table__
+    stamp = datetime(2020, 1, 1)
+    db.session.execute(notes.insert().values(title='Old', content='written before summaries',
+                                             created_at=stamp, updated_at=stamp))
+    db.session.commit()
+
+    backfill_note_summaries(db.engine, notes)
+    note = Note.query.one()
+    assert (note.preview, note.content_length, note.word_count) == ('written before summaries', 24, 3)
+    assert note.updated_at == stamp
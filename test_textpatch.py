@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the autosave splices in src/utils/textpatch.py and PATCH
+/api/notes/<id>
+
+Offsets are UTF-16 code units, as the browser computes them, so text
+outside the Basic Multilingual Plane (emoji) counts twice. Run with pytest.
+"""
+import pytest
+
+from src.utils.textpatch import apply_edits
+
+
+def splice(start, end, text=''):
+    return {'start': start, 'end': end, 'text': text}
+
+
+def test_ascii_insert_replace_delete():
+    assert apply_edits('hello world', [splice(5, 5, ',')]) == 'hello, world'
+    assert apply_edits('hello world', [splice(6, 11, 'there')]) == 'hello there'
+    assert apply_edits('hello world', [splice(5, 11)]) == 'hello'
+
+
+def test_offsets_after_an_emoji_count_utf16_units():
+    # '😀' is one Python character but two JavaScript ones
+    base = 'a😀b'
+    assert apply_edits(base, [splice(3, 4, 'c')]) == 'a😀c'
+    assert apply_edits(base, [splice(1, 3)]) == 'ab'
+
+
+def test_cjk_characters_are_one_unit_each():
+    assert apply_edits('你好世界', [splice(2, 4, '朋友')]) == '你好朋友'
+
+
+def test_several_edits_apply_against_the_base():
+    base = '😀 one two three'
+    edits = [splice(3, 6, 'ONE'), splice(11, 16, 'THREE')]
+    assert apply_edits(base, edits) == '😀 ONE two THREE'
+
+
+def test_empty_edit_list_returns_the_base():
+    assert apply_edits('unchanged 😀', []) == 'unchanged 😀'
+
+
+def test_surrogate_halves_that_pair_up_are_accepted():
+    # Replace the low half of one emoji with the low half of another
+    assert apply_edits('😀', [splice(1, 2, '\ude01')]) == '😁'
+
+
+def test_splitting_a_surrogate_pair_is_rejected():
+    with pytest.raises(ValueError):
+        apply_edits('a😀b', [splice(2, 2, 'x')])
+
+
+@pytest.mark.parametrize('edits', [
+    [splice(4, 2)],
+    [splice(0, 99)],
+    [splice(-1, 0)],
+    [splice(3, 4), splice(1, 2)],
+    [splice(1, 3), splice(2, 4)],
+    [{'start': '1', 'end': 2}],
+    ['not an edit'],
+    'not a list',
+])
+def test_malformed_edits_are_rejected(edits):
+    with pytest.raises(ValueError):
+        apply_edits('abcdef', edits)
+
+
+def test_patch_applies_edits_against_the_base_version(client, create_note):
+    note = create_note('Draft', 'hello world')
+    response = client.patch(f"/api/notes/{note['id']}", json={
+        'base_version': note['version'], 'title': 'Saved', 'content_edits': [splice(5, 11, ', 😀')]
+    })
+    assert response.status_code == 200
+    patched = response.get_json()
+    assert (patched['title'], patched['content'], patched['version']) == ('Saved', 'hello, 😀', note['version'] + 1)
+    assert response.headers['ETag'] == client.get(f"/api/notes/{note['id']}").headers['ETag']
+
+
+def test_patch_against_an_old_version_is_409(client, create_note):
+    note = create_note('Draft', 'hello')
+    client.put(f"/api/notes/{note['id']}", json={'content': 'edited elsewhere'})
+
+    response = client.patch(f"/api/notes/{note['id']}", json={
+        'base_version': note['version'], 'content_edits': [splice(0, 0, 'x')]
+    })
+    assert response.status_code == 409
+    assert response.get_json()['version'] == note['version'] + 1
+    assert client.get(f"/api/notes/{note['id']}").get_json()['content'] == 'edited elsewhere'
+
+
+def test_patch_needs_a_base_version_and_valid_edits(client, create_note):
+    note = create_note('Draft', 'hello')
+    url = f"/api/notes/{note['id']}"
+    assert client.patch(url, json={'title': 'x'}).status_code == 400
+    assert client.patch(url, json={'base_version': note['version'], 'content_edits': [splice(3, 1)]}).status_code == 400
+    assert client.get(url).get_json()['content'] == 'hello'
+    assert client.patch('/api/notes/999', json={'base_version': 1}).status_code == 404
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tests for CJK-aware search tokenization (src/utils/tokenizer.py)
+
+Unsegmented Chinese, Japanese and Korean text must be searchable by any
+run of its characters, through the index. Run with pytest.
+"""
+import pytest
+
+from src.utils.tokenizer import cjk_bigrams, cjk_query_bigrams, is_single_cjk_character
+
+
+def search_titles(client, query):
+    response = client.get('/api/notes/search', query_string={'q': query})
+    assert response.status_code == 200
+    return [note['title'] for note in response.get_json()]
+
+
+def test_index_text_gets_bigrams_and_the_last_character():
+    assert cjk_bigrams('世界和平') == ' 世界 界和 和平 平 '
+    assert cjk_bigrams('hello 世界!') == 'hello  世界 界 !'
+    assert cjk_bigrams('plain text') == 'plain text'
+    assert cjk_bigrams(None) == ''
+
+
+def test_query_terms_become_consecutive_bigrams():
+    assert cjk_query_bigrams('世界和平') == '世界 界和 和平'
+    assert cjk_query_bigrams('界') == '界'
+    assert is_single_cjk_character('界') and not is_single_cjk_character('a')
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('机器学习', ['机器学习笔记']),
+    ('学习', ['机器学习笔记', '学习计划']),
+    ('习', ['机器学习笔记', '学习计划']),
+    ('器学', ['机器学习笔记']),
+    ('学习 计划', ['学习计划']),
+    ('東京', ['東京の天気']),
+    ('날씨', ['오늘 날씨']),
+    ('学机', []),
+])
+def test_cjk_runs_match_anywhere_in_a_note(client, create_note, query, expected):
+    create_note('机器学习笔记', '深度学习入门')
+    create_note('学习计划', '每天一小时')
+    create_note('東京の天気', '晴れ')
+    create_note('오늘 날씨', '맑음')
+
+    assert sorted(search_titles(client, query)) == sorted(expected)
+
+
+def test_cjk_content_is_indexed(client, create_note):
+    create_note('Mixed', 'Notes about 自然语言处理 and more')
+    assert search_titles(client, '语言') == ['Mixed']
+    assert search_titles(client, 'notes 处理') == ['Mixed']